@@ -0,0 +1,72 @@
+"""Measures the time spent on each message a guild channel receives, saving
+the user on every message compared to the staged message pipeline which saves
+every changed user once per persist.
+
+Simulates a busy channel: 50 messages per second from a small group of users,
+persisted every 5 seconds. Uses a temporary database.
+
+usage:
+    python3 uboot/benchmarks/message_pipeline.py [seconds]
+"""
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from managers import messages, users  # noqa: E402
+
+RATE: int = 50  # Messages per second.
+PERSIST: int = 5  # Seconds between persists.
+AUTHORS: int = 40  # Users talking in the channel.
+
+
+def direct(user_ids: list[int]) -> float:
+    """Adds and saves on every message. Returns seconds per message."""
+    started = time.perf_counter()
+    for user_id in user_ids:
+        user = users.Manager.get(user_id)
+        user.add_message()
+        user.save()
+    return (time.perf_counter() - started) / len(user_ids)
+
+
+def staged(user_ids: list[int]) -> float:
+    """Adds through the pipeline, persisting on the interval. Returns seconds
+    per message, including the persists.
+    """
+    started = time.perf_counter()
+    for pos, user_id in enumerate(user_ids, 1):
+        messages.Manager.ingest(users.Manager.get(user_id))
+        if pos % (RATE * PERSIST) == 0:
+            messages.Manager.persist()
+    messages.Manager.persist()
+    return (time.perf_counter() - started) / len(user_ids)
+
+
+def main() -> None:
+    """Entrance function into the benchmark."""
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    rng = random.Random(seconds)
+    user_ids = [rng.randrange(AUTHORS) + 10 ** 17
+                for _ in range(RATE * seconds)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        os.makedirs("dbs")
+        users.Manager.init("benchmark.sqlite3")
+        messages.Manager.init("benchmark.sqlite3")
+
+        print(f"messages: {len(user_ids)} from {AUTHORS} users")
+        print(f"  direct: {direct(user_ids) * 1e6:8.1f} us per message")
+        print(f"  staged: {staged(user_ids) * 1e6:8.1f} us per message")
+        for name, stats in messages.Manager.stats().items():
+            print(f"{name:>8}: {int(stats['calls'])} calls, "
+                  f"{stats['avg']:0.1f} us avg, {stats['max']:0.1f} us max")
+
+
+if __name__ == "__main__":
+    main()
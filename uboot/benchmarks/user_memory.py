@@ -0,0 +1,122 @@
+"""Measures the memory used by each User held in memory, compared with the
+previous layout: attributes in a dict per user, a Locations object per user,
+references to the user's inventories and cooldowns kept as datetimes in a
+dict.
+
+Inventories are created before measuring and the leaderboards are left out,
+so only the users themselves are counted. Every user receives a message so
+their cooldowns are in use.
+
+usage:
+    python3 uboot/benchmarks/user_memory.py [amount]
+"""
+import pathlib
+import random
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from managers import inventories, leaderboards, users  # noqa: E402
+from managers.locations import Area, Level  # noqa: E402
+from managers.users import Cooldown  # noqa: E402
+
+
+class BaselineLocations:
+    """Unlocked locations as previously stored, one object per user."""
+
+    def __init__(self, unlocks: int) -> None:
+        self.unlocks: Area = Area(unlocks)
+
+
+class BaselineUser:
+    """User as previously laid out in memory."""
+
+    def __init__(self, raw: users.UserRaw) -> None:
+        self.id = raw[0]
+        self._gold = raw[1]
+        self.msg_count = raw[2]
+        self.gambles = raw[3]
+        self.gambles_won = raw[4]
+        self.button_press = raw[5]
+        self.monsters = raw[6]
+        self.kills = raw[7]
+        self._exp = raw[8]
+        self.locations = BaselineLocations(raw[9])
+        self.c_location: Area = Area(raw[10])
+        self.c_floor = Level(raw[13])
+        self.is_streamer = bool(raw[14])
+        self.stream_name = raw[15].replace("'", "")
+        self._deaths = raw[11]
+        self.weapon = None
+        self.is_bot = False
+        self._in_combat = False
+        self._cooldowns: dict[Cooldown, datetime] = {}
+        self.backpack = inventories.Manager.get_backpack(self.id)
+        self.bank = inventories.Manager.get_bank(self.id)
+
+    def add_message(self) -> None:
+        """Adds a message, rewarding gold if off cooldown."""
+        self.msg_count += 1
+        if Cooldown.GOLD in self._cooldowns:
+            return
+        self._gold += 1
+        self._cooldowns[Cooldown.GOLD] = datetime.now()
+
+
+def make_raws(amount: int) -> list[users.UserRaw]:
+    """Creates raw users with varied values, like a real database."""
+    rng = random.Random(amount)
+    raws: list[users.UserRaw] = []
+    for user_id in range(10 ** 17, 10 ** 17 + amount):
+        msg_count = rng.randrange(10000)
+        raws.append((user_id, rng.randrange(5000), msg_count,
+                     rng.randrange(100), rng.randrange(50), rng.randrange(20),
+                     rng.randrange(500), rng.randrange(400),
+                     rng.randrange(100000), Area.BRITAIN_SEWERS.value,
+                     Area.BRITAIN_SEWERS.value, rng.randrange(30), "''",
+                     int(Level.ONE), 0, "''"))
+    return raws
+
+
+def measure(model: Callable[[users.UserRaw], Any],
+            raws: list[users.UserRaw]) -> float:
+    """Bytes held per user of a model, after each received a message."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    loaded = [model(raw) for raw in raws]
+    for user in loaded:
+        user.add_message()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # Users are ranked as they change, the boards are not part of the user.
+    boards = tracemalloc.Filter(False, leaderboards.__file__)
+    before = before.filter_traces([boards])
+    after = after.filter_traces([boards])
+
+    used = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return used / len(loaded)
+
+
+def main() -> None:
+    """Entrance function into the benchmark."""
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    raws = make_raws(amount)
+    for raw in raws:
+        inventories.Manager.get_backpack(raw[0])
+
+    baseline = measure(BaselineUser, raws)
+    current = measure(users.User, raws)
+    print(f"users: {amount}")
+    print(f"baseline: {baseline:0.1f} bytes per user, "
+          f"{baseline * amount / 1024 / 1024:0.2f} MiB")
+    print(f"current: {current:0.1f} bytes per user, "
+          f"{current * amount / 1024 / 1024:0.2f} MiB")
+    print(f"saved: {1 - current / baseline:0.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Measures reading the derived stats of a user (level, difficulty and gold
+multiplier), calculated every time compared to the cached values kept by each
+User. Also measures a message being added followed by a difficulty check, like
+every eligible message does.
+
+usage:
+    python3 uboot/benchmarks/user_stats.py [iterations]
+"""
+import pathlib
+import sys
+import timeit
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from managers import users  # noqa: E402
+from managers.items import Material  # noqa: E402
+from managers.locations import Area, Level  # noqa: E402
+
+
+def make_user() -> users.User:
+    """Creates a user part of the way through the game."""
+    raw = (10 ** 17, 2500, 12000, 40, 20, 5, 300, 250, 180000,
+           Area.BRITAIN_SEWERS.value, Area.BRITAIN_SEWERS.value, 3, "''",
+           Level.ONE.value, 0, "''")
+    return users.User(raw)
+
+
+def calculated(user: users.User) -> tuple[int, float, float]:
+    """Calculates the stats without any caching."""
+    level = users.calc_level(user.exp)
+    difficulty = users.calc_difficulty(users.calc_level(user.exp), user.exp,
+                                       user.gold, user.msg_count,
+                                       Material.NONE)
+    return level, difficulty, users.calc_gold_multiplier(
+        users.calc_level(user.exp))
+
+
+def cached(user: users.User) -> tuple[int, float, float]:
+    """Reads the stats kept by the user."""
+    return user.level, user.difficulty, user.gold_multiplier
+
+
+def on_message(user: users.User) -> float:
+    """Adds a message and checks the difficulty."""
+    user.add_message()
+    return user.difficulty
+
+
+def main() -> None:
+    """Entrance function into the benchmark."""
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    user = make_user()
+    if calculated(user) != cached(user):
+        raise AssertionError("cached stats do not match calculated stats.")
+
+    for name, func in (('calculated', calculated), ('cached', cached),
+                       ('on_message', on_message)):
+        best = min(timeit.repeat(lambda f=func: f(user), number=iterations,
+                                 repeat=5))
+        print(f"{name:>10}: {best / iterations * 1e9:8.1f} ns per call")
+
+
+if __name__ == "__main__":
+    main()
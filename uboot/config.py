@@ -77,6 +77,113 @@ class DiscordConfig:
         return self._config.getint('CCDMId', 0)
 
 
+class DatabaseConfig:
+    """Configuration Settings for the local databases."""
+
+    def __init__(self, config: configparser.SectionProxy) -> None:
+        self._config = config
+
+    @property
+    def write_behind(self) -> bool:
+        """Queues changes in memory and writes them in batches.
+        Default: False
+        """
+        return self._config.getboolean('WriteBehind', False)
+
+    @property
+    def flush_interval(self) -> int:
+        """Maximum amount of seconds queued changes wait before being written.
+        Default: 5
+        """
+        return max(self._config.getint('FlushInterval', 5), 1)
+
+    @property
+    def flush_size(self) -> int:
+        """Amount of queued changes that forces an early write.
+        Default: 500
+        """
+        return max(self._config.getint('FlushSize', 500), 1)
+
+    @property
+    def snapshot(self) -> bool:
+        """Writes a snapshot on shutdown that is loaded instead of the
+        database on the next start, if nothing has changed.
+        Default: True
+        """
+        return self._config.getboolean('Snapshot', True)
+
+    @property
+    def user_cache(self) -> int:
+        """Maximum amount of users kept in memory, loading them as they are
+        needed. 0 loads every user on start.
+        Default: 0
+        """
+        return max(self._config.getint('UserCache', 0), 0)
+
+    @property
+    def log_buffer(self) -> int:
+        """Maximum amount of logs held in memory waiting to be written.
+        Default: 10000
+        """
+        return max(self._config.getint('LogBuffer', 10000), 1)
+
+    @property
+    def log_batch(self) -> int:
+        """Amount of buffered logs that are written together.
+        Default: 250
+        """
+        return max(self._config.getint('LogBatch', 250), 1)
+
+    @property
+    def log_drop_newest(self) -> bool:
+        """Drops new logs instead of the oldest ones when the buffer is full.
+        Default: False
+        """
+        return self._config.getboolean('LogDropNewest', False)
+
+    @property
+    def log_retention(self) -> int:
+        """Days logs are kept in the database before being archived, 0 keeps
+        them forever.
+        Default: 90
+        """
+        return max(self._config.getint('LogRetentionDays', 90), 0)
+
+    @property
+    def synchronous(self) -> str:
+        """How often SQLite syncs to disk: OFF, NORMAL, FULL, or EXTRA.
+        Default: NORMAL
+        """
+        val = self._config.get('Synchronous', fallback='NORMAL').upper()
+        if val not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            return 'NORMAL'
+        return val
+
+    @property
+    def cache_size(self) -> int:
+        """Page cache size, negative values are in KiB instead of pages.
+        Default: -16000
+        """
+        return self._config.getint('CacheSize', -16000)
+
+    @property
+    def mmap_size(self) -> int:
+        """Amount of bytes of the database that are memory-mapped.
+        Default: 268435456
+        """
+        return max(self._config.getint('MmapSize', 268435456), 0)
+
+    @property
+    def temp_store(self) -> str:
+        """Where temporary tables and indices are kept: DEFAULT, FILE, or MEMORY.
+        Default: MEMORY
+        """
+        val = self._config.get('TempStore', fallback='MEMORY').upper()
+        if val not in ('DEFAULT', 'FILE', 'MEMORY'):
+            return 'MEMORY'
+        return val
+
+
 class GeneralConfig:
     """General configurations, parent to all sub-configurations."""
 
@@ -89,6 +196,11 @@ class GeneralConfig:
         self._discord = DiscordConfig(config['DISCORD'])
         self._twitch = TwitchConfig(config['TWITCH'])
 
+        # Database section is optional, defaults are used if missing.
+        if not config.has_section('DATABASE'):
+            config.add_section('DATABASE')
+        self._database = DatabaseConfig(config['DATABASE'])
+
     @property
     def discord(self) -> DiscordConfig:
         """Discord configurations."""
@@ -99,6 +211,11 @@ class GeneralConfig:
         """Twitch configurations."""
         return self._twitch
 
+    @property
+    def database(self) -> DatabaseConfig:
+        """Database configurations."""
+        return self._database
+
     @property
     def debug(self) -> bool:
         """Controls if the program is running in DEBUG mode.
@@ -127,6 +244,20 @@ class GeneralConfig:
         config['TWITCH'] = {}
         config['TWITCH']['Token'] = 'unset'
         config['TWITCH']['Secret'] = 'unset'
+        config['DATABASE'] = {}
+        config['DATABASE']['WriteBehind'] = 'False'
+        config['DATABASE']['FlushInterval'] = '5'
+        config['DATABASE']['FlushSize'] = '500'
+        config['DATABASE']['Snapshot'] = 'True'
+        config['DATABASE']['UserCache'] = '0'
+        config['DATABASE']['LogBuffer'] = '10000'
+        config['DATABASE']['LogBatch'] = '250'
+        config['DATABASE']['LogDropNewest'] = 'False'
+        config['DATABASE']['LogRetentionDays'] = '90'
+        config['DATABASE']['Synchronous'] = 'NORMAL'
+        config['DATABASE']['CacheSize'] = '-16000'
+        config['DATABASE']['MmapSize'] = '268435456'
+        config['DATABASE']['TempStore'] = 'MEMORY'
 
         # Save it locally.
         with open(CONFIG_FILENAME, 'w', encoding='utf-8') as configfile:
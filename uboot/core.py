@@ -1,7 +1,11 @@
 """Entrance into the application."""
 
 from config import GeneralConfig, CONFIG_FILENAME
-from managers.logs import Log, Manager as LogManager
+from db.connection import ConnectionManager
+from db.db_socket import DbSocket
+from db.snapshot import Snapshot
+from managers.logs import Log, Overflow, Manager as LogManager
+from managers.users import Manager as UserManager
 from dclient.bot import DiscordBot
 
 
@@ -26,11 +30,40 @@ def main() -> None:
     Log.debug("DEBUG is set")
     Log.debug(f"PREFIX: {config.discord.prefix}")
 
-    LogManager.init("uboot.sqlite3")
+    # Configure how changes are written to the databases.
+    dbconfig = config.database
+    ConnectionManager.configure(dbconfig.synchronous, dbconfig.cache_size,
+                                dbconfig.mmap_size, dbconfig.temp_store)
+    DbSocket.configure(dbconfig.write_behind, dbconfig.flush_interval,
+                       dbconfig.flush_size)
+    if dbconfig.write_behind:
+        Log.debug(f"WRITE-BEHIND: every {dbconfig.flush_interval}s or "
+                  f"{dbconfig.flush_size} changes")
+    Snapshot.configure(dbconfig.snapshot)
+    UserManager.configure(dbconfig.user_cache)
+    if dbconfig.user_cache > 0:
+        Log.debug(f"USER CACHE: {dbconfig.user_cache} users")
+
+    overflow = Overflow.DROP_OLDEST
+    if dbconfig.log_drop_newest:
+        overflow = Overflow.DROP_NEWEST
+
+    # Logs are kept apart from the game data so they do not contend.
+    LogManager.init("logs.sqlite3", capacity=dbconfig.log_buffer,
+                    batch_size=dbconfig.log_batch, overflow=overflow,
+                    retention_days=dbconfig.log_retention,
+                    legacy="uboot.sqlite3")
 
     # Start the discord bot.
     DiscordBot.init_run(config.discord, config.twitch)
 
+    # Bot has stopped, write anything remaining and release the databases.
+    LogManager.flush(wait=True)
+    DbSocket.flush_all()
+    ConnectionManager.close_all()
+    if Snapshot.write_captured() > 0:
+        Log.info("Snapshot written for the next start.")
+
 
 if __name__ == "__main__":
     main()
@@ -17,10 +17,13 @@ class AliasDb(DbSocket):
     def __init__(self, filename: str) -> None:
         super().__init__(filename)
         self.table_name = clean_name('aliases')
+        self.columns = ('id', 'guild_id', 'msg_id', 'name', 'owner_id')
+        self.primary_key = ('id', 'guild_id')
         self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} "\
             "( id INTEGER DESC, guild_id INTEGER, "\
             "msg_id INTEGER, "\
-            "name TEXT, owner_id INTEGER )"
+            "name TEXT, owner_id INTEGER, "\
+            "PRIMARY KEY (id, guild_id) )"
         self.query['find_one'] = "SELECT * FROM {table_name} WHERE "\
             "{condition}"
         self.query['insert_one'] = "INSERT OR IGNORE INTO {table_name} "\
@@ -51,19 +54,10 @@ class AliasDb(DbSocket):
         """Updates an alias in the database, if it does not exist it will
         be created.
         """
-        old = self.find_one(raw[0], raw[1])
-        if not old:
-            return self.insert_one(raw)
-
-        # Update it here.
-        set_key = f"msg_id = {raw[2]}, "\
-            f"name = {raw[3]}, "\
-            f"owner_id = {raw[4]}"
-        where_key = f"id = {raw[0]} AND guild_id = {raw[1]}"
-        self._update(set_key, where_key)
-        return None
+        self._upsert(raw)
 
     def delete_one(self, raw: AliasRaw) -> None:
         """Removes a pair from database."""
+        self._forget(self._key(raw))
         where_key = f"id = {raw[0]} AND guild_id = {raw[1]}"
         self._delete(where_key)
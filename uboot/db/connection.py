@@ -0,0 +1,98 @@
+"""Shared connections to the local databases. Every database manager using the
+same file shares a single connection, opened in WAL mode so readers are not
+blocked by the writer. Pending schema migrations are applied on open.
+"""
+import os
+import sqlite3
+
+from .migrations import Migrator
+
+
+class ConnectionManager:
+    """Opens and tracks one connection per database file."""
+    synchronous: str = 'NORMAL'
+    cache_size: int = -16000
+    mmap_size: int = 268435456
+    temp_store: str = 'MEMORY'
+    _connections: dict[str, sqlite3.Connection] = {}  # Filename => Connection
+    _tables: dict[str, set[str]] = {}  # Filename => Known tables
+    _closed: dict[str, int] = {}  # Filename => Changes made before closing
+
+    @staticmethod
+    def configure(synchronous: str, cache_size: int,
+                  mmap_size: int, temp_store: str) -> None:
+        """Sets the pragmas applied to connections opened afterwards."""
+        synchronous = synchronous.upper()
+        if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"invalid synchronous mode '{synchronous}'.")
+
+        temp_store = temp_store.upper()
+        if temp_store not in ('DEFAULT', 'FILE', 'MEMORY'):
+            raise ValueError(f"invalid temp store '{temp_store}'.")
+
+        ConnectionManager.synchronous = synchronous
+        ConnectionManager.cache_size = int(cache_size)
+        ConnectionManager.mmap_size = max(int(mmap_size), 0)
+        ConnectionManager.temp_store = temp_store
+
+    @staticmethod
+    def get(filename: str) -> sqlite3.Connection:
+        """Gets the connection for a database file, opening it if needed."""
+        if filename == "":
+            raise ValueError("database filename cannot be empty.")
+
+        session = ConnectionManager._connections.get(filename.lower())
+        if session:
+            return session
+
+        if not os.path.exists("dbs"):
+            os.makedirs("dbs")
+
+        # Shared with the database worker thread, it is the only user of the
+        # connection while running.
+        session = sqlite3.connect(f"dbs/{filename}", check_same_thread=False)
+        ConnectionManager._apply_pragmas(session)
+        Migrator.apply(session)
+        ConnectionManager._connections[filename.lower()] = session
+        ConnectionManager._closed.pop(filename.lower(), None)
+        return session
+
+    @staticmethod
+    def changes(filename: str) -> int:
+        """Gets the amount of rows changed through the connection for a
+        database file, kept once it is closed. -1 if it was never opened.
+        """
+        session = ConnectionManager._connections.get(filename.lower())
+        if session:
+            return session.total_changes
+        return ConnectionManager._closed.get(filename.lower(), -1)
+
+    @staticmethod
+    def tables(filename: str) -> set[str]:
+        """Gets the tables known to exist for a database file, shared by every
+        socket using the same connection.
+        """
+        return ConnectionManager._tables.setdefault(filename.lower(), set())
+
+    @staticmethod
+    def close_all() -> None:
+        """Closes every open connection, changes should be committed first."""
+        for filename, session in ConnectionManager._connections.items():
+            try:
+                session.commit()
+                ConnectionManager._closed[filename] = session.total_changes
+                session.close()
+            except sqlite3.Error:
+                pass
+        ConnectionManager._connections.clear()
+        ConnectionManager._tables.clear()
+
+    @staticmethod
+    def _apply_pragmas(session: sqlite3.Connection) -> None:
+        """Puts the connection in WAL mode and applies the tuned pragmas."""
+        session.execute("PRAGMA journal_mode = WAL")
+        session.execute(
+            f"PRAGMA synchronous = {ConnectionManager.synchronous}")
+        session.execute(f"PRAGMA cache_size = {ConnectionManager.cache_size}")
+        session.execute(f"PRAGMA mmap_size = {ConnectionManager.mmap_size}")
+        session.execute(f"PRAGMA temp_store = {ConnectionManager.temp_store}")
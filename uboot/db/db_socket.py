@@ -1,8 +1,10 @@
 """The root of database access. Inherited for individual database managers."""
-import os
-import sqlite3
+import time
 from typing import Any, Optional
 
+from .connection import ConnectionManager
+from .executor import on_worker
+
 
 def clean_name(name: str) -> str:
     """Cleans a table name so that it will not cause issues."""
@@ -10,25 +12,34 @@ def clean_name(name: str) -> str:
                    or char == '_').lower()
 
 
-valid_keys = ('find_one', 'find_many', 'insert_one', 'insert_many', 'update',
-              'delete', 'create_table', 'table_exists')
+valid_keys = ('find_one', 'find_many', 'find_page', 'find_expired', 'count',
+              'find_with_items', 'insert_one', 'insert_many', 'update',
+              'upsert', 'delete', 'delete_expired', 'create_table',
+              'create_index', 'table_exists')
 
 
 class DbSocket:
     """The root of database access. Inherited for individual database managers."""
+    # Write-behind settings, shared by all sockets.
+    write_behind: bool = False
+    flush_interval: int = 5
+    flush_size: int = 500
+    _sockets: list['DbSocket'] = []
 
     def __init__(self, filename: str) -> None:
-        if filename == "":
-            raise ValueError("database filename cannot be empty.")
-
-        if not os.path.exists("dbs"):
-            os.makedirs("dbs")
-
         self._is_saving: bool = False
+        self._batching: bool = False
+        self._pending: dict[Any, Any] = {}  # Key => Raw
+        self._last_flush: float = time.monotonic()
         self._db_name = filename.lower()
-        self._session = sqlite3.connect(f"dbs/{filename}")
+        self._session = ConnectionManager.get(filename)
+        self._tables = ConnectionManager.tables(filename)
         self._cursor = self._session.cursor()
         self.table_name = 'none'
+        self.columns: tuple[str, ...] = ()  # In the same order as the raw.
+        self.primary_key: tuple[str, ...] = ()
+        self.indexes: dict[str, tuple[str, ...]] = {}  # Name => Columns
+        self._field_queries: dict[tuple[int, ...], str] = {}  # Changed => Query
         self._query = {
             'find_one': 'SELECT * FROM {table_name} WHERE {condition}',
             'find_many': 'SELECT * FROM {table_name}',
@@ -36,12 +47,51 @@ class DbSocket:
             'insert_many': '',
             'update': 'UPDATE {table_name} SET {set_key} WHERE '
             '{where_key}',
+            'upsert': '',
             'delete': 'DELETE FROM {table_name} WHERE {condition}',
             'create_table': '',
+            'create_index': 'CREATE INDEX IF NOT EXISTS {name} '
+            'ON {table_name} ({columns})',
             'table_exists': "SELECT name "
             "FROM sqlite_master "
             "WHERE name = '{table_name}'"
         }
+        DbSocket._sockets.append(self)
+
+    @staticmethod
+    def configure(write_behind: bool, flush_interval: int,
+                  flush_size: int) -> None:
+        """Sets the write-behind behavior for all database sockets. When
+        enabled, updates are queued and written in a single transaction once
+        the interval has elapsed or the queue reaches the size threshold.
+        """
+        DbSocket.write_behind = write_behind
+        DbSocket.flush_interval = max(flush_interval, 1)
+        DbSocket.flush_size = max(flush_size, 1)
+
+    @staticmethod
+    @on_worker(wait=True)
+    def flush_all() -> int:
+        """Writes all queued changes for every socket. Returns the amount of
+        changes written.
+        """
+        return sum(socket.flush() for socket in DbSocket._sockets)
+
+    @staticmethod
+    def total_pending() -> int:
+        """Amount of changes queued across every socket."""
+        return sum(socket.pending for socket in DbSocket._sockets)
+
+    @staticmethod
+    @on_worker()
+    def flush_expired() -> None:
+        """Writes the queued changes for sockets that have exceeded the flush
+        interval.
+        """
+        now = time.monotonic()
+        for socket in DbSocket._sockets:
+            if now - socket._last_flush >= DbSocket.flush_interval:
+                socket.flush()
 
     @property
     def db_name(self) -> str:
@@ -65,8 +115,96 @@ class DbSocket:
         """Checks if the database is currently saving."""
         return self._is_saving
 
+    @property
+    def pending(self) -> int:
+        """Amount of changes queued and waiting to be written."""
+        return len(self._pending)
+
+    @on_worker(wait=True)
+    def flush(self) -> int:
+        """Writes all queued changes in a single transaction. Returns the
+        amount of changes written.
+        """
+        if self._batching or not self._pending:
+            self._last_flush = time.monotonic()
+            return 0
+
+        pending = self._pending
+        self._pending = {}
+        self._batching = True
+        try:
+            # Only upserts are queued, written here so a failure is seen.
+            self._cursor.executemany(self._upsert_query(), pending.values())
+            self._session.commit()
+        except BaseException as err:
+            self._session.rollback()
+            print(f"SQL EXCEPTION:\nFlush of '{self.table_name}' failed."
+                  f"\n\n{err}")
+            # Queue the batch again, without replacing newer versions.
+            for key, raw in pending.items():
+                self._pending.setdefault(key, raw)
+            return 0
+        finally:
+            self._batching = False
+            self._last_flush = time.monotonic()
+        return len(pending)
+
+    def update(self, raw: Any) -> None:
+        """Updates an item in the database, if it does not exist it will
+        be created.
+        """
+        self._upsert(raw)
+
+    def update_changed(self, raw: Any, synced: Optional[Any]) -> bool:
+        """Writes only the columns that differ from the last stored version of
+        the raw. Nothing is written if they match and every column is written
+        if there is no stored version. Returns True if a write was made.
+        """
+        if synced is None:
+            self.update(raw)
+            return True
+
+        changed = tuple(n for n, value in enumerate(raw) if value != synced[n])
+        if len(changed) == 0:
+            return False
+        self._update_fields(raw, changed)
+        return True
+
+    def _key(self, raw: Any) -> tuple:
+        """Extracts the primary key values from a raw item."""
+        return tuple(raw[self.columns.index(key)] for key in self.primary_key)
+
+    def _defer(self, key: Any, raw: Any) -> bool:
+        """Queues an update if write-behind is enabled, the newest version of
+        the key replaces any older queued versions. Returns True if the update
+        was queued and should not be written now.
+        """
+        if not DbSocket.write_behind or self._batching:
+            return False
+
+        self._pending[key] = raw
+        elapsed = time.monotonic() - self._last_flush
+        if len(self._pending) >= DbSocket.flush_size or \
+                elapsed >= DbSocket.flush_interval:
+            self.flush()
+        return True
+
+    @on_worker()
+    def _forget(self, key: Any) -> None:
+        """Removes a queued update, used when the item is being deleted."""
+        self._pending.pop(key, None)
+
+    def _commit(self) -> None:
+        """Commits the current changes, unless they are part of a batch."""
+        if not self._batching:
+            self._session.commit()
+
+    @on_worker(wait=True)
     def _find_one(self, where_key: str) -> Optional[Any]:
         """Retrieve a single item from database, based on a WHERE clause."""
+        if self._pending:
+            # Queued changes have to be written to be seen.
+            self.flush()
         if not self._table_exists(self.table_name):
             # If there is not a table, there are no items.
             return
@@ -74,10 +212,14 @@ class DbSocket:
                                               condition=where_key)
         return self._cursor.execute(query).fetchone()
 
+    @on_worker(wait=True)
     def _find_many(self, ext: Optional[str] = None) -> list[Any]:
         """Retrieve several items from database."""
         if not ext:
             ext = ''
+        if self._pending:
+            # Queued changes have to be written to be seen.
+            self.flush()
         if not self._table_exists(self.table_name):
             return []
 
@@ -85,42 +227,55 @@ class DbSocket:
         res = self._cursor.execute(f"{query}{ext}").fetchall()
         return res if res else []
 
+    @on_worker(wait=True)
+    def _select(self, query: str, params: tuple = ()) -> list[Any]:
+        """Retrieve items from database using a parameterized query."""
+        if self._pending:
+            # Queued changes have to be written to be seen.
+            self.flush()
+        if not self._table_exists(self.table_name):
+            return []
+
+        query = query.format(table_name=self.table_name)
+        res = self._cursor.execute(query, params).fetchall()
+        return res if res else []
+
+    @on_worker()
     def _insert_one(self, data) -> None:
         """Adds a single item to database, if it already exists, then it is
         discarded.
         """
         self._is_saving = True
-        self._create_table(self.table_name)
 
         query = self.query['insert_one'].format(table_name=self.table_name)
         try:
             self._cursor.execute(query, data)
-            self._session.commit()
+            self._commit()
         except BaseException as err:
             print(f"SQL EXCEPTION:\nQuery:\n{query}\n\n{err}")
         finally:
             self._is_saving = False
 
+    @on_worker()
     def _insert_many(self, data) -> None:
         """Adds several items to database, if they already exist then the
         individual one is ignored.
         """
         self._is_saving = True
-        self._create_table(self.table_name)
 
         query = self.query['insert_many'].format(table_name=self.table_name)
         try:
             self._cursor.executemany(query, data)
-            self._session.commit()
+            self._commit()
         except BaseException as err:
             print(f"SQL EXCEPTION:\nQuery:\n{query}\n\n{err}")
         finally:
             self._is_saving = False
 
+    @on_worker()
     def _update(self, set_key: str, where_key: str) -> None:
         """Attempts to update an item in the database."""
         self._is_saving = True
-        self._create_table(self.table_name)
 
         # Build the query.
         query = self.query['update'].format(table_name=self.table_name,
@@ -128,12 +283,102 @@ class DbSocket:
                                             where_key=where_key)
         try:
             self._cursor.execute(query)
-            self._session.commit()
+            self._commit()
+        except BaseException as err:
+            print(f"SQL EXCEPTION:\nQuery:\n{query}\n\n{err}")
+        finally:
+            self._is_saving = False
+
+    @on_worker()
+    def _upsert(self, data) -> None:
+        """Adds a single item to database, if it already exists based on the
+        primary key then it is updated instead. Single statement per call.
+        """
+        if self._defer(self._key(data), data):
+            return
+
+        self._is_saving = True
+
+        query = self._upsert_query()
+        try:
+            self._cursor.execute(query, data)
+            self._commit()
+        except BaseException as err:
+            print(f"SQL EXCEPTION:\nQuery:\n{query}\n\n{err}")
+        finally:
+            self._is_saving = False
+
+    @on_worker()
+    def _update_fields(self, data, changed: tuple[int, ...]) -> None:
+        """Updates only the changed columns of an item, by position in the raw.
+        If the item is not stored yet, the entire item is added instead.
+        """
+        if self._defer(self._key(data), data):
+            return
+
+        self._is_saving = True
+
+        query = self._update_fields_query(changed)
+        keys = tuple(self.columns.index(key) for key in self.primary_key)
+        params = tuple(data[n] for n in changed) + tuple(data[n] for n in keys)
+        try:
+            self._cursor.execute(query, params)
+            if self._cursor.rowcount == 0:
+                query = self._upsert_query()
+                self._cursor.execute(query, data)
+            self._commit()
         except BaseException as err:
             print(f"SQL EXCEPTION:\nQuery:\n{query}\n\n{err}")
         finally:
             self._is_saving = False
 
+    def _update_fields_query(self, changed: tuple[int, ...]) -> str:
+        """Builds the update query for a set of changed columns, kept for the
+        next time the same columns change.
+        """
+        query = self._field_queries.get(changed)
+        if query:
+            return query
+
+        if not self.columns or not self.primary_key:
+            raise ValueError(f"columns and primary key are unset for "
+                             f"'{self.table_name}'.")
+
+        updates = ', '.join(f"{self.columns[n]} = ?" for n in changed)
+        keys = ' AND '.join(f"{key} = ?" for key in self.primary_key)
+        query = f"UPDATE {self.table_name} SET {updates} WHERE {keys}"
+        self._field_queries[changed] = query
+        return query
+
+    def _upsert_query(self) -> str:
+        """Builds the upsert query once from the columns and primary key. The
+        text never changes afterwards so the prepared statement is reused.
+        """
+        if self.query['upsert']:
+            return self.query['upsert']
+
+        if not self.columns or not self.primary_key:
+            raise ValueError(f"columns and primary key are unset for "
+                             f"'{self.table_name}'.")
+
+        columns = ', '.join(self.columns)
+        params = ', '.join('?' for _ in self.columns)
+        keys = ', '.join(self.primary_key)
+        updates = ', '.join(f"{col} = excluded.{col}" for col in self.columns
+                            if col not in self.primary_key)
+        self.query['upsert'] = f"INSERT INTO {self.table_name} ({columns}) "\
+            f"VALUES({params}) ON CONFLICT ({keys}) DO UPDATE SET {updates}"
+        return self.query['upsert']
+
+    def _create_indexes(self) -> None:
+        """Creates the secondary indexes for the table."""
+        for name, columns in self.indexes.items():
+            query = self.query['create_index'].format(
+                name=name, table_name=self.table_name,
+                columns=', '.join(columns))
+            self._cursor.execute(query)
+
+    @on_worker()
     def _delete(self, where_key: str) -> None:
         """Removes a single item from a database based on a  WHERE clause."""
         if not self._table_exists(self.table_name):
@@ -148,14 +393,32 @@ class DbSocket:
         except BaseException as err:
             print(f"SQL EXCEPTION:\nQuery:\n{query}\n\n{err}")
 
+    @on_worker(wait=True)
+    def create_schema(self) -> None:
+        """Creates the table and its indexes if they do not exist. Called once
+        when the manager initializes so writes never have to check. Changes to
+        existing tables are made by the migrations.
+        """
+        self._create_table(self.table_name)
+        self._create_indexes()
+        self._commit()
+
     def _create_table(self, table_name: str) -> None:
-        """Creates a table."""
+        """Creates a table, skipped if it is known to exist."""
+        if table_name in self._tables:
+            return
         query = self.query['create_table'].format(table_name=table_name)
         self._cursor.execute(query)
+        self._tables.add(table_name)
 
     def _table_exists(self, table_name: str) -> bool:
-        """Check if a table exists already."""
+        """Check if a table exists already. Only tables not seen before on
+        this connection are looked up.
+        """
+        if table_name in self._tables:
+            return True
         query = self.query['table_exists'].format(table_name=table_name)
         if self._cursor.execute(query).fetchone() is None:
             return False
+        self._tables.add(table_name)
         return True
@@ -0,0 +1,137 @@
+"""Dedicated worker thread for database access. Once started, every query made
+through a DbSocket is executed by the worker so slow commits never block the
+asyncio event loop. Writes are submitted without waiting, reads wait for their
+result so they observe every write queued before them.
+"""
+import asyncio
+import functools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+# Task to execute: (future, function, args, kwargs, time submitted)
+DbTask = tuple[Future, Callable[..., Any], tuple, dict, float]
+
+
+class DbExecutor:
+    """Single worker thread that executes all queued database tasks in order."""
+    _queue: 'queue.Queue[Optional[DbTask]]' = queue.Queue()
+    _thread: Optional[threading.Thread] = None
+    _processed: int = 0
+    _waits: deque[float] = deque(maxlen=256)  # Seconds spent queued.
+    _runs: deque[float] = deque(maxlen=256)  # Seconds spent executing.
+
+    @staticmethod
+    def start() -> None:
+        """Starts the worker thread if it is not running."""
+        if DbExecutor.is_running():
+            return
+        DbExecutor._thread = threading.Thread(target=DbExecutor._work,
+                                              name="uboot-db", daemon=True)
+        DbExecutor._thread.start()
+
+    @staticmethod
+    def stop() -> None:
+        """Finishes all queued tasks and stops the worker thread."""
+        thread = DbExecutor._thread
+        if not thread:
+            return
+        DbExecutor._queue.put(None)
+        thread.join()
+        DbExecutor._thread = None
+
+    @staticmethod
+    def is_running() -> bool:
+        """Checks if the worker thread is currently running."""
+        return DbExecutor._thread is not None and DbExecutor._thread.is_alive()
+
+    @staticmethod
+    def is_offloaded() -> bool:
+        """Checks if calls from the current thread must go to the worker."""
+        thread = DbExecutor._thread
+        return thread is not None and thread is not threading.current_thread()
+
+    @staticmethod
+    def submit(func: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queues a task for the worker, returning a future for its result.
+        Executes immediately if the worker is not running.
+        """
+        future: Future = Future()
+        if not DbExecutor.is_offloaded():
+            DbExecutor._execute(future, func, args, kwargs)
+            return future
+
+        DbExecutor._queue.put((future, func, args, kwargs, time.perf_counter()))
+        return future
+
+    @staticmethod
+    async def run(func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Queues a task for the worker and waits for it without blocking the
+        event loop.
+        """
+        return await asyncio.wrap_future(DbExecutor.submit(func, *args, **kwargs))
+
+    @staticmethod
+    def stats() -> dict[str, float]:
+        """Gets the queue depth and latencies (in milliseconds) for the most
+        recent tasks.
+        """
+        waits, runs = list(DbExecutor._waits), list(DbExecutor._runs)
+        return {
+            'depth': DbExecutor._queue.qsize(),
+            'processed': DbExecutor._processed,
+            'wait_avg': sum(waits) / len(waits) * 1000 if waits else 0.0,
+            'wait_max': max(waits) * 1000 if waits else 0.0,
+            'run_avg': sum(runs) / len(runs) * 1000 if runs else 0.0,
+            'run_max': max(runs) * 1000 if runs else 0.0,
+        }
+
+    @staticmethod
+    def _execute(future: Future, func: Callable[..., Any],
+                 args: tuple, kwargs: dict) -> None:
+        """Executes a single task, storing the result in the future."""
+        if not future.set_running_or_notify_cancel():
+            return
+
+        started = time.perf_counter()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as err:
+            print(f"DB EXECUTOR EXCEPTION:\n{func.__qualname__}\n\n{err}")
+            future.set_exception(err)
+        finally:
+            DbExecutor._runs.append(time.perf_counter() - started)
+            DbExecutor._processed += 1
+
+    @staticmethod
+    def _work() -> None:
+        """Worker loop, executes tasks until told to stop."""
+        while True:
+            task = DbExecutor._queue.get()
+            if task is None:
+                break
+            future, func, args, kwargs, submitted = task
+            DbExecutor._waits.append(time.perf_counter() - submitted)
+            DbExecutor._execute(future, func, args, kwargs)
+
+
+def on_worker(wait: bool = False):
+    """Decorator that sends the call to the database worker when it is running.
+    If wait is set, the caller blocks until the result is available, otherwise
+    the call returns None immediately.
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not DbExecutor.is_offloaded():
+                return func(*args, **kwargs)
+
+            future = DbExecutor.submit(func, *args, **kwargs)
+            if wait:
+                return future.result()
+            return None
+        return wrapper
+    return decorator
@@ -9,8 +9,15 @@ from .db_socket import DbSocket, clean_name
 # 3 : int - capacity
 # 4 : str - name
 # 5 : str - parent_id
-# 6 : str - items
-InventoryRaw = tuple[int, str, int, int, str, str, str]
+InventoryRaw = tuple[int, str, int, int, str, str]
+
+# 0 : str - inventory_id
+# 1 : str - item_id
+InventoryItemRaw = tuple[str, str]
+
+# 0-5 : InventoryRaw
+# 6   : str - item_id, None for an empty inventory
+InventoryItemRow = tuple[int, str, int, int, str, str, Optional[str]]
 
 
 class InventoryDb(DbSocket):
@@ -19,16 +26,27 @@ class InventoryDb(DbSocket):
     def __init__(self, filename: str) -> None:
         super().__init__(filename)
         self.table_name = clean_name('inventories')
+        self.columns = ('user_id', 'inventory_id', 'type', 'capacity', 'name',
+                        'parent_id')
+        self.primary_key = ('inventory_id',)
+        self.indexes = {'inventories_user': ('user_id',)}
         self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} " \
                                      "( user_id INTEGER DESC, " \
-                                     "inventory_id TEXT, "\
+                                     "inventory_id TEXT PRIMARY KEY, "\
                                      "type INTEGER, "\
                                      "capacity INTEGER, "\
                                      "name TEXT, " \
-                                     "parent_id TEXT, "\
-                                     "items TEXT )"
+                                     "parent_id TEXT )"
         self.query['insert_one'] = "INSERT OR IGNORE INTO {table_name} " \
-                                   "VALUES(?, ?, ?, ?, ?, ?, ?)"
+                                   "VALUES(?, ?, ?, ?, ?, ?)"
+        # Stored inventory ids may still be wrapped in quotes.
+        self.query['find_with_items'] = "SELECT inv.*, link.item_id " \
+                                        "FROM {table_name} AS inv " \
+                                        "LEFT JOIN inventory_items AS link " \
+                                        "ON link.inventory_id = " \
+                                        "trim(inv.inventory_id, '''') " \
+                                        "{condition}" \
+                                        "ORDER BY inv.rowid, link.rowid"
 
     def find_one(self, inventory_id: str) -> Optional[InventoryRaw]:
         """Gets a single inventory based on its id."""
@@ -39,6 +57,21 @@ class InventoryDb(DbSocket):
         """Pulls all inventories from database."""
         return self._find_many()
 
+    def find_all_items(self) -> list[InventoryItemRow]:
+        """Pulls all inventories along with their contents in a single query,
+        one row per item contained.
+        """
+        query = self.query['find_with_items'].replace('{condition}', '')
+        return self._select(query)
+
+    def find_user_items(self, user_id: int) -> list[InventoryItemRow]:
+        """Pulls the inventories belonging to a user along with their
+        contents, one row per item contained.
+        """
+        query = self.query['find_with_items'].replace(
+            '{condition}', 'WHERE inv.user_id = ? ')
+        return self._select(query, (user_id,))
+
     def insert_one(self, raw: InventoryRaw) -> None:
         """Adds one inventory to the database only if it does not exist."""
         self._insert_one(raw)
@@ -47,16 +80,33 @@ class InventoryDb(DbSocket):
         """Updates an inventory in the database, if it does not exist it will
         be created.
         """
-        old = self.find_one(raw[1])
-        if not old:
-            return self.insert_one(raw)
-
-        # Update it here.
-        set_key = f"type = {raw[2]}, " \
-                  f"capacity = {raw[3]}, " \
-                  f"name = {raw[4]}, " \
-                  f"parent_id = {raw[5]}, " \
-                  f"items = {raw[6]}"
-        where_key = f'inventory_id = "{raw[1]}"'
-        self._update(set_key, where_key)
-        return None
+        self._upsert(raw)
+
+
+class InventoryItemDb(DbSocket):
+    """Database manager for the items contained in each inventory."""
+
+    def __init__(self, filename: str) -> None:
+        super().__init__(filename)
+        self.table_name = clean_name('inventory_items')
+        self.columns = ('inventory_id', 'item_id')
+        self.primary_key = ('inventory_id', 'item_id')
+        self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} " \
+                                     "( inventory_id TEXT, " \
+                                     "item_id TEXT, " \
+                                     "PRIMARY KEY (inventory_id, item_id) )"
+        self.query['insert_one'] = "INSERT OR IGNORE INTO {table_name} " \
+                                   "VALUES(?, ?)"
+
+    def insert_one(self, raw: InventoryItemRaw) -> None:
+        """Places an item into an inventory."""
+        self._insert_one(raw)
+
+    def update(self, raw: InventoryItemRaw) -> None:
+        """Places an item into an inventory, nothing else is stored."""
+        self._insert_one(raw)
+
+    def delete_one(self, raw: InventoryItemRaw) -> None:
+        """Takes an item out of an inventory."""
+        where_key = f"inventory_id = '{raw[0]}' AND item_id = '{raw[1]}'"
+        self._delete(where_key)
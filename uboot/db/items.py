@@ -20,8 +20,11 @@ class ItemDb(DbSocket):
     def __init__(self, filename: str) -> None:
         super().__init__(filename)
         self.table_name = clean_name('items')
+        self.columns = ('item_id', 'type', 'name', 'rarity', 'material',
+                        'value', 'uses', 'uses_max')
+        self.primary_key = ('item_id',)
         self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} " \
-                                     "( item_id TEXT, " \
+                                     "( item_id TEXT PRIMARY KEY, " \
                                      "type INTEGER, "\
                                      "name TEXT, "\
                                      "rarity INTEGER, "\
@@ -41,6 +44,19 @@ class ItemDb(DbSocket):
         """Pulls all items from database."""
         return self._find_many()
 
+    def find_many_ids(self, item_ids: list[str]) -> list[ItemRaw]:
+        """Gets several items based on their ids. Stored ids may be wrapped in
+        quotes, both forms are looked up so the primary key is used.
+        """
+        found: list[ItemRaw] = []
+        for n in range(0, len(item_ids), 400):
+            chunk = item_ids[n:n + 400]
+            params = tuple(chunk) + tuple(f"'{item_id}'" for item_id in chunk)
+            marks = ', '.join('?' for _ in params)
+            query = f"SELECT * FROM {{table_name}} WHERE item_id IN ({marks})"
+            found.extend(self._select(query, params))
+        return found
+
     def insert_one(self, raw: ItemRaw) -> None:
         """Adds one item to the database only if it does not exist."""
         self._insert_one(raw)
@@ -49,23 +65,10 @@ class ItemDb(DbSocket):
         """Updates an item in the database, if it does not exist it will
         be created.
         """
-        old = self.find_one(raw[0])
-        if not old:
-            return self.insert_one(raw)
-
-        # Update it here.
-        set_key = f"type = {raw[1]}, " \
-                  f"name = {raw[2]}, " \
-                  f"rarity = {raw[3]}, " \
-                  f"material = {raw[4]}, " \
-                  f"value = {raw[5]}, " \
-                  f"uses = {raw[6]}, " \
-                  f"uses_max = {raw[7]}"
-        where_key = f'item_id = "{raw[0]}"'
-        self._update(set_key, where_key)
-        return None
+        self._upsert(raw)
 
     def delete_one(self, raw: ItemRaw) -> None:
         """Removes an item from database."""
+        self._forget(self._key(raw))
         where_key = f'item_id = "{raw[0]}"'
         self._delete(where_key)
@@ -0,0 +1,196 @@
+"""Compressed archive of old logs. Logs past the retention period are moved out
+of the database into one gzip compressed segment per month, each line being a
+JSON encoded LogRow. Segments are append-only and can still be searched, an
+index next to each segment records which guilds, users and types every
+appended member holds so only those members are decompressed.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Iterator, Optional
+
+from .logs import LogRow
+
+# Position of the searchable fields within a LogRow.
+FIELDS: dict[str, int] = {'user_id': 2, 'type': 3}
+
+# Compressed member within a segment: (byte offset, byte length, keys)
+Member = tuple[int, int, set[str]]
+
+
+def row_month(row: LogRow) -> str:
+    """Gets the month ('YYYY-MM') that a log belongs to."""
+    return row[4].strip("'")[:7]
+
+
+def search_key(guild_id: int, field: str, value: int) -> str:
+    """Gets the key an index stores for a searchable value within a guild."""
+    return f"{guild_id}:{field}:{value}"
+
+
+def row_keys(row: LogRow) -> set[str]:
+    """Gets every key a log can be searched by."""
+    return {search_key(row[1], field, row[index])
+            for field, index in FIELDS.items()}
+
+
+def parse_rows(data: bytes) -> list[LogRow]:
+    """Decodes the logs within decompressed segment data, oldest first."""
+    lines = data.decode('utf-8').split('\n')
+    return [tuple(json.loads(line)) for line in lines if line.strip()]
+
+
+class LogArchive:
+    """Compressed monthly segments of archived logs."""
+
+    def __init__(self, directory: str = "dbs/archive") -> None:
+        self.directory = directory
+        self._indexes: dict[str, list[Member]] = {}  # Month => Members
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def segment(self, month: str) -> str:
+        """Gets the filename for a month's segment."""
+        return os.path.join(self.directory, f"logs-{month}.jsonl.gz")
+
+    def months(self) -> list[str]:
+        """Gets all months that have a segment, oldest first."""
+        months: list[str] = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith("logs-") and filename.endswith(".jsonl.gz"):
+                months.append(filename[5:-9])
+        return sorted(months)
+
+    def index_file(self, month: str) -> str:
+        """Gets the filename for the index of a month's segment."""
+        return os.path.join(self.directory, f"logs-{month}.idx.json")
+
+    def index(self, month: str) -> list[Member]:
+        """Gets the members of a month's segment, oldest first. Data appended
+        without being indexed, such as by older versions, is indexed as a
+        single member.
+        """
+        members = self._indexes.get(month)
+        if members is None:
+            members = []
+            index_file = self.index_file(month)
+            if os.path.exists(index_file):
+                with open(index_file, 'r', encoding='utf-8') as file:
+                    members = [(offset, length, set(keys))
+                               for offset, length, keys in json.load(file)]
+            self._indexes[month] = members
+
+        filename = self.segment(month)
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        covered = members[-1][0] + members[-1][1] if members else 0
+        if size > covered:
+            with open(filename, 'rb') as file:
+                file.seek(covered)
+                rows = parse_rows(gzip.decompress(file.read()))
+            keys: set[str] = set()
+            for row in rows:
+                keys |= row_keys(row)
+            members.append((covered, size - covered, keys))
+            self._save_index(month)
+        return members
+
+    def _save_index(self, month: str) -> None:
+        """Writes the index of a month's segment, replacing the old one."""
+        filename = self.index_file(month)
+        members = [(offset, length, sorted(keys))
+                   for offset, length, keys in self._indexes.get(month, [])]
+        with open(f"{filename}.tmp", 'w', encoding='utf-8') as file:
+            json.dump(members, file)
+        os.replace(f"{filename}.tmp", filename)
+
+    def write(self, rows: list[LogRow]) -> int:
+        """Appends logs to the segments for their months. Returns the amount
+        of logs written.
+        """
+        by_month: dict[str, list[LogRow]] = {}
+        for row in rows:
+            by_month.setdefault(row_month(row), []).append(row)
+
+        for month, month_rows in by_month.items():
+            members = self.index(month)
+            data = ''.join(f"{json.dumps(row)}\n" for row in month_rows)
+            keys: set[str] = set()
+            for row in month_rows:
+                keys |= row_keys(row)
+
+            # Each append is a new gzip member, readers see them as one.
+            with open(self.segment(month), 'ab') as file:
+                offset = file.tell()
+                file.write(gzip.compress(data.encode('utf-8')))
+                members.append((offset, file.tell() - offset, keys))
+            self._save_index(month)
+        return len(rows)
+
+    def read(self, month: str) -> list[LogRow]:
+        """Reads every log within a month's segment, oldest first."""
+        filename = self.segment(month)
+        if not os.path.exists(filename):
+            return []
+
+        rows: list[LogRow] = []
+        with gzip.open(filename, 'rt', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    rows.append(tuple(json.loads(line)))
+        return rows
+
+    def search(self, month: str, key: str) -> Iterator[LogRow]:
+        """Iterates over the logs of a month's segment that may match a key,
+        newest first. Only the members holding the key are decompressed.
+        """
+        members = self.index(month)
+        if not members:
+            return
+
+        with open(self.segment(month), 'rb') as file:
+            for offset, length, keys in reversed(members):
+                if key not in keys:
+                    continue
+                file.seek(offset)
+                yield from reversed(parse_rows(gzip.decompress(
+                    file.read(length))))
+
+    def find(self, guild_id: int, field: str, value: int,
+             limit: int, offset: int = 0, before_id: int = 0,
+             since: Optional[datetime] = None,
+             until: Optional[datetime] = None) -> list[LogRow]:
+        """Searches the segments from the newest month backwards for logs
+        matching the guild and field, newest first. Stops reading once the
+        page is full.
+        """
+        index = FIELDS[field]
+        key = search_key(guild_id, field, value)
+        since_text = since.replace(microsecond=0).isoformat() if since else ''
+        until_text = until.replace(microsecond=0).isoformat() if until else ''
+
+        found: list[LogRow] = []
+        for month in reversed(self.months()):
+            if since_text and month < since_text[:7]:
+                break
+            if until_text and month > until_text[:7]:
+                continue
+
+            for row in self.search(month, key):
+                if row[1] != guild_id or row[index] != value:
+                    continue
+                if before_id > 0 and row[0] >= before_id:
+                    continue
+                timestamp = row[4].strip("'")
+                if since_text and timestamp < since_text:
+                    continue
+                if until_text and timestamp >= until_text:
+                    continue
+
+                if offset > 0:
+                    offset -= 1
+                    continue
+                found.append(row)
+                if len(found) >= limit:
+                    return found
+        return found
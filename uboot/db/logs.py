@@ -1,7 +1,13 @@
 """Database manager for Log settings."""
-from typing import Optional
+import os
+from datetime import datetime
+from typing import Optional, TYPE_CHECKING
 
 from .db_socket import DbSocket, clean_name
+from .executor import on_worker
+
+if TYPE_CHECKING:
+    from .log_archive import LogArchive
 
 # 0 : int - guild_id
 # 1 : int - user_id
@@ -10,30 +16,158 @@ from .db_socket import DbSocket, clean_name
 # 4 : str - message
 LogRaw = tuple[int, int, int, str, str]
 
+# 0 : int - id (rowid)
+# 1-5     - LogRaw
+LogRow = tuple[int, int, int, int, str, str]
+
 
 class LogDb(DbSocket):
     """Database manager for logs."""
 
-    def __init__(self, filename: str) -> None:
+    def __init__(self, filename: str,
+                 archive: Optional['LogArchive'] = None) -> None:
         super().__init__(filename)
+        self.archive = archive
         self.table_name = clean_name('logs')
         self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} "\
             "( guild_id INTEGER, "\
             "user_id INTEGER, type INTEGER, "\
             "timestamp TEXT, message TEXT )"
+        self.indexes = {'logs_guild_type': ('guild_id', 'type'),
+                        'logs_guild_user': ('guild_id', 'user_id')}
         self.query['insert_one'] = "INSERT OR IGNORE INTO {table_name} "\
             "VALUES(?, ?, ?, ?, ?)"
+        self.query['insert_many'] = "INSERT INTO {table_name} "\
+            "VALUES(?, ?, ?, ?, ?)"
         self.query['find_many'] = "SELECT * FROM {table_name} WHERE "
+        self.query['find_page'] = "SELECT rowid, * FROM {table_name} "\
+            "WHERE {condition} ORDER BY rowid DESC LIMIT ? OFFSET ?"
+        self.query['count'] = "SELECT COUNT(*) FROM {table_name} "\
+            "WHERE {condition}"
+        # Timestamps are stored quoted, bounds are compared without them.
+        self.query['find_expired'] = "SELECT rowid, * FROM {table_name} "\
+            "WHERE trim(timestamp, '''') < ? ORDER BY rowid LIMIT ?"
+        self.query['delete_expired'] = "DELETE FROM {table_name} "\
+            "WHERE trim(timestamp, '''') < ? AND rowid <= ?"
+
+    @on_worker(wait=True)
+    def find_guild_type(self, guild_id: int, logtype: int,
+                        limit: int = 10, offset: int = 0,
+                        before_id: int = 0,
+                        since: Optional[datetime] = None,
+                        until: Optional[datetime] = None) -> list[LogRow]:
+        """Finds guild logs based on type, newest first. Continues into the
+        archive once the database runs out of logs.
+        """
+        return self._find_page("guild_id = ? AND type = ?",
+                               [guild_id, logtype], 'type', logtype,
+                               limit, offset, before_id, since, until)
+
+    @on_worker(wait=True)
+    def find_guild_user(self, guild_id: int, user_id: int,
+                        limit: int = 10, offset: int = 0,
+                        before_id: int = 0,
+                        since: Optional[datetime] = None,
+                        until: Optional[datetime] = None) -> list[LogRow]:
+        """Finds guild logs based on a user id, newest first. Continues into
+        the archive once the database runs out of logs.
+        """
+        return self._find_page("guild_id = ? AND user_id = ?",
+                               [guild_id, user_id], 'user_id', user_id,
+                               limit, offset, before_id, since, until)
+
+    def _find_page(self, condition: str, params: list,
+                   field: str, value: int,
+                   limit: int, offset: int, before_id: int,
+                   since: Optional[datetime],
+                   until: Optional[datetime]) -> list[LogRow]:
+        """Gets a single page of logs walking the index backwards from the
+        newest. Passing the id of the last log seen as 'before_id' gets the
+        next page without skipping over rows like an offset does.
+        """
+        limit, offset = max(limit, 0), max(offset, 0)
+        if before_id > 0:
+            condition += " AND rowid < ?"
+            params.append(before_id)
+
+        # Timestamps are stored quoted, bounds are compared without them.
+        if since:
+            condition += " AND trim(timestamp, '''') >= ?"
+            params.append(since.replace(microsecond=0).isoformat())
+        if until:
+            condition += " AND trim(timestamp, '''') < ?"
+            params.append(until.replace(microsecond=0).isoformat())
 
-    def find_guild_type(self, guild_id: int, logtype: int) -> list[LogRaw]:
-        """Finds guild logs based on type."""
-        where_key = f"guild_id = {guild_id} AND type = {logtype}"
-        return self._find_many(where_key)
+        query = self.query['find_page'].replace('{condition}', condition)
+        rows: list[LogRow] = self._select(query,
+                                          tuple(params + [limit, offset]))
+        if len(rows) >= limit or not self.archive:
+            return rows
 
-    def find_guild_user(self, guild_id: int, user_id: int) -> list[LogRaw]:
-        """Finds guild logs based on a user id."""
-        where_key = f"guild_id = {guild_id} AND user_id = {user_id}"
-        return self._find_many(where_key)
+        # Skip the logs the offset already covered within the database.
+        query = self.query['count'].replace('{condition}', condition)
+        total = self._select(query, tuple(params))[0][0]
+        return rows + self.archive.find(guild_id=params[0], field=field,
+                                        value=value,
+                                        limit=limit - len(rows),
+                                        offset=max(offset - total, 0),
+                                        before_id=before_id,
+                                        since=since, until=until)
+
+    @on_worker(wait=True)
+    def rotate(self, cutoff: datetime, chunk: int = 5000) -> int:
+        """Moves up to a chunk of the oldest logs older than the cutoff into
+        the archive. Logs are written to the archive before they are removed.
+        Returns the amount of logs moved, fewer than the chunk once none are
+        left.
+        """
+        if not self.archive:
+            return 0
+
+        bound = cutoff.replace(microsecond=0).isoformat()
+        rows: list[LogRow] = self._select(self.query['find_expired'],
+                                          (bound, chunk))
+        if not rows:
+            return 0
+
+        self.archive.write(rows)
+        query = self.query['delete_expired'].format(table_name=self.table_name)
+        self._cursor.execute(query, (bound, rows[-1][0]))
+        self._commit()
+        return len(rows)
+
+    @on_worker(wait=True)
+    def import_legacy(self, filename: str) -> int:
+        """Moves the logs stored in another database file into this one, used
+        since logs were previously stored with the rest of the data. Returns
+        the amount of logs moved.
+        """
+        path = f"dbs/{filename}"
+        if not os.path.exists(path) or path == f"dbs/{self.db_name}":
+            return 0
+
+        self._session.commit()
+        self._cursor.execute("ATTACH DATABASE ? AS legacy", (path,))
+        try:
+            exists = self._cursor.execute(
+                "SELECT name FROM legacy.sqlite_master WHERE type = 'table' "
+                "AND name = ?", (self.table_name,)).fetchone()
+            if not exists:
+                return 0
+
+            self._cursor.execute("BEGIN")
+            self._cursor.execute(
+                f"INSERT INTO {self.table_name} "
+                f"SELECT * FROM legacy.{self.table_name} ORDER BY rowid")
+            moved = self._cursor.rowcount
+            self._cursor.execute(f"DROP TABLE legacy.{self.table_name}")
+            self._session.commit()
+            return moved
+        except BaseException:
+            self._session.rollback()
+            raise
+        finally:
+            self._cursor.execute("DETACH DATABASE legacy")
 
     def find_one(self, guild_id: int) -> Optional[LogRaw]:
         """Gets a single log based on its guild id."""
@@ -43,3 +177,7 @@ class LogDb(DbSocket):
     def insert_one(self, raw: LogRaw) -> None:
         """Adds one log to the database only if it does not exist."""
         self._insert_one(raw)
+
+    def insert_many(self, raws: list[LogRaw]) -> None:
+        """Adds several logs to the database in a single transaction."""
+        self._insert_many(raws)
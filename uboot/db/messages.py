@@ -0,0 +1,31 @@
+"""Database manager for the message times of users."""
+from .db_socket import DbSocket, clean_name
+
+# 0 : int   - user_id
+# 1 : float - last_message, seconds since the epoch
+MessageRaw = tuple[int, float]
+
+
+class MessageDb(DbSocket):
+    """Database manager for the time of the last message of every user."""
+
+    def __init__(self, filename: str) -> None:
+        super().__init__(filename)
+        self.table_name = clean_name('message_times')
+        self.columns = ('user_id', 'last_message')
+        self.primary_key = ('user_id',)
+        self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} "\
+            "( user_id INTEGER PRIMARY KEY, last_message REAL )"
+        self.query['insert_many'] = "INSERT INTO {table_name} "\
+            "VALUES(?, ?) ON CONFLICT (user_id) "\
+            "DO UPDATE SET last_message = excluded.last_message"
+
+    def find_all(self) -> list[MessageRaw]:
+        """Pulls the message time of every user from database."""
+        return self._find_many()
+
+    def update_many(self, raws: list[MessageRaw]) -> None:
+        """Stores the message times of several users in one statement,
+        replacing the times already stored.
+        """
+        self._insert_many(raws)
@@ -0,0 +1,230 @@
+"""Versioned schema migrations. Every database file tracks the last migration
+applied in its 'schema_version' table, pending migrations are applied in order
+when the connection is opened. Each migration runs inside of its own
+transaction along with the version bump, so a failure leaves the database
+exactly as it was.
+
+Migrations describe the schema at the time they were written and should never
+be changed once released, add a new one instead.
+"""
+import json
+import sqlite3
+from typing import Callable, Optional
+
+
+class Migration:
+    """A single ordered step from one schema version to the next."""
+
+    def __init__(self, version: int, description: str,
+                 apply: Callable[[sqlite3.Cursor], None]) -> None:
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+    def __str__(self) -> str:
+        """Overrides str to display the version and description."""
+        return f"v{self.version}: {self.description}"
+
+
+def table_exists(cursor: sqlite3.Cursor, table: str) -> bool:
+    """Checks if a table exists."""
+    query = "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return cursor.execute(query, (table,)).fetchone() is not None
+
+
+def table_columns(cursor: sqlite3.Cursor, table: str) -> list[str]:
+    """Gets the column names of a table, in order."""
+    return [col[1] for col in cursor.execute(f"PRAGMA table_info({table})")]
+
+
+def table_keys(cursor: sqlite3.Cursor, table: str) -> tuple[str, ...]:
+    """Gets the primary key columns of a table, in key order."""
+    info = cursor.execute(f"PRAGMA table_info({table})").fetchall()
+    return tuple(col[1] for col in sorted(info, key=lambda c: c[5])
+                 if col[5] > 0)
+
+
+def rebuild_table(cursor: sqlite3.Cursor, table: str, create_sql: str,
+                  keys: tuple[str, ...] = (),
+                  indexes: Optional[dict[str, tuple[str, ...]]] = None) -> int:
+    """Recreates a table with a new layout, copying every column both layouts
+    share. If keys are provided, only the newest row of every duplicated key is
+    kept. Indexes are recreated afterwards. Must be called inside of a
+    transaction, returns the amount of rows copied.
+    """
+    old_table = f"{table}_old"
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+    cursor.execute(create_sql)
+
+    old_columns = set(table_columns(cursor, old_table))
+    columns = ', '.join(col for col in table_columns(cursor, table)
+                        if col in old_columns)
+
+    where = ''
+    if keys:
+        where = f" WHERE rowid IN (SELECT MAX(rowid) FROM {old_table} " \
+                f"GROUP BY {', '.join(keys)})"
+    cursor.execute(f"INSERT INTO {table} ({columns}) "
+                   f"SELECT {columns} FROM {old_table}{where}")
+    copied = cursor.rowcount
+
+    # Make sure nothing was lost before removing the old table.
+    expected_query = f"SELECT COUNT(*) FROM {old_table}"
+    if keys:
+        expected_query = f"SELECT COUNT(*) FROM (SELECT 1 FROM {old_table} " \
+                         f"GROUP BY {', '.join(keys)})"
+    expected = cursor.execute(expected_query).fetchone()[0]
+    if copied != expected:
+        raise sqlite3.DatabaseError(f"rebuild of '{table}' copied {copied} "
+                                    f"rows, expected {expected}.")
+
+    cursor.execute(f"DROP TABLE {old_table}")
+    for name, index_columns in (indexes or {}).items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+                       f"({', '.join(index_columns)})")
+    return copied
+
+
+def _users_streamer(cursor: sqlite3.Cursor) -> None:
+    """Adds the streamer columns to users."""
+    if not table_exists(cursor, 'users'):
+        return
+
+    columns = table_columns(cursor, 'users')
+    if 'is_streamer' not in columns:
+        cursor.execute("ALTER TABLE users "
+                       "ADD COLUMN is_streamer INTEGER DEFAULT 0")
+    if 'stream_name' not in columns:
+        cursor.execute("ALTER TABLE users "
+                       "ADD COLUMN stream_name TEXT DEFAULT ''")
+
+
+def _primary_keys(cursor: sqlite3.Cursor) -> None:
+    """Rebuilds the tables that were created without a primary key."""
+    tables: dict[str, tuple[tuple[str, ...], str]] = {
+        'items': (('item_id',),
+                  "CREATE TABLE items ( item_id TEXT PRIMARY KEY, "
+                  "type INTEGER, name TEXT, rarity INTEGER, material INTEGER, "
+                  "value INTEGER, uses INTEGER, uses_max INTEGER )"),
+        'inventories': (('inventory_id',),
+                        "CREATE TABLE inventories ( user_id INTEGER DESC, "
+                        "inventory_id TEXT PRIMARY KEY, type INTEGER, "
+                        "capacity INTEGER, name TEXT, parent_id TEXT, "
+                        "items TEXT )"),
+        'aliases': (('id', 'guild_id'),
+                    "CREATE TABLE aliases ( id INTEGER DESC, "
+                    "guild_id INTEGER, msg_id INTEGER, name TEXT, "
+                    "owner_id INTEGER, PRIMARY KEY (id, guild_id) )"),
+        'sub_guilds': (('id', 'guild_id'),
+                       "CREATE TABLE sub_guilds ( id INTEGER DESC, "
+                       "guild_id INTEGER, name TEXT, owner_id INTEGER, "
+                       "thread_id INTEGER, msg_id INTEGER, "
+                       "disabled INTEGER DEFAULT 0, banned TEXT, "
+                       "PRIMARY KEY (id, guild_id) )"),
+        'tickets': (('guild_id', 'id'),
+                    "CREATE TABLE tickets ( guild_id INTEGER DESC, "
+                    "id INTEGER, title TEXT, done INTEGER DEFAULT 0, "
+                    "owner_id INTEGER, PRIMARY KEY (guild_id, id) )"),
+    }
+
+    for table, (keys, create_sql) in tables.items():
+        if not table_exists(cursor, table):
+            continue
+        if table_keys(cursor, table) != keys:
+            # Unique indexes from the old layout are dropped with the table.
+            rebuild_table(cursor, table, create_sql, keys)
+
+
+def _log_indexes(cursor: sqlite3.Cursor) -> None:
+    """Indexes the log lookups by guild and type or user."""
+    if not table_exists(cursor, 'logs'):
+        return
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS logs_guild_type "
+                   "ON logs (guild_id, type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS logs_guild_user "
+                   "ON logs (guild_id, user_id)")
+
+
+def _inventory_items(cursor: sqlite3.Cursor) -> None:
+    """Moves the JSON item lists of inventories into the inventory_items
+    relation and drops the old column.
+    """
+    if not table_exists(cursor, 'inventories'):
+        return
+    if 'items' not in table_columns(cursor, 'inventories'):
+        return
+
+    cursor.execute("CREATE TABLE IF NOT EXISTS inventory_items "
+                   "( inventory_id TEXT, item_id TEXT, "
+                   "PRIMARY KEY (inventory_id, item_id) )")
+
+    links: list[tuple[str, str]] = []
+    rows = cursor.execute("SELECT inventory_id, items FROM inventories "
+                          "ORDER BY rowid").fetchall()
+    for inventory_id, items in rows:
+        if not items:
+            continue
+        inventory_id = str(inventory_id).replace("'", "")
+        for item_id in json.loads(items.replace("'", "")):
+            links.append((inventory_id, item_id))
+    cursor.executemany("INSERT OR IGNORE INTO inventory_items VALUES(?, ?)",
+                       links)
+
+    rebuild_table(cursor, 'inventories',
+                  "CREATE TABLE inventories ( user_id INTEGER DESC, "
+                  "inventory_id TEXT PRIMARY KEY, type INTEGER, "
+                  "capacity INTEGER, name TEXT, parent_id TEXT )")
+
+
+# All migrations, in the order they are applied.
+MIGRATIONS: list[Migration] = [
+    Migration(1, "streamer columns for users", _users_streamer),
+    Migration(2, "primary keys for items, inventories, aliases, sub_guilds "
+              "and tickets", _primary_keys),
+    Migration(3, "indexes for logs", _log_indexes),
+    Migration(4, "inventory_items relation for inventory contents",
+              _inventory_items),
+]
+
+
+class Migrator:
+    """Applies the pending migrations to a database."""
+
+    @staticmethod
+    def version(session: sqlite3.Connection) -> int:
+        """Gets the current schema version of the database."""
+        session.execute("CREATE TABLE IF NOT EXISTS schema_version "
+                        "( version INTEGER NOT NULL )")
+        row = session.execute("SELECT MAX(version) FROM schema_version"
+                              ).fetchone()
+        return row[0] if row and row[0] is not None else 0
+
+    @staticmethod
+    def apply(session: sqlite3.Connection,
+              migrations: Optional[list[Migration]] = None) -> int:
+        """Applies all migrations newer than the database's version, each one
+        in its own transaction. Returns the resulting version.
+        """
+        migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+        session.commit()
+        current = Migrator.version(session)
+        session.commit()
+
+        for migration in migrations:
+            if migration.version <= current:
+                continue
+
+            cursor = session.cursor()
+            try:
+                cursor.execute("BEGIN")
+                migration.apply(cursor)
+                cursor.execute("INSERT INTO schema_version VALUES(?)",
+                               (migration.version,))
+                session.commit()
+            except BaseException as err:
+                session.rollback()
+                raise sqlite3.DatabaseError(
+                    f"migration {migration} failed: {err}") from err
+            current = migration.version
+        return current
@@ -16,6 +16,8 @@ class RoleDb(DbSocket):
     def __init__(self, filename: str) -> None:
         super().__init__(filename)
         self.table_name = clean_name('react_roles')
+        self.columns = ('role_id', 'guild_id', 'reaction', 'reversed')
+        self.primary_key = ('role_id',)
         self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} "\
             "( role_id INTEGER PRIMARY KEY DESC, "\
             "guild_id INTEGER, reaction TEXT, reversed INTEGER )"
@@ -39,16 +41,10 @@ class RoleDb(DbSocket):
         """Updates a pair in the database, if it does not exist it will
         be created.
         """
-        old = self.find_one(raw[0])
-        if not old:
-            return self.insert_one(raw)
-
-        set_key = f"reaction = {raw[2]}, reversed = {raw[3]}"
-        where_key = f"role_id = {raw[0]}"
-        self._update(set_key, where_key)
-        return None
+        self._upsert(raw)
 
     def delete_one(self, raw: ReactRoleRaw) -> None:
         """Removes a pair from database."""
+        self._forget(self._key(raw))
         where_key = f"role_id = {raw[0]} AND guild_id = {raw[1]}"
         self._delete(where_key)
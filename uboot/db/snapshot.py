@@ -0,0 +1,151 @@
+"""Binary snapshot of the rows the managers load on start. Written on a clean
+shutdown once every change is stored, then memory mapped on the next start
+instead of querying the database. A snapshot is only used when the database
+file is exactly as it was when the snapshot was written, anything else falls
+back to the database. Rows changed after the capture, even by this process,
+keep the snapshot from being written.
+
+Layout: header (magic, version, database size, database mtime, checksum)
+followed by the marshalled rows, keyed by name.
+"""
+import marshal
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, Optional
+
+from .connection import ConnectionManager
+
+MAGIC: bytes = b'UBOOTSNP'
+VERSION: int = 1
+# magic, version, db size, db mtime (ns), crc32 of the payload
+HEADER = struct.Struct('<8sHqqI')
+
+
+def snapshot_path(filename: str) -> str:
+    """Gets the snapshot file for a database file."""
+    return f"dbs/{os.path.splitext(filename)[0]}.snapshot"
+
+
+def high_water_mark(filename: str) -> Optional[tuple[int, int]]:
+    """Gets the size and modification time of a closed database file. None if
+    it is missing or has changes that are not checkpointed yet.
+    """
+    path = f"dbs/{filename}"
+    wal = f"{path}-wal"
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(wal) and os.path.getsize(wal) > 0:
+        return None
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Snapshot:
+    """Rows loaded from a snapshot file."""
+    enabled: bool = True
+    # Filename => (Rows, changes made on the connection when captured)
+    _captured: dict[str, tuple[dict[str, list[Any]], int]] = {}
+
+    def __init__(self, rows: dict[str, list[Any]]) -> None:
+        self._rows = rows
+
+    def rows(self, name: str) -> Optional[list[Any]]:
+        """Gets the rows stored under a name, None if they were not stored."""
+        return self._rows.get(name, None)
+
+    @staticmethod
+    def configure(enabled: bool) -> None:
+        """Sets if snapshots are written and loaded."""
+        Snapshot.enabled = enabled
+
+    @staticmethod
+    def capture(filename: str, rows: dict[str, list[Any]]) -> None:
+        """Holds the rows of a database to be written once its connection is
+        closed. Must be called after every change has been stored.
+        """
+        if Snapshot.enabled:
+            Snapshot._captured[filename] = \
+                (rows, ConnectionManager.changes(filename))
+
+    @staticmethod
+    def write_captured() -> int:
+        """Writes the snapshots for every captured database, the connections
+        have to be closed. Databases changed since their capture are skipped.
+        Returns the amount written.
+        """
+        written: int = 0
+        for filename, (rows, changes) in Snapshot._captured.items():
+            if ConnectionManager.changes(filename) != changes:
+                continue
+            if Snapshot.write(filename, rows):
+                written += 1
+        Snapshot._captured = {}
+        return written
+
+    @staticmethod
+    def write(filename: str, rows: dict[str, list[Any]]) -> bool:
+        """Writes the snapshot for a closed database file."""
+        mark = high_water_mark(filename)
+        if not mark:
+            return False
+
+        payload = marshal.dumps(rows)
+        header = HEADER.pack(MAGIC, VERSION, mark[0], mark[1],
+                             zlib.crc32(payload))
+
+        # Replace the old snapshot in a single step.
+        path = snapshot_path(filename)
+        temp = f"{path}.tmp"
+        try:
+            with open(temp, 'wb') as file:
+                file.write(header)
+                file.write(payload)
+            os.replace(temp, path)
+        except OSError as err:
+            print(f"SNAPSHOT EXCEPTION:\nWriting '{path}'\n\n{err}")
+            return False
+        return True
+
+    @staticmethod
+    def load(filename: str) -> Optional['Snapshot']:
+        """Loads the snapshot for a database file if it is still valid. The
+        snapshot is removed afterwards, it would be stale after any write.
+        """
+        path = snapshot_path(filename)
+        if not Snapshot.enabled or not os.path.exists(path):
+            return None
+
+        try:
+            rows = Snapshot._read(path, high_water_mark(filename))
+        except (OSError, ValueError, EOFError, TypeError) as err:
+            print(f"SNAPSHOT EXCEPTION:\nReading '{path}'\n\n{err}")
+            rows = None
+
+        os.remove(path)
+        return Snapshot(rows) if rows is not None else None
+
+    @staticmethod
+    def _read(path: str,
+              mark: Optional[tuple[int, int]]) -> Optional[dict[str, list]]:
+        """Reads and validates a snapshot file."""
+        if not mark or os.path.getsize(path) < HEADER.size:
+            return None
+
+        with open(path, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, size, mtime, checksum = \
+                HEADER.unpack_from(data, 0)
+            if magic != MAGIC or version != VERSION or (size, mtime) != mark:
+                return None
+
+            payload = memoryview(data)[HEADER.size:]
+            try:
+                if zlib.crc32(payload) != checksum:
+                    return None
+                rows = marshal.loads(payload)
+            finally:
+                payload.release()
+
+        return rows if isinstance(rows, dict) else None
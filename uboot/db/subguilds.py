@@ -20,10 +20,13 @@ class SubGuildDb(DbSocket):
     def __init__(self, filename: str) -> None:
         super().__init__(filename)
         self.table_name = clean_name('sub_guilds')
+        self.columns = ('id', 'guild_id', 'name', 'owner_id', 'thread_id',
+                        'msg_id', 'disabled', 'banned')
+        self.primary_key = ('id', 'guild_id')
         self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} "\
             "( id INTEGER DESC, guild_id INTEGER, name TEXT, owner_id INTEGER, "\
             "thread_id INTEGER, msg_id INTEGER, disabled INTEGER DEFAULT 0, "\
-            "banned TEXT )"
+            "banned TEXT, PRIMARY KEY (id, guild_id) )"
         self.query['find_one'] = "SELECT * FROM {table_name} WHERE "\
             "{condition}"
         self.query['insert_one'] = "INSERT OR IGNORE INTO {table_name} "\
@@ -57,17 +60,4 @@ class SubGuildDb(DbSocket):
         """Updates a subguild in the database, if it does not exist it will
         be created.
         """
-        old = self.find_one(raw[0], raw[1])
-        if not old:
-            return self.insert_one(raw)
-
-        # Update it here.
-        set_key = f"name = {raw[2]}, "\
-            f"owner_id = {raw[3]}, "\
-            f"thread_id = {raw[4]}, "\
-            f"msg_id = {raw[5]}, "\
-            f"disabled = {raw[6]}, "\
-            f"banned = {raw[7]}"
-        where_key = f"id = {raw[0]} AND guild_id = {raw[1]}"
-        self._update(set_key, where_key)
-        return None
+        self._upsert(raw)
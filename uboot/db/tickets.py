@@ -17,9 +17,12 @@ class TicketDb(DbSocket):
     def __init__(self, filename: str) -> None:
         super().__init__(filename)
         self.table_name = clean_name('tickets')
+        self.columns = ('guild_id', 'id', 'title', 'done', 'owner_id')
+        self.primary_key = ('guild_id', 'id')
         self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} "\
             "( guild_id INTEGER DESC, id INTEGER, "\
-            "title TEXT, done INTEGER DEFAULT 0, owner_id INTEGER )"
+            "title TEXT, done INTEGER DEFAULT 0, owner_id INTEGER, "\
+            "PRIMARY KEY (guild_id, id) )"
         self.query['find_one'] = "SELECT * FROM {table_name} WHERE "\
             "{condition}"
         self.query['insert_one'] = "INSERT OR IGNORE INTO {table_name} "\
@@ -50,12 +53,4 @@ class TicketDb(DbSocket):
         """Updates a ticket in the database, if it does not exist it will
         be created.
         """
-        old = self.find_one(raw[0], raw[1])
-        if not old:
-            return self.insert_one(raw)
-
-        # Update it here.
-        set_key = f"done = {raw[3]}"
-        where_key = f"guild_id = {raw[0]} AND id = {raw[1]}"
-        self._update(set_key, where_key)
-        return None
+        self._upsert(raw)
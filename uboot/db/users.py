@@ -31,6 +31,11 @@ class UserDb(DbSocket):
     def __init__(self, filename: str) -> None:
         super().__init__(filename)
         self.table_name = clean_name('users')
+        self.columns = ('id', 'gold', 'msg_count', 'gambles', 'gambles_won',
+                        'button_press', 'monsters', 'kills', 'exp',
+                        'locations', 'c_location', 'deaths', 'weapon',
+                        'c_floor', 'is_streamer', 'stream_name')
+        self.primary_key = ('id',)
         self.query['create_table'] = "CREATE TABLE IF NOT EXISTS {table_name} "\
             "( id INTEGER PRIMARY KEY DESC, "\
             "gold INTEGER, msg_count INTEGER, "\
@@ -55,6 +60,27 @@ class UserDb(DbSocket):
         """Pulls all users from database."""
         return self._find_many()
 
+    def find_all_stats(self) -> list[tuple]:
+        """Pulls all users from database along with the material of their
+        weapon, None if they do not have one.
+        """
+        query = "SELECT user.*, item.material FROM {table_name} AS user "\
+                "LEFT JOIN items AS item ON item.item_id = user.weapon"
+        return self._select(query)
+
+    def find_streamers(self) -> list[tuple[int, str]]:
+        """Pulls the id and stream name of every streamer."""
+        query = "SELECT id, stream_name FROM {table_name} "\
+                "WHERE is_streamer != 0"
+        return self._select(query)
+
+    def sum_lost_gold(self, bot_id: int) -> float:
+        """Sums the gold every user has lost below their message count."""
+        query = "SELECT COALESCE(SUM(msg_count - gold), 0) FROM {table_name} "\
+                "WHERE gold >= 0 AND gold < msg_count AND id != ?"
+        res = self._select(query, (bot_id,))
+        return res[0][0] if res else 0
+
     def insert_one(self, raw: UserRaw) -> None:
         """Adds one user to the database only if it does not exist."""
         self._insert_one(raw)
@@ -63,21 +89,4 @@ class UserDb(DbSocket):
         """Updates a user in the database, if it does not exist it will
         be created.
         """
-        old = self.find_one(raw[0])
-        if not old:
-            return self.insert_one(raw)
-
-        # Update it here.
-        set_key = f"gold = {raw[1]}, msg_count = {raw[2]}, "\
-            f"gambles = {raw[3]}, gambles_won = {raw[4]}, "\
-            f"button_press = {raw[5]}, "\
-            f"monsters = {raw[6]}, kills = {raw[7]}, exp = {raw[8]}, "\
-            f"locations = {raw[9]}, c_location = {raw[10]}, "\
-            f"deaths = {raw[11]}, "\
-            f"weapon = {raw[12]}, "\
-            f"c_floor = {raw[13]}, "\
-            f"is_streamer = {raw[14]}, "\
-            f"stream_name = {raw[15]}"
-        where_key = f"id = {raw[0]}"
-        self._update(set_key, where_key)
-        return None
+        self._upsert(raw)
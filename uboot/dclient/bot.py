@@ -11,16 +11,19 @@ from discord import RawReactionActionEvent
 from discord.ext import commands, tasks
 
 from config import DiscordConfig, TwitchConfig
+from db.db_socket import DbSocket
+from db.executor import DbExecutor
+from db.snapshot import Snapshot
 from dclient.views.dm import DMDeleteView
 from managers import (settings, users, react_roles, tickets, subguilds,
                       entities, aliases, images, locations, inventories,
-                      items)
-from managers.logs import Log
+                      items, messages)
+from managers.logs import Log, Manager as LogManager
 from .twitch import TwitchHandler
 from .ccserver import CCServer
 from .destructible import DestructibleManager, Destructible
 from .helper import (get_member, get_user, thread_close, react_processor,
-                     get_channel, find_tag, get_role)
+                     get_channel, find_tag)
 from .views.entity import EntityView, HelpMeView
 from .views.generic_panels import SuggestionView, BasicThreadView
 
@@ -133,14 +136,22 @@ class DiscordBot(commands.Bot):
         self.owner: Optional[discord.User] = None
         self.ccserver: Optional[CCServer] = None
 
-        # World building
+        # World building, items and inventories follow the users if lazy.
+        lazy = users.Manager.is_lazy()
+        snapshot: Optional[Snapshot] = None
+        if not lazy:
+            # Must be loaded before anything can change the database.
+            snapshot = Snapshot.load("uboot.sqlite3")
+            if snapshot:
+                Log.info("Loading from the snapshot of the last shutdown.")
         locations.Manager.init()
-        items.Manager.init("uboot.sqlite3")
-        inventories.Manager.init("uboot.sqlite3")
+        items.Manager.init("uboot.sqlite3", lazy, snapshot)
+        inventories.Manager.init("uboot.sqlite3", lazy, snapshot)
 
         # Initialize all the managers and their databases.
         tickets.Manager.init("uboot.sqlite3")
-        users.Manager.init("uboot.sqlite3")
+        users.Manager.init("uboot.sqlite3", snapshot)
+        messages.Manager.init("uboot.sqlite3")
         react_roles.Manager.init("uboot.sqlite3")
         subguilds.Manager.init("uboot.sqlite3")
         aliases.Manager.init("uboot.sqlite3")
@@ -215,6 +226,10 @@ class DiscordBot(commands.Bot):
         for updates.
         """
         self.session = aiohttp.ClientSession()
+
+        # All database access from here on is done by the worker thread.
+        DbExecutor.start()
+
         for ext in self._extensions:
             await self.load_extension(ext)
 
@@ -241,13 +256,17 @@ class DiscordBot(commands.Bot):
         self.archiver.start()  # pylint: disable=no-member
         self.twitch_checker.start()  # pylint: disable=no-member
         self.status_update.start()  # pylint: disable=no-member
+        self.db_flusher.start()  # pylint: disable=no-member
+        self.message_persister.start()  # pylint: disable=no-member
+        self.log_rotator.start()  # pylint: disable=no-member
+        self.lost_gold_verifier.start()  # pylint: disable=no-member
 
     async def on_ready(self) -> None:
         """Triggered on 'on_ready' event, sets the bot user."""
         if not self.user:
             return
         Log.debug(f"Logged in as {self.user}")
-        users.Manager.get(self.user.id).is_bot = True
+        users.Manager.set_bot(self.user.id)
 
     async def close(self) -> None:
         """This is called to close the bot in a clean manner."""
@@ -255,6 +274,29 @@ class DiscordBot(commands.Bot):
         if self.session:
             await self.session.close()
 
+        # Write any changes and logs that are still queued.
+        messages.Manager.persist()
+        LogManager.flush(wait=True)
+        DbSocket.flush_all()
+        self.capture_snapshot()
+        DbExecutor.stop()
+
+    @staticmethod
+    def capture_snapshot() -> None:
+        """Captures the stored world state, written as a snapshot once the
+        database is closed.
+        """
+        if users.Manager.is_lazy() or not users.Manager.db:
+            return
+        if not items.Manager.db or not inventories.Manager.db:
+            return
+
+        Snapshot.capture("uboot.sqlite3", {
+            'items': items.Manager.db.find_all(),
+            'inventories': inventories.Manager.db.find_all_items(),
+            'users': users.Manager.db.find_all(),
+        })
+
     @staticmethod
     def add_react_role(react: str, role_id: int,
                        guild_id: int, reverse: bool) -> bool:
@@ -331,6 +373,32 @@ class DiscordBot(commands.Bot):
         )
         await self.change_presence(activity=activity)
 
+    @tasks.loop(seconds=1)
+    async def db_flusher(self) -> None:
+        """Writes buffered logs and queued database changes that have exceeded
+        their flush intervals.
+        """
+        LogManager.flush_expired()
+        if DbSocket.write_behind:
+            DbSocket.flush_expired()
+
+    @tasks.loop(seconds=5)
+    async def message_persister(self) -> None:
+        """Saves the users whose messages were added since the last run."""
+        messages.Manager.persist()
+
+    @tasks.loop(hours=1)
+    async def log_rotator(self) -> None:
+        """Archives the logs that are older than the retention period."""
+        await LogManager.rotate()
+
+    @tasks.loop(minutes=30)
+    async def lost_gold_verifier(self) -> None:
+        """Recalculates the bot's gold in case the running total drifted."""
+        drift = users.Manager.verify_lost_gold()
+        if abs(drift) >= 1:
+            Log.debug(f"Bot gold drifted by {drift:.2f}, corrected.")
+
     @tasks.loop(seconds=30)
     async def twitch_checker(self) -> None:
         for guild in self.guilds:
@@ -397,6 +465,11 @@ class DiscordBot(commands.Bot):
         """Pauses the update thread until the bot has authenticated."""
         await self.wait_until_ready()
 
+    @log_rotator.before_loop
+    async def log_rotator_wait_on_login(self) -> None:
+        """Pauses the update thread until the bot has authenticated."""
+        await self.wait_until_ready()
+
     async def on_message(self, msg: discord.Message) -> None:
         """Triggered on 'on_message' event. Used to process commands and
         add message and gold to users. Also logs DMs sent to the bot.
@@ -408,6 +481,9 @@ class DiscordBot(commands.Bot):
         # Process if it is a command.
         ctx = await self.get_context(msg)
         if ctx.command:
+            # Load the author first so the command does not read the database
+            # from the event loop.
+            await users.Manager.get_async(msg.author.id)
             await self.invoke(ctx)
 
             result: str = "failed" if ctx.command_failed else "called"
@@ -420,7 +496,7 @@ class DiscordBot(commands.Bot):
         if not self.owner_id:
             await self.is_owner(msg.author)
 
-        user = users.Manager.get(msg.author.id)
+        user = await users.Manager.get_async(msg.author.id)
 
         # Log all DMs sent to the bot.
         if self.ccserver and self.ccserver.is_dm(msg):
@@ -438,35 +514,17 @@ class DiscordBot(commands.Bot):
         if not msg.guild or not isinstance(msg.author, discord.Member):
             return
 
+        # Added in memory, saved by the message persister.
         powerhour = self.powerhours.get(msg.guild.id)
         multiplier: float = 1.0 if not powerhour else powerhour.multiplier
-        user.add_message(multiplier)
-        user.save()
+        idle = messages.Manager.ingest(user, multiplier)
 
-        # Check that the user has the minigame role.
+        # Check that the user has the minigame role, from the member's cache.
         role_id = settings.Manager.get(msg.guild.id).minigame.role_id
-        minigame_role = await get_role(self, msg.guild.id, role_id)
-        if not minigame_role or minigame_role not in msg.author.roles:
-            return
-
-        if user.in_combat:
+        if not role_id or not msg.author.get_role(role_id):
             return
 
-        loc = user.c_location
-        floor = user.c_floor
-        difficulty = user.difficulty
-
-        # Check passive taunt.
-        last_message = user.cooldown(users.Cooldown.GOLD)
-        if datetime.now() - last_message >= timedelta(hours=12):
-            entity = entities.Manager.check_spawn(loc, floor, difficulty,
-                                                  False, False, True)
-        else:
-            # Try to spawn natural entity..
-            entity = entities.Manager.check_spawn(loc, floor, difficulty,
-                                                  powerhour is not None,
-                                                  user.is_powerhour,
-                                                  False)
+        entity = messages.Manager.spawn(user, idle, powerhour is not None)
         if entity:
             await self.add_entity(msg, msg.author, entity)
 
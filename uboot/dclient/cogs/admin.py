@@ -7,7 +7,9 @@ import discord
 from discord.ext import commands
 from discord.ext.commands import param
 
-from managers import settings, react_roles, users
+from db.db_socket import DbSocket
+from db.executor import DbExecutor
+from managers import settings, react_roles, users, messages
 from managers.logs import Log, LogType, Manager as LogManager
 from dclient.bot import DiscordBot
 from dclient.helper import get_channel, get_message, get_member, get_role, get_role_by_name, convert_age
@@ -142,6 +144,50 @@ class Admin(commands.Cog):
 
         await ctx.reply(embed=embed)
 
+    @server.command(name="database", aliases=("db",))
+    async def database(self, ctx: commands.Context) -> None:
+        """Shows the database worker queue depth and latency.
+
+        examples:
+            (prefix)server database
+        """
+        stats = DbExecutor.stats()
+        pending = DbSocket.total_pending()
+        status = "running" if DbExecutor.is_running() else "stopped"
+
+        embed = discord.Embed(color=discord.Color.blurple())
+        embed.title = "Database Worker"
+        embed.description = f"**status**: {status}\n" \
+                            f"**queue depth**: {int(stats['depth'])}\n" \
+                            f"**processed**: {int(stats['processed'])}\n" \
+                            f"**write-behind pending**: {pending}\n\n" \
+                            f"**queued**: {stats['wait_avg']:0.2f}ms avg, " \
+                            f"{stats['wait_max']:0.2f}ms max\n" \
+                            f"**executing**: {stats['run_avg']:0.2f}ms avg, " \
+                            f"{stats['run_max']:0.2f}ms max\n"
+        await ctx.reply(embed=embed)
+
+    @server.command(name="messages", aliases=("msgs",))
+    async def server_messages(self, ctx: commands.Context) -> None:
+        """Shows the time spent in each stage of handling messages.
+
+        examples:
+            (prefix)server messages
+        """
+        lines: list[str] = []
+        for name, stats in messages.Manager.stats().items():
+            lines.append(f"**{name}**: {int(stats['calls'])} calls, "
+                         f"{int(stats['items'])} handled\n"
+                         f"> {stats['avg']:0.1f}\u00b5s avg, "
+                         f"{stats['max']:0.1f}\u00b5s max")
+
+        embed = discord.Embed(color=discord.Color.blurple())
+        embed.title = "Message Pipeline"
+        embed.description = f"**awaiting persist**: " \
+                            f"{messages.Manager.pending()}\n\n" + \
+                            '\n'.join(lines)
+        await ctx.reply(embed=embed)
+
     @server.command(name="extract")
     async def extract(self, ctx: commands.Context,
                       user_id: int = param(
@@ -292,13 +338,10 @@ class Admin(commands.Cog):
             await ctx.send("Guild settings could not be found.")
             return
 
-        all_users = users.Manager.get_all()
-        streamers = [u for u in all_users if u.is_streamer]
-
         streamer_text = []
-        for s in streamers:
+        for user_id, stream_name in users.Manager.get_streamers():
             # Get the users Member account.
-            streamer_text.append(f"<@{s.id}>: {s.id} => {s.stream_name}")
+            streamer_text.append(f"<@{user_id}>: {user_id} => {stream_name}")
 
         if len(streamer_text) == 0:
             streamer_text = ["None"]
@@ -429,7 +472,7 @@ class Admin(commands.Cog):
 
         examples:
             (prefix)server logs type 1 20
-            (prefix)server logs user 123456789 20
+            (prefix)server logs user 123456789 20 2
         """
         if ctx.invoked_subcommand is None:
             await ctx.send('invalid logs command.')
@@ -440,8 +483,11 @@ class Admin(commands.Cog):
                             description="Type of log to display."),
                         amount: int = param(
                             description="Amount of logs to display."),
+                        page: int = param(
+                            description="Page of older logs to display.",
+                            default=1),
                         ) -> None:
-        """Shows logs for the server based on type.
+        """Shows logs for the server based on type, newest page first.
         Types are numeric values:
             1: INFO
             2: DEBUG
@@ -452,8 +498,9 @@ class Admin(commands.Cog):
 
         example:
             (prefix)server logs type 1 10
+            (prefix)server logs type 1 10 2
         """
-        if not ctx.guild or amount < 1:
+        if not ctx.guild or amount < 1 or page < 1:
             return
 
         try:
@@ -462,7 +509,9 @@ class Admin(commands.Cog):
             await ctx.send(f"Invalid log type of '{logtype}'", delete_after=30)
             return
 
-        logs = LogManager.get_guild_type(ctx.guild.id, tlog, amount)
+        offset = (page - 1) * amount
+        logs = await LogManager.get_guild_type(ctx.guild.id, tlog, amount,
+                                              offset)
         log_full = await convert_logs(ctx, logs)
         if log_full == '':
             return
@@ -478,16 +527,23 @@ class Admin(commands.Cog):
                             description="Id of the user to pull logs for."),
                         amount: int = param(
                             description="Amount of logs to display."),
+                        page: int = param(
+                            description="Page of older logs to display.",
+                            default=1),
                         ) -> None:
-        """Shows logs for the server based on the user id provided.
+        """Shows logs for the server based on the user id provided, newest
+        page first.
 
         example:
             (prefix)server logs user 1234567890 10
+            (prefix)server logs user 1234567890 10 2
         """
-        if not ctx.guild or amount < 1:
+        if not ctx.guild or amount < 1 or page < 1:
             return
 
-        logs = LogManager.get_guild_user(ctx.guild.id, user_id, amount)
+        offset = (page - 1) * amount
+        logs = await LogManager.get_guild_user(ctx.guild.id, user_id, amount,
+                                              offset)
         log_full = await convert_logs(ctx, logs)
         if log_full == '':
             return
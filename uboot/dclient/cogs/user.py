@@ -1,8 +1,9 @@
 """Various commands that support the gambling mechanic."""
+import itertools
 import random
 import requests
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
 from bs4 import BeautifulSoup
 
 import discord
@@ -11,7 +12,7 @@ from discord.ext.commands import param
 
 from dclient.bot import DiscordBot
 from dclient.destructible import DestructibleManager, Destructible
-from dclient.helper import (get_member, get_message,
+from dclient.helper import (get_members, get_message,
                             get_role, get_user, check_minigame)
 from dclient.views.dm import DMDeleteView
 from dclient.views.gamble import GambleView, gamble, ExtractedBet
@@ -140,24 +141,31 @@ class User(commands.Cog):
             await ctx.send("That is not a valid leaderboard.", delete_after=30)
             return
 
-        all_users = users.Manager.get_all()
-        all_users = list(filter(lambda u: getattr(u, category) > 0, all_users))
-        all_users.sort(key=lambda u: getattr(u, category), reverse=True)
-
         cat_fancy = category.replace('_', ' ').title()
 
         pos: int = 0
         board: list[str] = []
-        kills: int = 0
-        for user_l in all_users:
-            kills += user_l.kills
-            if pos >= 10:
-                continue
+        kills = users.Manager.boards['kills'].total
+        ranked = users.Manager.ranked(category)
+        candidates: list[tuple[int, Union[int, float]]] = []
+        members: dict[int, Optional[discord.Member]] = {}
+        while pos < 10:
+            if len(candidates) == 0:
+                # Resolve the next few users at once, some may have left.
+                candidates = list(itertools.islice(ranked, 10 - pos + 5))
+                if len(candidates) == 0:
+                    break
+                members = await get_members(self.bot, ctx.guild.id,
+                                            [user_id for user_id, _ in
+                                             candidates])
+
+            user_id, value = candidates.pop(0)
 
             # Get the API version of the user.
-            user = await get_member(self.bot, ctx.guild.id, user_l.id)
+            user = members.get(user_id)
             if not user:
                 continue
+            user_l = users.Manager.get(user_id)
 
             # Generate the text for the users position.
             pos += 1
@@ -177,7 +185,6 @@ class User(commands.Cog):
                 suffix = f"[ lvl {user_l.level}, exp: {user_l.exp} ]"
 
             # Convert to a sensible significant digit.
-            value = getattr(user_l, category)
             display = str(value)
             if isinstance(value, float):
                 display = f"{value:0.2f}"
@@ -1,5 +1,7 @@
 """Helper functions related to the Discord API that have no true home."""
-from typing import Optional
+import asyncio
+import time
+from typing import Any, Hashable, Optional, TypeVar
 from datetime import datetime, timezone
 
 import discord
@@ -7,6 +9,58 @@ from discord import ForumChannel, TextChannel
 
 from managers import react_roles, settings
 
+# Maximum amount of API lookups running at once for a single batch.
+FETCH_LIMIT: int = 4
+
+T = TypeVar('T')
+
+
+class LookupCache:
+    """Results of API lookups, kept for a limited amount of time. Misses are
+    kept as well so ids that no longer resolve are not fetched repeatedly.
+    """
+
+    def __init__(self, ttl: float, miss_ttl: float,
+                 max_size: int = 4096) -> None:
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.max_size = max_size
+        self._entries: dict[Hashable, tuple[float, Any]] = {}  # Key => Entry
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Gets a cached result, the first value is False if there is no
+        result or it has expired.
+        """
+        entry = self._entries.get(key)
+        if not entry:
+            return False, None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return False, None
+        return True, entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Caches a result, None being a miss."""
+        if len(self._entries) >= self.max_size:
+            self.prune()
+
+        ttl = self.ttl if value is not None else self.miss_ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+
+    def prune(self) -> None:
+        """Removes expired results, or the oldest half if none expired."""
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items()
+                   if entry[0] < now]
+        if len(expired) == 0:
+            expired = list(self._entries)[:len(self._entries) // 2]
+        for key in expired:
+            del self._entries[key]
+
+
+_members = LookupCache(ttl=300, miss_ttl=600)  # (Guild ID, User ID) => Member
+_users = LookupCache(ttl=300, miss_ttl=600)  # User ID => User
+
 
 def convert_age(created_at: datetime) -> str:
     """Returns a string for the age based on the created_at datetime passed."""
@@ -113,24 +167,76 @@ async def get_guild(client: discord.Client,
     return guild
 
 
+def in_order(user_ids: list[int],
+             found: dict[int, Optional[T]]) -> dict[int, Optional[T]]:
+    """Orders found lookups by the position each id first appears at."""
+    ordered: dict[int, Optional[T]] = {}
+    for user_id in user_ids:
+        if user_id not in ordered:
+            ordered[user_id] = found.get(user_id)
+    return ordered
+
+
 async def get_member(client: discord.Client, guild_id: int,
                      user_id: int) -> Optional[discord.Member]:
     """Attempt to get the member based on its id.
     Tries to get it from cache first, if not found then fetches from API.
     """
+    members = await get_members(client, guild_id, [user_id])
+    return members.get(user_id)
+
+
+async def get_members(client: discord.Client, guild_id: int,
+                      user_ids: list[int],
+                      ) -> dict[int, Optional[discord.Member]]:
+    """Attempt to get several members based on their ids. Tries the caches
+    first, the remaining members are fetched from API concurrently. The
+    result follows the order of the ids, a repeated id is looked up once and
+    kept at its first position.
+    """
     guild = await get_guild(client, guild_id)
     if not guild:
-        # Could not resolve guild, no member found.
-        return None
-
-    # Attempt to find the member in cache first.
-    member = guild.get_member(user_id)
-    if not member:
+        # Could not resolve guild, no members found.
+        return {user_id: None for user_id in user_ids}
+
+    found: dict[int, Optional[discord.Member]] = {}
+    missing: list[int] = []
+    for user_id in user_ids:
+        if user_id in found or user_id in missing:
+            # Repeated id, already being looked up.
+            continue
+
+        # Attempt to find the member in cache first.
+        member = guild.get_member(user_id)
+        if not member:
+            cached, member = _members.get((guild.id, user_id))
+            if not cached:
+                missing.append(user_id)
+                continue
+        found[user_id] = member
+
+    if len(missing) > 0:
         # Could not find in cache, try to fetch from API.
+        limit = asyncio.Semaphore(FETCH_LIMIT)
+        fetched = await asyncio.gather(*[_fetch_member(guild, user_id, limit)
+                                         for user_id in missing])
+        found.update(zip(missing, fetched))
+    return in_order(user_ids, found)
+
+
+async def _fetch_member(guild: discord.Guild, user_id: int,
+                        limit: asyncio.Semaphore) -> Optional[discord.Member]:
+    """Fetches a member from API, caching the result. Members that do not
+    exist are cached as misses.
+    """
+    async with limit:
         try:
             member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            member = None
         except BaseException:
             return None
+    _members.put((guild.id, user_id), member)
     return member
 
 
@@ -139,14 +245,55 @@ async def get_user(client: discord.Client,
     """Attempt to get the user based on its id.
     Tries to get it from cache first, if not found then fetches from API.
     """
-    # Attempt to find the user in cache first.
-    user = client.get_user(user_id)
-    if not user:
+    found = await get_users(client, [user_id])
+    return found.get(user_id)
+
+
+async def get_users(client: discord.Client,
+                    user_ids: list[int]) -> dict[int, Optional[discord.User]]:
+    """Attempt to get several users based on their ids. Tries the caches
+    first, the remaining users are fetched from API concurrently. The result
+    follows the order of the ids, a repeated id is looked up once and kept at
+    its first position.
+    """
+    found: dict[int, Optional[discord.User]] = {}
+    missing: list[int] = []
+    for user_id in user_ids:
+        if user_id in found or user_id in missing:
+            # Repeated id, already being looked up.
+            continue
+
+        # Attempt to find the user in cache first.
+        user = client.get_user(user_id)
+        if not user:
+            cached, user = _users.get(user_id)
+            if not cached:
+                missing.append(user_id)
+                continue
+        found[user_id] = user
+
+    if len(missing) > 0:
         # Could not find in cache, try to fetch from API.
+        limit = asyncio.Semaphore(FETCH_LIMIT)
+        fetched = await asyncio.gather(*[_fetch_user(client, user_id, limit)
+                                         for user_id in missing])
+        found.update(zip(missing, fetched))
+    return in_order(user_ids, found)
+
+
+async def _fetch_user(client: discord.Client, user_id: int,
+                      limit: asyncio.Semaphore) -> Optional[discord.User]:
+    """Fetches a user from API, caching the result. Users that do not exist
+    are cached as misses.
+    """
+    async with limit:
         try:
             user = await client.fetch_user(user_id)
+        except discord.NotFound:
+            user = None
         except BaseException:
             return None
+    _users.put(user_id, user)
     return user
 
 
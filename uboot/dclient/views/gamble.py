@@ -1,17 +1,13 @@
 """Gambling is a mechanic to spend a virtual currency (gold / gold piece) that
 is slowly accumulated while users participate in conversation within servers.
 """
-import random
-
 import discord
 from discord import ui
 
 from dclient.bot import DiscordBot
 from dclient.destructible import DestructibleManager, Destructible
-from managers import users
-
-# All valid options for the generic betting game.
-valid_input = ("high", "low", "seven", "7")
+from managers import gambling, users
+from managers.gambling import SIDES as valid_input, roll_dice
 
 
 class ExtractedBet:
@@ -34,11 +30,6 @@ class GambleResult:
         self.winnings = 0
 
 
-def roll_dice() -> tuple[int, int]:
-    """Calculates a 2d6 roll."""
-    return random.randint(1, 6), random.randint(1, 6)
-
-
 def gamble(user: users.User, name: str,
            bet: ExtractedBet, loss_reset: int = 0,
            min_override: int = -1, mod: int = 1) -> GambleResult:
@@ -73,7 +64,6 @@ def gamble(user: users.User, name: str,
     total = dice[0] + dice[1]
 
     # Get the status text.
-    winnings: int = 0
     res_status: str = "high"
     if total < 7:
         res_status = "low"
@@ -81,12 +71,7 @@ def gamble(user: users.User, name: str,
         res_status = "seven"
 
     # Calculate the winnings if there are some.
-    if bet.side.lower() == "high" and total > 7:
-        winnings = bet.amount * mod
-    if bet.side.lower() == "low" and total < 7:
-        winnings = bet.amount * mod
-    if bet.side.lower() in ("seven", "7") and total == 7:
-        winnings = bet.amount * 4 * mod
+    winnings: int = gambling.winnings(bet.side, bet.amount, total, mod)
 
     # Update user statistics for wins.
     change = -1 * bet.amount
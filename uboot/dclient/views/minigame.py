@@ -9,7 +9,7 @@ from discord import ui
 
 from dclient.bot import DiscordBot
 from dclient.destructible import Destructible, DestructibleManager
-from dclient.helper import get_user, check_minigame
+from dclient.helper import get_users, check_minigame
 from dclient.views.user import (InventoryView, LocationView, UserStatsView)
 from managers import users, entities
 from managers.items import Item, Items, Material, Reagent
@@ -49,13 +49,9 @@ async def extract_users(client: discord.Client,
     """Attempt to extract user ids from a messages embed."""
     user_ids = extract_ints(message)
 
-    # Lookup the users
-    extracted_users: list[discord.User] = []
-    for user_id in user_ids:
-        user = await get_user(client, user_id)
-        if user:
-            extracted_users.append(user)
-    return extracted_users
+    # Lookup the users, one for every id in the order they are listed.
+    found = await get_users(client, user_ids)
+    return [found[user_id] for user_id in user_ids if found.get(user_id)]
 
 
 class ManageOptions(Enum):
@@ -4,7 +4,7 @@ from typing import Optional, Union, Type
 import discord
 from discord import ui
 
-from dclient.helper import get_user, convert_age
+from dclient.helper import get_users, convert_age
 from managers import entities
 from managers import users
 from managers.actions import Action, ItemMove, Manager as ActionManager
@@ -31,13 +31,9 @@ async def extract_users(client: discord.Client,
     except BaseException:
         pass
 
-    # Lookup the users
-    extracted_users: list[discord.User] = []
-    for user_id in user_ids:
-        user = await get_user(client, user_id)
-        if user:
-            extracted_users.append(user)
-    return extracted_users
+    # Lookup the users, one for every id in the order they are listed.
+    found = await get_users(client, user_ids)
+    return [found[user_id] for user_id in user_ids if found.get(user_id)]
 
 
 def show_inventory(inventory: Inventory) -> str:
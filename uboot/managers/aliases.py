@@ -57,6 +57,7 @@ class Manager:
         database.
         """
         Manager.db = AliasDb(dbname)
+        Manager.db.create_schema()
         raw_aliases = Manager.db.find_all()
         for raw in raw_aliases:
             Manager.add(Alias(raw))
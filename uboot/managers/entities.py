@@ -7,7 +7,8 @@ import pathlib
 import random
 import sys
 from enum import Enum, auto
-from typing import Optional, Type
+from types import MappingProxyType
+from typing import Mapping, Optional, Type
 
 from .items import Item, Rarity
 from .locations import Area, Floor, Level, Manager as LocationManager
@@ -20,6 +21,10 @@ chest_actions = ["stumbles upon", "discovers", "approaches", "finds",
                  "grows suspicious of"]
 
 AreaWeight = tuple[Area, Level, int]
+# Spawns are rolled from 0 to this value, in hundredths.
+SPAWN_ROLL: int = 1000
+# Weight, Entity, Name
+SpawnWeight = tuple[int, Type['Entity'], str]
 
 
 def _rand_decimal() -> float:
@@ -121,6 +126,10 @@ class Entity:
         """Gets loot from the loot table."""
         return self.lootpack.get_loot()
 
+    def get_loot_rolls(self, count: int) -> list[list[Item]]:
+        """Gets several independent rolls from the loot table at once."""
+        return self.lootpack.roll(count)
+
 
 class Chest(Entity):
     """Represents a treasure chest that can found."""
@@ -145,6 +154,61 @@ class Chest(Entity):
         return (2 ** (self.lootpack.rarity.value - 1)) * 50
 
 
+class SpawnTable:
+    """Immutable spawn distribution for a single floor. Compiled once into an
+    alias table (Vose) so every spawn is picked in constant time.
+    """
+    __slots__ = ('entities', 'names', 'weights', 'total', '_prob', '_alias')
+
+    def __init__(self, spawns: list[SpawnWeight]) -> None:
+        spawns = sorted((s for s in spawns if s[0] > 0), key=lambda s: s[0])
+        self.entities: tuple[Type[Entity], ...] = tuple(s[1] for s in spawns)
+        self.names: tuple[str, ...] = tuple(s[2] for s in spawns)
+        self.weights: tuple[int, ...] = tuple(s[0] for s in spawns)
+        self.total: int = sum(self.weights)
+
+        # Split every slot between its own entity and one alias.
+        size = len(spawns)
+        prob: list[float] = [1.0] * size
+        alias: list[int] = list(range(size))
+        scaled = [w * size / self.total for w in self.weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less], alias[less] = scaled[less], more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        self._prob: tuple[float, ...] = tuple(prob)
+        self._alias: tuple[int, ...] = tuple(alias)
+
+    def __len__(self) -> int:
+        """Overrides len to get the amount of entities that can spawn."""
+        return len(self.entities)
+
+    def sample(self) -> Type[Entity]:
+        """Picks an entity, weighted by its spawn weight."""
+        pos = int(random.random() * len(self.entities))
+        if random.random() < self._prob[pos]:
+            return self.entities[pos]
+        return self.entities[self._alias[pos]]
+
+    def probabilities(self) -> dict[str, float]:
+        """Chance of each entity being picked, calculated from the alias
+        table rather than the weights so it reflects the actual sampling.
+        """
+        size = len(self.entities)
+        chances: dict[str, float] = {name: 0.0 for name in self.names}
+        for pos, name in enumerate(self.names):
+            chances[name] += self._prob[pos] / size
+            chances[self.names[self._alias[pos]]] += \
+                (1.0 - self._prob[pos]) / size
+        return chances
+
+
 def _resolve_name(name: str) -> str:
     try:
         return importlib.util.resolve_name(name, None)
@@ -155,7 +219,8 @@ def _resolve_name(name: str) -> str:
 class Manager:
     """Manages the spawning of entities."""
     # Area => Weight, Entity
-    _areas: dict[str, list[tuple[int, Type[Entity], str]]] = {}
+    _areas: dict[str, list[SpawnWeight]] = {}
+    _tables: dict[str, SpawnTable] = {}  # Area => Compiled spawns
     _entities: dict[str, Type[Entity]] = {}
     _loaded: dict = {}
 
@@ -196,6 +261,32 @@ class Manager:
             if not item.is_file() or item.name == "__init__.py":
                 continue
             Manager._load_entity(f"managers.spawns.{item.stem}")
+        Manager.compile()
+
+    @staticmethod
+    def compile() -> None:
+        """Compiles the spawn table for every floor."""
+        Manager._tables = {key: SpawnTable(spawns)
+                           for key, spawns in Manager._areas.items()}
+
+    @staticmethod
+    def spawn_table(dungeon_floor: Floor) -> Optional[SpawnTable]:
+        """Gets the compiled spawn table for a floor, compiling it if the
+        entities of the floor changed.
+        """
+        table = Manager._tables.get(dungeon_floor.key)
+        if not table:
+            spawns = Manager._areas.get(dungeon_floor.key)
+            if not spawns:
+                return None
+            table = SpawnTable(spawns)
+            Manager._tables[dungeon_floor.key] = table
+        return table
+
+    @staticmethod
+    def spawn_tables() -> Mapping[str, SpawnTable]:
+        """Gets every compiled spawn table, keyed by floor."""
+        return MappingProxyType(Manager._tables)
 
     @staticmethod
     def register(entity: Type[Entity], name: str) -> None:
@@ -223,9 +314,9 @@ class Manager:
             if exists:
                 continue
 
-            # Add the entity to the area and sort it on the weight.
+            # Add the entity to the area, the table is compiled again.
             area_spawns.append((weight, entity, name.lower()))
-            area_spawns.sort(key=lambda a: a[0])
+            Manager._tables.pop(dungeon_floor.key, None)
 
     @staticmethod
     def by_name(name: str) -> Optional[Type[Entity]]:
@@ -238,12 +329,10 @@ class Manager:
     @staticmethod
     def floor_spawns(dungeon_floor: Floor) -> list[str]:
         """Gets all of the expected spawns for the specified floor."""
-        spawns = Manager._areas.get(dungeon_floor.key, [])
-
-        names: list[str] = []
-        for spawn in spawns:
-            names.append(spawn[2])
-        return names
+        table = Manager.spawn_table(dungeon_floor)
+        if not table:
+            return []
+        return list(table.names)
 
     @staticmethod
     def entity_locations(name: str) -> list[Floor]:
@@ -266,22 +355,15 @@ class Manager:
         if not dungeon_floor:
             return None
 
-        area_spawns = Manager._areas.get(dungeon_floor.key)
-        if not area_spawns or len(area_spawns) == 0:
+        table = Manager.spawn_table(dungeon_floor)
+        if not table or len(table) == 0:
             return None
 
         # Calculate the total difficulty
         difficulty = difficulty + max((dungeon_floor.difficulty - 1), 0)
 
-        # Build the lists.
-        weights = [spawn[0] for spawn in area_spawns]
-        entities = [spawn[1] for spawn in area_spawns]
-
         # Get the spawn and create the entity.
-        spawns = random.choices(entities, weights=weights, k=1)
-        if len(spawns) == 0:
-            return None
-        return spawns[0](dungeon_floor, difficulty)
+        return table.sample()(dungeon_floor, difficulty)
 
     @staticmethod
     def check_spawn(area: Area, level: Level, difficulty: float,
@@ -292,8 +374,26 @@ class Manager:
         if not dungeon_floor:
             return None
 
-        max_range: int = 1000
+        chest_range, entity_range = Manager.spawn_ranges(
+            dungeon_floor, powerhour, user_powerhour, is_taunt)
 
+        # Gets a decimal value.
+        val = random.randint(0, SPAWN_ROLL * 100) / 100
+        if val <= chest_range:
+            # Chest spawned.
+            return Chest(dungeon_floor, difficulty)
+        if val <= entity_range:
+            # Creature spawned.
+            return Manager.spawn(area, level, difficulty)
+        return None
+
+    @staticmethod
+    def spawn_ranges(dungeon_floor: Floor, powerhour: bool,
+                     user_powerhour: bool,
+                     is_taunt: bool) -> tuple[float, float]:
+        """Gets the highest rolls (out of SPAWN_ROLL) that spawn a chest and
+        an entity on a floor.
+        """
         multiplier: float = 1.5 if powerhour else 1.0
         if user_powerhour:
             multiplier += 0.5
@@ -308,15 +408,6 @@ class Manager:
         chest_base = 2 if not is_taunt else 0
         chest_range = float(chest_base * multiplier)
 
-        entity_base = 5 if not is_taunt else int(max_range / 5)
+        entity_base = 5 if not is_taunt else int(SPAWN_ROLL / 5)
         entity_range = float(entity_base * multiplier) + chest_range
-
-        # Gets a decimal value.
-        val = random.randint(0, max_range * 100) / 100
-        if val <= chest_range:
-            # Chest spawned.
-            return Chest(dungeon_floor, difficulty)
-        if val <= entity_range:
-            # Creature spawned.
-            return Manager.spawn(area, level, difficulty)
-        return None
+        return chest_range, entity_range
@@ -0,0 +1,26 @@
+"""Rules of the dice game users gamble their gold on. Kept apart from the
+views so the payouts can be checked without a client.
+"""
+import random
+
+# All valid options for the generic betting game.
+SIDES: tuple[str, ...] = ("high", "low", "seven", "7")
+
+
+def roll_dice() -> tuple[int, int]:
+    """Calculates a 2d6 roll."""
+    return random.randint(1, 6), random.randint(1, 6)
+
+
+def winnings(side: str, amount, total, mod: int = 1):
+    """Gold won by a bet on a side for the total rolled, 0 if it lost. Works
+    on single values as well as arrays of amounts and totals.
+    """
+    side = side.lower()
+    if side == "high":
+        return amount * (total > 7) * mod
+    if side == "low":
+        return amount * (total < 7) * mod
+    if side in ("seven", "7"):
+        return amount * 4 * (total == 7) * mod
+    return amount * 0
@@ -1,12 +1,14 @@
 """Representation of a bank. Keeps track of several items and manages the
 connection between database and memory.
 """
-import json
 import uuid
+import weakref
 from enum import IntEnum, auto
 from typing import Optional, Union
 
-from db.inventories import InventoryDb, InventoryRaw
+from db.inventories import (InventoryDb, InventoryItemDb, InventoryItemRow,
+                            InventoryRaw)
+from db.snapshot import Snapshot
 from .items import Item, Items, Material, Reagent, Manager as ItemManager
 
 
@@ -14,8 +16,7 @@ def make_raw(user_id: int, inventory_id: str) -> InventoryRaw:
     """Creates a raw inventory (tuple) fit for storing into a database with
     pre-defined defaults.
     """
-    return user_id, inventory_id, int(Inventory.Type.BASE), 4, \
-        "Bag", "", "[]"
+    return user_id, inventory_id, int(Inventory.Type.BASE), 4, "Bag", ""
 
 
 class Inventory:
@@ -46,11 +47,12 @@ class Inventory:
         self.parent_id = parent_id.replace("'", "")
         self.item_ids: list[str] = item_ids if item_ids else []
         self.items: dict[str, Item] = {}
+        self._synced: Optional[InventoryRaw] = None  # Last raw written.
 
     @staticmethod
-    def from_raw(raw: InventoryRaw) -> 'Inventory':
+    def from_raw(raw: InventoryRaw,
+                 item_ids: Optional[list[str]] = None) -> 'Inventory':
         """Converts an inventory from a raw value to a real value."""
-        item_ids: list[str] = json.loads(raw[6].replace("'", ''))
         return Inventory(user_id=int(raw[0]),
                          inventory_id=raw[1],
                          inventory_type=Inventory.Type(int(raw[2])),
@@ -100,8 +102,7 @@ class Inventory:
     def raw(self) -> InventoryRaw:
         """Converts an inventory back into a InventoryRaw."""
         return self.user_id, f"'{self.id}'", int(self.type), \
-            self._capacity, f"'{self.base_name}'", f"'{self.parent_id}'", \
-            f"'{json.dumps(self.item_ids)}'"
+            self._capacity, f"'{self.base_name}'", f"'{self.parent_id}'"
 
     def get_bags(self) -> list['Inventory']:
         """Obtain all bags that belong in the current one."""
@@ -153,6 +154,7 @@ class Inventory:
             self.item_ids.append(item.id)
             ItemManager.add(item)
             item.save()
+            Manager.link(self.id, item.id)
             return True
 
         # Attempt to add stacks or uses.
@@ -165,6 +167,7 @@ class Inventory:
                 self.item_ids.append(item.id)
                 ItemManager.add(item)
                 item.save()
+                Manager.link(self.id, item.id)
                 return True
             return False
 
@@ -181,6 +184,7 @@ class Inventory:
         self.item_ids = [item for item in self.item_ids if item != item_id]
         del self.items[item_id]
         if old_count != len(self.item_ids):
+            Manager.unlink(self.id, item_id)
             if delete:
                 ItemManager.remove(item_id)
             return True
@@ -188,10 +192,13 @@ class Inventory:
 
     def save(self) -> None:
         """Stores the inventory into the database, saving or updating
-        as necessary.
+        as necessary. Contents are stored as they are added and removed,
+        only the changed values are written.
         """
         if Manager.db:
-            Manager.db.update(self.raw)
+            raw = self.raw
+            Manager.db.update_changed(raw, self._synced)
+            self._synced = raw
 
 
 class ResourceBag(Inventory):
@@ -210,12 +217,12 @@ class ResourceBag(Inventory):
             item_ids=item_ids)
 
     @staticmethod
-    def from_raw(raw: InventoryRaw) -> 'ResourceBag':
+    def from_raw(raw: InventoryRaw,
+                 item_ids: Optional[list[str]] = None) -> 'ResourceBag':
         """Converts an inventory from a raw value to a real value."""
-        item_ids: list[str] = json.loads(raw[6].replace("'", ''))
         return ResourceBag(user_id=int(raw[0]),
                            inventory_id=raw[1],
-                           item_ids=item_ids,
+                           item_ids=item_ids or [],
                            )
 
 
@@ -234,10 +241,10 @@ class Backpack(Inventory):
             item_ids=item_ids)
 
     @staticmethod
-    def from_raw(raw: InventoryRaw) -> 'Backpack':
+    def from_raw(raw: InventoryRaw,
+                 item_ids: Optional[list[str]] = None) -> 'Backpack':
         """Converts an inventory from a raw value to a real value."""
-        item_ids: list[str] = json.loads(raw[6].replace("'", ''))
-        return Backpack(user_id=int(raw[0]), item_ids=item_ids)
+        return Backpack(user_id=int(raw[0]), item_ids=item_ids or [])
 
     @property
     def resources(self) -> ResourceBag:
@@ -284,46 +291,127 @@ class Bank(Inventory):
             item_ids=item_ids)
 
     @staticmethod
-    def from_raw(raw: InventoryRaw) -> 'Bank':
+    def from_raw(raw: InventoryRaw,
+                 item_ids: Optional[list[str]] = None) -> 'Bank':
         """Converts an inventory from a raw value to a real value."""
-        item_ids: list[str] = json.loads(raw[6].replace("'", ''))
         return Bank(user_id=int(raw[0]),
                     inventory_id=raw[1],
-                    item_ids=item_ids,
+                    item_ids=item_ids or [],
                     )
 
 
 class Manager:
-    """Manages the Bank database in memory and in storage."""
+    """Manages the Bank database in memory and in storage. When lazy, a user's
+    inventories and items are loaded the first time they are requested.
+    """
     db: Optional[InventoryDb] = None
+    items_db: Optional[InventoryItemDb] = None
+    lazy: bool = False
+    _loaded: set[int] = set()  # User IDs with inventories in memory.
+    # Unloaded inventories that are still referenced elsewhere, such as by
+    # views, reused when their user is loaded again.
+    _unloaded: weakref.WeakValueDictionary[str, Inventory] = \
+        weakref.WeakValueDictionary()
     inventories: dict[str, Inventory] = {}  # Inventory ID => Inventory
     _backpacks: dict[int, Backpack] = {}  # User ID => Backpack
     _banks: dict[int, Bank] = {}  # User ID => Bank
     _resources: dict[int, ResourceBag] = {}  # User ID => ResourceBag
 
     @staticmethod
-    def init(dbname: str) -> None:
+    def init(dbname: str, lazy: bool = False,
+             snapshot: Optional[Snapshot] = None) -> None:
         """Initializes the Inventory Manager, connecting and loading from
-        database.
+        database, or from the snapshot if one is provided.
         """
         Manager.db = InventoryDb(dbname)
-        raw_inventories = Manager.db.find_all()
-        for raw in raw_inventories:
+        Manager.db.create_schema()
+        Manager.items_db = InventoryItemDb(dbname)
+        Manager.items_db.create_schema()
+        Manager.lazy = lazy
+        if lazy:
+            return
+
+        rows = snapshot.rows('inventories') if snapshot else None
+        if rows is None:
+            rows = Manager.db.find_all_items()
+        Manager._build(rows)
+
+        # Make sure a resource bag exists for each bank.
+        for bank in Manager._banks.values():
+            if not Manager._resources.get(bank.user_id, None):
+                Manager._create_resource(bank.user_id)
+
+    @staticmethod
+    def _build(rows: list[InventoryItemRow]) -> None:
+        """Creates the inventories from the rows joined with their items."""
+        # Group the joined rows back into inventories, keeping item order.
+        contents: dict[str, tuple[InventoryRaw, list[str]]] = {}
+        for row in rows:
+            raw: InventoryRaw = row[:6]
+            _, item_ids = contents.setdefault(raw[1], (raw, []))
+            if row[6]:
+                item_ids.append(row[6])
+
+        if ItemManager.lazy:
+            # Fetch all of the contents at once instead of one at a time.
+            ItemManager.load([item_id for _, item_ids in contents.values()
+                              for item_id in item_ids])
+
+        for raw, item_ids in contents.values():
+            unloaded = Manager._unloaded.pop(raw[1].replace("'", ""), None)
+            if unloaded:
+                Manager.add(unloaded)
+                continue
+
             inventory_type = Inventory.Type(int(raw[2]))
             if inventory_type == Inventory.Type.BACKPACK:
-                inventory = Backpack.from_raw(raw)
+                inventory = Backpack.from_raw(raw, item_ids)
             elif inventory_type == Inventory.Type.BANK:
-                inventory = Bank.from_raw(raw)
+                inventory = Bank.from_raw(raw, item_ids)
             elif inventory_type == Inventory.Type.RESOURCES:
-                inventory = ResourceBag.from_raw(raw)
+                inventory = ResourceBag.from_raw(raw, item_ids)
             else:
-                inventory = Inventory.from_raw(raw)
+                inventory = Inventory.from_raw(raw, item_ids)
+            inventory._synced = raw
             Manager.add(inventory)
 
-        # Make sure a resource bag exists for each bank.
-        for bank in Manager._banks.values():
-            if not Manager._resources.get(bank.user_id, None):
-                Manager._create_resource(bank.user_id)
+    @staticmethod
+    def load_user(user_id: int) -> None:
+        """Loads the inventories of a user if they are not in memory."""
+        if not Manager.lazy or not Manager.db or user_id in Manager._loaded:
+            return
+        Manager.add_user(user_id, Manager.db.find_user_items(user_id))
+
+    @staticmethod
+    def add_user(user_id: int, rows: list[InventoryItemRow]) -> None:
+        """Creates the inventories of a user from rows already read from the
+        database, unless they are in memory.
+        """
+        if not Manager.lazy or user_id in Manager._loaded:
+            return
+        Manager._loaded.add(user_id)
+        Manager._build(rows)
+
+    @staticmethod
+    def unload_user(user_id: int,
+                    item_ids: Optional[list[str]] = None) -> None:
+        """Removes the inventories and items of a user from memory, leaving
+        them in the database. Items held outside of the inventories, such as
+        an equipped weapon, are passed as 'item_ids'.
+        """
+        if item_ids:
+            ItemManager.unload(item_ids)
+        if not Manager.lazy or user_id not in Manager._loaded:
+            return
+
+        for inventory in Manager.get_bags(user_id):
+            ItemManager.unload(inventory.item_ids)
+            del Manager.inventories[inventory.id]
+            Manager._unloaded[inventory.id] = inventory
+        Manager._backpacks.pop(user_id, None)
+        Manager._banks.pop(user_id, None)
+        Manager._resources.pop(user_id, None)
+        Manager._loaded.discard(user_id)
 
     @staticmethod
     def add(inventory: Union[Inventory, ResourceBag, Bank]):
@@ -335,9 +423,10 @@ class Manager:
             if item:
                 new_ids.append(item_id)
                 inventory.items[item_id] = item
-        if len(new_ids) != len(inventory.item_ids):
-            inventory.item_ids = new_ids
-            inventory.save()
+            else:
+                # The item no longer exists, forget it was stored.
+                Manager.unlink(inventory.id, item_id)
+        inventory.item_ids = new_ids
 
         Manager.inventories[inventory.id] = inventory
         if isinstance(inventory, Backpack):
@@ -348,6 +437,18 @@ class Manager:
             Manager._resources[inventory.user_id] = inventory
         return inventory
 
+    @staticmethod
+    def link(inventory_id: str, item_id: str) -> None:
+        """Stores an item as being contained in an inventory."""
+        if Manager.items_db:
+            Manager.items_db.insert_one((inventory_id, item_id))
+
+    @staticmethod
+    def unlink(inventory_id: str, item_id: str) -> None:
+        """Removes an item from the stored contents of an inventory."""
+        if Manager.items_db:
+            Manager.items_db.delete_one((inventory_id, item_id))
+
     @staticmethod
     def get(inventory_id: str) -> Optional[Inventory]:
         """Get an inventory based on its id."""
@@ -358,6 +459,7 @@ class Manager:
         """Get a backpack based on its user id. If it does not exist,
         it will be initialized with defaults.
         """
+        Manager.load_user(user_id)
         backpack = Manager._backpacks.get(user_id, None)
         if not backpack:
             backpack = Manager._create_backpack(user_id)
@@ -387,6 +489,7 @@ class Manager:
         """Get a bank box based on its user id. If it does not exist,
         it will be initialized with defaults.
         """
+        Manager.load_user(user_id)
         bank = Manager._banks.get(user_id, None)
         if not bank:
             bank = Manager._create_bank(user_id)
@@ -416,6 +519,7 @@ class Manager:
         """Get a resource bag based on its user id. If it does not exist,
         it will be initialized with defaults.
         """
+        Manager.load_user(user_id)
         resource = Manager._resources.get(user_id, None)
         if not resource:
             # Create and add it to the manager. Creates backpack if missing.
@@ -441,6 +545,7 @@ class Manager:
     @staticmethod
     def get_bags(user_id: int) -> list[Inventory]:
         """Gets all the inventories belonging to a user."""
+        Manager.load_user(user_id)
         inventories: list[Inventory] = []
         for inventory in Manager.inventories.values():
             if inventory.user_id == user_id:
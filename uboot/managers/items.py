@@ -1,8 +1,10 @@
 import uuid
+import weakref
 from enum import IntEnum, auto
 from typing import Optional, Union
 
 from db.items import ItemDb, ItemRaw
+from db.snapshot import Snapshot
 
 
 class Items(IntEnum):
@@ -89,6 +91,7 @@ class Item:
         self._value = value
         self.uses = uses
         self.uses_max = uses_max
+        self._synced: Optional[ItemRaw] = None  # Last raw written.
 
     @property
     def name(self) -> str:
@@ -170,7 +173,7 @@ class Item:
     @staticmethod
     def from_raw(raw: ItemRaw) -> 'Item':
         """Creates an item from a raw value."""
-        return Item(
+        item = Item(
             item_id=str(raw[0]),
             item_type=Items(raw[1]),
             name=raw[2],
@@ -179,6 +182,8 @@ class Item:
             value=raw[5],
             uses=raw[6],
             uses_max=raw[7])
+        item._synced = raw
+        return item
 
     def add_use(self, value: int) -> None:
         """Adds a use to an object."""
@@ -194,10 +199,12 @@ class Item:
 
     def save(self) -> None:
         """Stores the item into the database, saving or updating
-        as necessary.
+        as necessary. Only the changed values are written.
         """
         if Manager.db:
-            Manager.db.update(self.raw)
+            raw = self.raw
+            Manager.db.update_changed(raw, self._synced)
+            self._synced = raw
 
     def remove(self) -> None:
         """Removes the item from the database."""
@@ -220,17 +227,31 @@ class Chest(Item):
 
 
 class Manager:
-    """Manages the item database in memory and in storage."""
+    """Manages the item database in memory and in storage. When lazy, items
+    are only loaded once they are requested.
+    """
     db: Optional[ItemDb] = None
+    lazy: bool = False
     _items: dict[str, Item] = {}  # Item ID => Item
+    # Unloaded items that are still referenced elsewhere, reused on reload.
+    _unloaded: weakref.WeakValueDictionary[str, Item] = \
+        weakref.WeakValueDictionary()
 
     @staticmethod
-    def init(dbname: str) -> None:
+    def init(dbname: str, lazy: bool = False,
+             snapshot: Optional[Snapshot] = None) -> None:
         """Initializes the Item Manager, connecting and loading from
-        database.
+        database, or from the snapshot if one is provided.
         """
         Manager.db = ItemDb(dbname)
-        raw_items = Manager.db.find_all()
+        Manager.db.create_schema()
+        Manager.lazy = lazy
+        if lazy:
+            return
+
+        raw_items = snapshot.rows('items') if snapshot else None
+        if raw_items is None:
+            raw_items = Manager.db.find_all()
         for raw in raw_items:
             Manager.add(Item.from_raw(raw))
 
@@ -252,4 +273,47 @@ class Manager:
     @staticmethod
     def get(item_id: str) -> Optional[Item]:
         """Get an inventory based on its id."""
-        return Manager._items.get(item_id, None)
+        item = Manager._items.get(item_id, None)
+        if not item and Manager.lazy:
+            Manager.load([item_id])
+            item = Manager._items.get(item_id, None)
+        return item
+
+    @staticmethod
+    def load(item_ids: list[str]) -> None:
+        """Loads the items not already in memory with a single query."""
+        if not Manager.db:
+            return
+
+        missing: list[str] = []
+        for item_id in item_ids:
+            if item_id in Manager._items:
+                continue
+            item = Manager._unloaded.pop(item_id, None)
+            if item:
+                Manager._items[item_id] = item
+            else:
+                missing.append(item_id)
+        if len(missing) == 0:
+            return
+        for raw in Manager.db.find_many_ids(missing):
+            Manager.add(Item.from_raw(raw))
+
+    @staticmethod
+    def add_raws(raws: list[ItemRaw]) -> None:
+        """Adds items already read from the database, any of them in memory
+        are kept as they are.
+        """
+        for raw in raws:
+            item = Item.from_raw(raw)
+            if item.id in Manager._items:
+                continue
+            Manager.add(Manager._unloaded.pop(item.id, None) or item)
+
+    @staticmethod
+    def unload(item_ids: list[str]) -> None:
+        """Removes items from memory, leaving them in the database."""
+        for item_id in item_ids:
+            item = Manager._items.pop(item_id, None)
+            if item:
+                Manager._unloaded[item_id] = item
@@ -0,0 +1,74 @@
+"""Ranked values used for the leaderboards. Each board keeps its entries sorted
+as they change so the top of the board and its total never require sorting
+every user.
+"""
+from bisect import bisect_left, insort
+from typing import Iterator, Union
+
+Value = Union[int, float]
+
+# All values that users are ranked by.
+CATEGORIES: tuple[str, ...] = ('gold', 'exp', 'deaths', 'kills', 'msg_count',
+                               'level', 'difficulty', 'gold_multiplier')
+
+
+class Leaderboard:
+    """Ranks ids by a single value, highest first. Only values above 0 are
+    ranked, all values count towards the total.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.total: Value = 0
+        self._values: dict[int, Value] = {}  # ID => Value
+        self._ranks: list[tuple[Value, int]] = []  # (-Value, ID), sorted.
+
+    def __len__(self) -> int:
+        """Overrides len to get the amount of ranked ids."""
+        return len(self._ranks)
+
+    def get(self, entry_id: int) -> Value:
+        """Gets the current value for an id."""
+        return self._values.get(entry_id, 0)
+
+    def set(self, entry_id: int, value: Value) -> None:
+        """Sets the value for an id, moving it to its new rank."""
+        old = self._values.get(entry_id, None)
+        if old == value:
+            return
+        if old is not None:
+            self.remove(entry_id)
+
+        self._values[entry_id] = value
+        self.total += value
+        if value > 0:
+            insort(self._ranks, (-value, entry_id))
+
+    def remove(self, entry_id: int) -> None:
+        """Removes an id from the board."""
+        old = self._values.pop(entry_id, None)
+        if old is None:
+            return
+
+        self.total -= old
+        if old > 0:
+            pos = bisect_left(self._ranks, (-old, entry_id))
+            if pos < len(self._ranks) and self._ranks[pos][1] == entry_id:
+                del self._ranks[pos]
+
+    def ranked(self) -> Iterator[tuple[int, Value]]:
+        """Iterates over the ranked ids and values, highest first. Read in
+        chunks so the board can change while being iterated.
+        """
+        start: int = 0
+        while True:
+            chunk = self._ranks[start:start + 32]
+            if len(chunk) == 0:
+                return
+            for value, entry_id in chunk:
+                yield entry_id, -value
+            start += len(chunk)
+
+    def top(self, amount: int) -> list[tuple[int, Value]]:
+        """Gets the highest ranked ids and their values."""
+        return [(entry_id, -value) for value, entry_id in self._ranks[:amount]]
@@ -50,6 +50,7 @@ LOCATIONS: dict[Area, tuple[Level, float]] = {
 
 class Locations:
     """Represents all the currently unlocked locations."""
+    __slots__ = ('unlocks',)
 
     def __init__(self, unlocks: int) -> None:
         self.unlocks: Area = Area(unlocks)
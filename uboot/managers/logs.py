@@ -1,11 +1,24 @@
 """Representation of a log. Keeps track of several items and manages the
 connection between database and memory.
 """
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import IntEnum, auto
 
-from db.logs import LogDb, LogRaw
+from db.executor import DbExecutor
+from db.log_archive import LogArchive
+from db.logs import LogDb, LogRaw, LogRow
+
+
+class Overflow(IntEnum):
+    """What happens to new logs when the log buffer is full."""
+    DROP_OLDEST = auto()
+    DROP_NEWEST = auto()
 
 
 class LogType(IntEnum):
@@ -32,13 +45,19 @@ class Log:
     debug_mode: bool = False
     _last_len: int = 0
 
-    def __init__(self, raw: LogRaw) -> None:
+    def __init__(self, raw: LogRaw, log_id: int = 0) -> None:
+        self.id = log_id
         self.guild_id = raw[0]
         self.user_id = raw[1]
         self.type = LogType(raw[2])
         self.timestamp = raw[3].replace("'", '')
         self.message = raw[4].replace("'", '')
 
+    @staticmethod
+    def from_row(row: LogRow) -> 'Log':
+        """Creates a log from a database row that includes its id."""
+        return Log(row[1:], log_id=row[0])
+
     def __str__(self) -> str:
         """Overrides the string method."""
         guild_text = '' if self.guild_id == 0 else f'[{self.guild_id}]'
@@ -53,9 +72,9 @@ class Log:
                 f"'{self.timestamp}'", f"'{self.message}'")
 
     def save(self) -> None:
-        """Stores the log into the database, saving it."""
+        """Queues the log to be stored into the database in the next batch."""
         if Manager.db:
-            Manager.db.insert_one(self._raw)
+            Manager.queue(self._raw)
 
     @staticmethod
     def info(msg: str, end: str = '\n',
@@ -158,32 +177,166 @@ class Log:
 
 
 class Manager:
-    """Manages the Log database in memory and in storage."""
+    """Manages the Log database in memory and in storage. Logs are buffered
+    and written in batches by the database worker, a batch is written once
+    enough logs are buffered or the interval has elapsed.
+    """
     db: Optional[LogDb] = None
-    _logs: list[Log] = []
+    capacity: int = 10000
+    batch_size: int = 250
+    interval: float = 2.0
+    overflow: Overflow = Overflow.DROP_OLDEST
+    retention_days: int = 0
+    dropped: int = 0
+    _buffer: deque[LogRaw] = deque()
+    _lock = threading.Lock()
+    _inflight: Optional[Future] = None
+    _last_flush: float = time.monotonic()
 
     @staticmethod
-    def init(dbname: str) -> None:
+    def init(dbname: str, capacity: int = 10000, batch_size: int = 250,
+             interval: float = 2.0,
+             overflow: Overflow = Overflow.DROP_OLDEST,
+             retention_days: int = 0, legacy: str = '') -> None:
         """Initializes the Log Manager, connecting and loading from
-        database.
+        database. Logs left in the legacy database file are moved over. A
+        retention of 0 days keeps every log in the database.
+        """
+        archive: Optional[LogArchive] = None
+        if retention_days > 0:
+            archive = LogArchive()
+        Manager.retention_days = max(retention_days, 0)
+
+        Manager.db = LogDb(dbname, archive)
+        Manager.db.create_schema()
+        if legacy:
+            moved = Manager.db.import_legacy(legacy)
+            if moved > 0:
+                Log.info(f"Moved {moved} logs from '{legacy}' to '{dbname}'.")
+        Manager.capacity = max(capacity, 1)
+        Manager.batch_size = max(min(batch_size, Manager.capacity), 1)
+        Manager.interval = max(interval, 0.1)
+        Manager.overflow = overflow
+
+    @staticmethod
+    def pending() -> int:
+        """Amount of logs buffered and waiting to be written."""
+        return len(Manager._buffer)
+
+    @staticmethod
+    def queue(raw: LogRaw) -> None:
+        """Buffers a log to be written, never blocks on the database. If the
+        buffer is full, a log is dropped based on the overflow policy.
+        """
+        with Manager._lock:
+            if len(Manager._buffer) >= Manager.capacity:
+                Manager.dropped += 1
+                if Manager.overflow == Overflow.DROP_NEWEST:
+                    return
+                Manager._buffer.popleft()
+            Manager._buffer.append(raw)
+            full = len(Manager._buffer) >= Manager.batch_size
+
+        if full:
+            Manager.flush()
+
+    @staticmethod
+    def flush_expired() -> int:
+        """Writes the buffered logs if the interval has elapsed."""
+        if time.monotonic() - Manager._last_flush < Manager.interval:
+            return 0
+        return Manager.flush()
+
+    @staticmethod
+    def flush(wait: bool = False) -> int:
+        """Sends the buffered logs to the database worker as a single batch.
+        Only one batch is written at a time, logs keep buffering while the
+        previous batch is still being written unless waiting is requested.
+        Returns the amount of logs sent.
         """
-        Manager.db = LogDb(dbname)
+        if not Manager.db:
+            return 0
+
+        inflight = Manager._inflight
+        if inflight and not inflight.done():
+            if not wait:
+                return 0
+            inflight.exception()
+
+        with Manager._lock:
+            batch = list(Manager._buffer)
+            Manager._buffer.clear()
+        Manager._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        Manager._inflight = DbExecutor.submit(Manager.db.insert_many, batch)
+        if wait:
+            Manager._inflight.exception()
+        return len(batch)
 
     @staticmethod
-    def get_guild_type(guild_id: int, logtype: LogType,
-                       amount: int) -> list[Log]:
-        """Get logs based on its guild and type."""
+    async def flush_async() -> int:
+        """Same as flush, except a batch still being written is waited on
+        without blocking the event loop. Queries sent to the database worker
+        afterwards see every buffered log. Returns the amount of logs sent.
+        """
+        inflight = Manager._inflight
+        while inflight and not inflight.done():
+            await asyncio.wait([asyncio.wrap_future(inflight)])
+            inflight = Manager._inflight
+        return Manager.flush()
+
+    @staticmethod
+    async def rotate(chunk: int = 5000) -> int:
+        """Moves the logs older than the retention period into the archive.
+        Every chunk is its own task for the database worker, so other queries
+        run in between. Returns the amount of logs moved.
+        """
+        if not Manager.db or Manager.retention_days <= 0:
+            return 0
+
+        Manager.flush()
+        cutoff = datetime.utcnow() - timedelta(days=Manager.retention_days)
+        moved: int = 0
+        while True:
+            count = await DbExecutor.run(Manager.db.rotate, cutoff, chunk)
+            moved += count
+            if count < chunk:
+                return moved
+
+    @staticmethod
+    async def get_guild_type(guild_id: int, logtype: LogType,
+                             amount: int, offset: int = 0,
+                             before_id: int = 0,
+                             since: Optional[datetime] = None,
+                             until: Optional[datetime] = None) -> list[Log]:
+        """Get the most recent logs based on its guild and type, returned
+        oldest to newest. Older pages are reached with an offset or by passing
+        the id of the oldest log already seen as 'before_id'.
+        """
         if not Manager.db:
             return []
-        raw_logs = Manager.db.find_guild_type(guild_id, int(logtype))
-        logs = [Log(log) for log in raw_logs]
-        return logs[-amount:]
+        await Manager.flush_async()
+        rows = await DbExecutor.run(Manager.db.find_guild_type, guild_id,
+                                    int(logtype), amount, offset, before_id,
+                                    since, until)
+        return [Log.from_row(row) for row in reversed(rows)]
 
     @staticmethod
-    def get_guild_user(guild_id: int, user_id: int, amount: int) -> list[Log]:
-        """Get logs based on its guild and user."""
+    async def get_guild_user(guild_id: int, user_id: int,
+                             amount: int, offset: int = 0,
+                             before_id: int = 0,
+                             since: Optional[datetime] = None,
+                             until: Optional[datetime] = None) -> list[Log]:
+        """Get the most recent logs based on its guild and user, returned
+        oldest to newest. Older pages are reached with an offset or by passing
+        the id of the oldest log already seen as 'before_id'.
+        """
         if not Manager.db:
             return []
-        raw_logs = Manager.db.find_guild_user(guild_id, user_id)
-        logs = [Log(log) for log in raw_logs]
-        return logs[-amount:]
+        await Manager.flush_async()
+        rows = await DbExecutor.run(Manager.db.find_guild_user, guild_id,
+                                    user_id, amount, offset, before_id,
+                                    since, until)
+        return [Log.from_row(row) for row in reversed(rows)]
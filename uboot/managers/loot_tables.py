@@ -1,7 +1,11 @@
-"""Handles everything from creating items to generating loot tables."""
+"""Handles everything from creating items to generating loot tables. Loot
+tables are defined once and compiled into shared, immutable tables. Rolling
+loot only keeps track of how many of each item are left for that roll.
+"""
 
 import random
-from typing import Optional
+from itertools import accumulate
+from typing import Any, Optional
 import uuid
 
 from .items import Item, Items, Material, Rarity, Chest
@@ -24,13 +28,20 @@ BAG_NAMES: list[str] = ["pouch", "bag", "wooden box", "basket",
                         ]
 
 
+# Picks made for a single roll before giving up on filling it.
+MAX_ATTEMPTS: int = 21
+
+
 def rand_name(names: list[str]) -> str:
     """Gets a random name from a list of names."""
     return names[random.randrange(0, len(names))]
 
 
 class ItemCreator:
-    """Responsible for creating an item."""
+    """Responsible for creating an item. Shared between every roll of a loot
+    table and never changed once created.
+    """
+    __slots__ = ('type', 'stacks', 'min', 'max', 'modifier')
 
     def __init__(self, item_type: Items,
                  stacks: int,
@@ -42,7 +53,7 @@ class ItemCreator:
             min_count, max_count = max_count, min_count
 
         self.type = item_type
-        self.stacks = stacks
+        self.stacks = stacks  # Amount per roll, negative for unlimited.
         self.min = min_count
         self.max = max_count
         self.modifier = modifier
@@ -56,7 +67,6 @@ class ItemCreator:
 
     def generate(self) -> Item:
         """Creates an instance of this item."""
-        self.stacks -= 1
         item_id: str = str(uuid.uuid4())
 
         name: Optional[str] = None
@@ -85,104 +95,144 @@ class ItemCreator:
 
 
 class ChestCreator(ItemCreator):
-    """Creates a chest."""
+    """Creates a chest, filled from its own loot table."""
+    __slots__ = ('rarity', 'table')
 
     def __init__(self, max_loot: int, rarity: Rarity) -> None:
         super().__init__(Items.CHEST, 1, 1)
-        self.max_loot = max_loot
         self.rarity = rarity
-        self.items: list[tuple[int, ItemCreator]] = []
+        self.table = LootTable(max_loot)
+        self.table.rarity = rarity
 
-    def add_item(self, item: ItemCreator, weight: int) -> None:
-        """Adds an item to the loot table."""
-        self.items.append((weight, item))
+    @property
+    def max_loot(self) -> int:
+        """Most items the chest can contain."""
+        return self.table.max_loot
 
-        # Sort the list.
-        self.items.sort(key=lambda i: i[0])
+    def add_item(self, item: ItemCreator, weight: int) -> None:
+        """Adds an item to the chest's loot table."""
+        self.table.add_item(item, weight)
 
     def generate(self) -> Chest:
         """Creates an instance of this item."""
-        items = LootTable.generate_loot(self.items, self.max_loot)
-        return Chest(self.rarity, items)
+        return Chest(self.rarity, self.table.get_loot())
+
+
+def can_loot(stacks: Any, looted: Any, unique: Any, types: Any) -> Any:
+    """Checks if an item can be added to a roll. Negative stacks are unlimited
+    and an item without stacks is never looted. Unique types can only be
+    looted once. Works on single values and on NumPy arrays alike.
+    """
+    return ((stacks < 0) | (looted < stacks)) & ((unique & types) == 0)
 
 
 class LootTable:
-    """Represents a loot table, used to generate loot."""
+    """Represents a loot table, used to generate loot. Items are added while
+    defining the table, afterwards it is compiled and can no longer change.
+    """
+    # (Rarity, Upgraded, Chest only) => Compiled table
+    _compiled: dict[tuple[Rarity, bool, bool], 'LootTable'] = {}
 
     def __init__(self, max_loot: int) -> None:
         self.max_loot = max_loot
-        self.items: list[tuple[int, ItemCreator]] = []
         self.rarity = Rarity.COMMON
+        self.items: tuple[ItemCreator, ...] = ()
+        self.weights: tuple[int, ...] = ()
+        self.cum_weights: tuple[int, ...] = ()
+        self.stacks: tuple[int, ...] = ()
+        self.unique: tuple[int, ...] = ()  # Bit of the type if unique.
+        self._defined: Optional[list[tuple[int, ItemCreator]]] = []
 
     @staticmethod
-    def lootpack(lootpack: Rarity, upgrade: bool, is_chest: bool = False):
-        """Gets loot based on the provided lootpack definition."""
+    def lootpack(lootpack: Rarity, upgrade: bool,
+                 is_chest: bool = False) -> 'LootTable':
+        """Gets loot based on the provided lootpack definition. Each
+        definition is compiled once and shared.
+        """
         if upgrade and lootpack < Rarity.MYTHICAL:
             lootpack = Rarity(lootpack + 1)
 
-        if lootpack == Rarity.COMMON:
-            return CommonLoot(upgrade, is_chest)
-        if lootpack == Rarity.UNCOMMON:
-            return UncommonLoot(upgrade, is_chest)
-        if lootpack == Rarity.RARE:
-            return RareLoot(upgrade, is_chest)
-        if lootpack == Rarity.EPIC:
-            return EpicLoot(upgrade, is_chest)
-        if lootpack == Rarity.LEGENDARY:
-            return LegendaryLoot(upgrade, is_chest)
-        if lootpack == Rarity.MYTHICAL:
-            return MythicalLoot(upgrade, is_chest)
-        return UncommonLoot(upgrade, is_chest)
+        key = (lootpack, upgrade, is_chest)
+        table = LootTable._compiled.get(key)
+        if not table:
+            loot = LOOTPACKS.get(lootpack, UncommonLoot)
+            table = loot(upgrade, is_chest).compile()
+            LootTable._compiled[key] = table
+        return table
+
+    @property
+    def is_compiled(self) -> bool:
+        """Checks if the table is compiled and can no longer change."""
+        return self._defined is None
 
     def add_item(self, item: ItemCreator, weight: int) -> None:
         """Adds an item to the loot table."""
-        self.items.append((weight, item))
-
-        # Sort the list.
-        self.items.sort(key=lambda i: i[0])
+        if self._defined is None:
+            raise ValueError("loot table is compiled and cannot change.")
+        self._defined.append((weight, item))
+
+    def compile(self) -> 'LootTable':
+        """Sorts the items on their weight and precomputes the cumulative
+        weights, compiling the tables of any chests within.
+        """
+        if self._defined is None:
+            return self
+
+        defined = sorted(self._defined, key=lambda i: i[0])
+        self.items = tuple(item for _, item in defined)
+        self.weights = tuple(weight for weight, _ in defined)
+        self.cum_weights = tuple(accumulate(self.weights))
+        self.stacks = tuple(item.stacks for item in self.items)
+        self.unique = tuple(1 << item.type.value if item.is_unique else 0
+                             for item in self.items)
+        self._defined = None
+        for item in self.items:
+            if isinstance(item, ChestCreator):
+                item.table.compile()
+        return self
 
     def get_loot(self) -> list[Item]:
         """Generates the loot for the lootpack instance."""
-        return LootTable.generate_loot(self.items, self.max_loot)
-
-    @staticmethod
-    def generate_loot(item_tables: list[tuple[int, ItemCreator]],
-                      max_loot: int) -> list[Item]:
-        """Generates loot form a weighted table."""
-        # Sort the list.
-        item_tables.sort(key=lambda item: item[0])
-
-        # Build the lists.
-        weights = [item[0] for item in item_tables]
-        items = [item[1] for item in item_tables]
-
-        # Create the loot, preventing duplicates except null spaces.
+        return self.roll(1)[0]
+
+    def roll(self, count: int) -> list[list[Item]]:
+        """Generates the loot for several independent rolls at once. Every
+        pick for every roll is drawn in a single call, the rolls then take
+        picks in order until they are full or out of picks.
+        """
+        if self._defined is not None:
+            self.compile()
+        if count <= 0:
+            return []
+        if not self.items or self.max_loot <= 0:
+            return [[] for _ in range(count)]
+
+        positions = range(len(self.items))
+        picks = random.choices(positions, cum_weights=self.cum_weights,
+                               k=count * MAX_ATTEMPTS)
+
+        rolls: list[list[Item]] = []
+        for start in range(0, len(picks), MAX_ATTEMPTS):
+            rolls.append(self._fill(picks[start:start + MAX_ATTEMPTS]))
+        return rolls
+
+    def _fill(self, picks: list[int]) -> list[Item]:
+        """Creates the loot for a single roll from its picks. Unique types
+        already looted are tracked as a bitmask.
+        """
         loot: list[Item] = []
-        max_attempts = 20
-        attempts: int = 0
-        while len(loot) < max_loot:
-            if attempts > max_attempts:
+        types: int = 0  # Unique types already looted.
+        counts: dict[int, int] = {}  # Position => Amount looted.
+        for pos in picks:
+            if len(loot) >= self.max_loot:
                 break
-            attempts += 1
-
-            item = random.choices(items, weights=weights)
-            if len(item) == 0:
-                break
-
-            # Keep empty loot.
-            if item[0].type == Items.NONE and item[0].stacks != 0:
-                loot.append(item[0].generate())
+            looted = counts.get(pos, 0)
+            if not can_loot(self.stacks[pos], looted, self.unique[pos], types):
                 continue
 
-            # If the item already exists, we will ignore it.
-            exists: bool = False
-            for i in loot:
-                if i.type == item[0].type and item[0].is_unique:
-                    exists = True
-                    break
-
-            if not exists and item[0].stacks != 0:
-                loot.append(item[0].generate())
+            counts[pos] = looted + 1
+            types |= self.unique[pos]
+            loot.append(self.items[pos].generate())
 
         # Organize the loot.
         loot.sort(key=lambda item: item.type.value)
@@ -409,3 +459,14 @@ class MythicalLoot(LootTable):
         worst, best = Material.VERITE, Material.VALORITE
         self.add_item(ItemCreator(Items.WEAPON, 1, worst, best), 5)
         self.add_item(ItemCreator(Items.BAG, 1, 16, 16), 3)
+
+
+# Rarity => Loot table definition
+LOOTPACKS: dict[Rarity, type[LootTable]] = {
+    Rarity.COMMON: CommonLoot,
+    Rarity.UNCOMMON: UncommonLoot,
+    Rarity.RARE: RareLoot,
+    Rarity.EPIC: EpicLoot,
+    Rarity.LEGENDARY: LegendaryLoot,
+    Rarity.MYTHICAL: MythicalLoot,
+}
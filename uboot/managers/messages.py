@@ -0,0 +1,139 @@
+"""Staged handling of the messages users send. Each message only updates the
+user in memory, the changes of every user are written together on an interval
+and spawns are decided from the user's state afterwards. Every stage keeps
+track of how long it takes.
+"""
+import time
+from collections import deque
+from typing import Optional
+
+from db.messages import MessageDb
+from .entities import Entity, Manager as EntityManager
+from .users import User
+
+# Time without a message before the next one counts as a passive taunt.
+TAUNT_IDLE: float = 12 * 60 * 60
+
+
+class Stage:
+    """Timings for a single stage of the pipeline."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls: int = 0
+        self.items: int = 0
+        self.total: float = 0.0  # Seconds spent, all time.
+        self._recent: deque[float] = deque(maxlen=256)  # Seconds per call.
+
+    def record(self, started: float, items: int = 1) -> None:
+        """Records a call that began at 'started' (perf_counter)."""
+        elapsed = time.perf_counter() - started
+        self.calls += 1
+        self.items += items
+        self.total += elapsed
+        self._recent.append(elapsed)
+
+    def stats(self) -> dict[str, float]:
+        """Gets the call counts and latencies (in microseconds) for the most
+        recent calls.
+        """
+        recent = list(self._recent)
+        return {
+            'calls': self.calls,
+            'items': self.items,
+            'avg': sum(recent) / len(recent) * 1e6 if recent else 0.0,
+            'max': max(recent) * 1e6 if recent else 0.0,
+            'total': self.total * 1e6,
+        }
+
+
+class Manager:
+    """Manages the stages every message passes through. The time of every
+    user's last message is stored along with their changes, so idle time
+    carries over restarts.
+    """
+    db: Optional[MessageDb] = None
+    _pending: dict[int, User] = {}  # User ID => User, changed since persisted.
+    _last_message: dict[int, float] = {}  # User ID => Seconds since epoch.
+    stages: dict[str, Stage] = {name: Stage(name) for name in
+                                ('ingest', 'persist', 'spawn')}
+
+    @staticmethod
+    def init(dbname: str) -> None:
+        """Initializes the Message Manager, loading the time of every user's
+        last message from database.
+        """
+        Manager.db = MessageDb(dbname)
+        Manager.db.create_schema()
+        Manager._last_message = dict(Manager.db.find_all())
+
+    @staticmethod
+    def ingest(user: User, multiplier: float = 1.0) -> bool:
+        """Adds a message to a user in memory, it is written on the next
+        persist. Returns if the user was idle long enough for a passive taunt.
+        """
+        started = time.perf_counter()
+        idle = Manager.idle(user.id) >= TAUNT_IDLE
+        Manager._last_message[user.id] = time.time()
+        user.add_message(multiplier)
+        Manager._pending[user.id] = user
+        Manager.stages['ingest'].record(started)
+        return idle
+
+    @staticmethod
+    def idle(user_id: int) -> float:
+        """Seconds since the last message of a user, kept even if the user is
+        unloaded. A user without a stored message is always idle.
+        """
+        last = Manager._last_message.get(user_id)
+        if last is None:
+            return float('inf')
+        return time.time() - last
+
+    @staticmethod
+    def persist() -> int:
+        """Saves every user changed since the last persist, along with the
+        time of their last message. Returns the amount of users saved.
+        """
+        if not Manager._pending:
+            return 0
+
+        started = time.perf_counter()
+        pending = Manager._pending
+        Manager._pending = {}
+        for user in pending.values():
+            user.save()
+        if Manager.db:
+            Manager.db.update_many([(user_id, Manager._last_message[user_id])
+                                    for user_id in pending])
+        Manager.stages['persist'].record(started, len(pending))
+        return len(pending)
+
+    @staticmethod
+    def spawn(user: User, idle: bool, powerhour: bool) -> Optional[Entity]:
+        """Decides if the message of a user spawns an entity."""
+        if user.in_combat:
+            return None
+
+        started = time.perf_counter()
+        if idle:
+            # Passive taunt.
+            entity = EntityManager.check_spawn(user.c_location, user.c_floor,
+                                               user.difficulty,
+                                               False, False, True)
+        else:
+            entity = EntityManager.check_spawn(user.c_location, user.c_floor,
+                                               user.difficulty, powerhour,
+                                               user.is_powerhour, False)
+        Manager.stages['spawn'].record(started)
+        return entity
+
+    @staticmethod
+    def pending() -> int:
+        """Amount of users waiting to be persisted."""
+        return len(Manager._pending)
+
+    @staticmethod
+    def stats() -> dict[str, dict[str, float]]:
+        """Gets the timings for every stage."""
+        return {name: stage.stats() for name, stage in Manager.stages.items()}
@@ -53,6 +53,7 @@ class Manager:
         from the database.
         """
         Manager.db = RoleDb(dbname)
+        Manager.db.create_schema()
         raw_roles = Manager.db.find_all()
         for raw in raw_roles:
             Manager.add(ReactRole(raw))
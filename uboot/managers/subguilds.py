@@ -26,7 +26,7 @@ class SubGuild:
         self.thread_id = raw[4]
         self.msg_id = raw[5]
         self.disabled = raw[6]
-        self.banned: list[int] = json.loads(raw[7])
+        self.banned: list[int] = json.loads(raw[7].strip("'"))
 
     @property
     def _raw(self) -> SubGuildRaw:
@@ -54,6 +54,7 @@ class Manager:
         database.
         """
         Manager.db = SubGuildDb(dbname)
+        Manager.db.create_schema()
         raw_subguilds = Manager.db.find_all()
         for raw in raw_subguilds:
             Manager.add(SubGuild(raw))
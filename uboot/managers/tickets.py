@@ -54,6 +54,7 @@ class Manager:
         database.
         """
         Manager.db = TicketDb(dbname)
+        Manager.db.create_schema()
         raw_tickets = Manager.db.find_all(incomplete_only=True)
         for raw in raw_tickets:
             Manager.add(Ticket(raw))
@@ -3,13 +3,22 @@ connection between database and memory.
 """
 import math
 import random
+import time
+import weakref
+from array import array
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from enum import Enum, auto
-from typing import Optional
+from typing import Iterator, Optional, Union
 
+from db.executor import DbExecutor
+from db.inventories import InventoryItemRow
+from db.items import ItemRaw
+from db.snapshot import Snapshot
 from db.users import UserDb, UserRaw
-from .inventories import Manager as BagManager
+from .inventories import Backpack, Bank, Manager as BagManager
 from .items import Item, Chest, Items, Material, Manager as ItemManager
+from .leaderboards import CATEGORIES, Leaderboard
 from .locations import Floor, Level, Locations, Area, Manager as LocationsManager
 
 
@@ -22,6 +31,37 @@ def make_raw(user_id: int) -> UserRaw:
             0, "''", Level.ONE, 0, "''")
 
 
+def calc_level(exp: int) -> int:
+    """Calculates the level for an amount of exp."""
+    raw = math.pow(exp / 50, 1 / 2.75) - 1
+    if raw < 1:
+        return 1
+    if raw > 20:
+        return 20 * 6
+
+    return int(raw * 6)
+
+
+def calc_difficulty(level: int, exp: int, gold: int, msg_count: int,
+                    material: Material) -> float:
+    """Calculates the difficulty from a user's progress."""
+    level_offset = level / 100
+    gold_offset = gold / (max(msg_count, 1) * 3)
+    weapon_offset = (max(material, Material.NONE) - 1) / 20
+    total_offset = level_offset + gold_offset + weapon_offset + 1
+    if level == 1:
+        # New player protection.
+        if exp < 100.0:
+            return 1.0
+        return min(total_offset, 1.25)
+    return min(total_offset, 5)
+
+
+def calc_gold_multiplier(level: int) -> float:
+    """Calculates the gold multiplier for a level."""
+    return max(math.log(level / 6, 400) + 1, 1.0)
+
+
 class Cooldown(Enum):
     """Various cooldowns that a user can have."""
     GOLD = auto()
@@ -31,22 +71,55 @@ class Cooldown(Enum):
     MINING = auto()
 
 
+# Seconds before each cooldown expires, indexed by cooldown value - 1.
+COOLDOWN_LENGTHS: tuple[float, ...] = (15, 60 * 60, 12 * 60, 5 * 60, 6 * 60)
+# How long ago a cooldown that was never marked is shown as being used.
+COOLDOWN_UNUSED: float = 6 * 60 * 60
+
+
+class UserLocations(Locations):
+    """Locations unlocked by a user, stored on the user as an integer."""
+    __slots__ = ('_user',)
+
+    def __init__(self, user: 'User') -> None:
+        # pylint: disable=super-init-not-called
+        self._user = user
+
+    @property
+    def unlocks(self) -> Area:
+        """Gets the currently unlocked locations."""
+        return Area(self._user._locations)
+
+    @unlocks.setter
+    def unlocks(self, value: Area) -> None:
+        """Stores the unlocked locations on the user."""
+        self._user._locations = value.value
+
+
 class User:
-    """Representation of a user. Initialized with UserRaw."""
+    """Representation of a user. Initialized with UserRaw. Slotted and stored
+    as plain values to keep large amounts of users small in memory.
+    """
+    __slots__ = ('id', '_gold', '_msg_count', 'gambles', 'gambles_won',
+                 'button_press', 'monsters', '_kills', '_exp', '_locations',
+                 'c_location', 'c_floor', 'is_streamer', 'stream_name',
+                 '_deaths', '_weapon', 'is_bot', '_in_combat', '_synced',
+                 '_cooldowns', '_level', '_difficulty', '_gold_multiplier',
+                 '__weakref__')
 
     def __init__(self, raw: UserRaw) -> None:
         self.id = raw[0]
         self._gold = raw[1]
-        self.msg_count = raw[2]
+        self._msg_count = raw[2]
         self.gambles = raw[3]
         self.gambles_won = raw[4]
         self.button_press = raw[5]
         self.monsters = raw[6]
-        self.kills = raw[7]
+        self._kills = raw[7]
         self._exp = raw[8]
-        self.locations: Locations = Locations(raw[9])
+        self._locations: int = int(raw[9])
         self.c_location: Area = Area(raw[10])
-        if not self.locations.is_unlocked(self.c_location):
+        if self.c_location not in Area(self._locations):
             self.c_location = Area.BRITAIN_SEWERS
         self.c_floor = Level(raw[13])
         self.is_streamer = bool(raw[14])
@@ -59,18 +132,28 @@ class User:
         self._deaths = raw[11]
 
         weapon_id: str = raw[12].replace("'", "")
-        self.weapon: Optional[Item] = None
+        self._weapon: Optional[Item] = None
         if weapon_id != "":
             weapon = ItemManager.get(weapon_id)
             if weapon and weapon.type == Items.WEAPON:
-                self.weapon = weapon
+                self._weapon = weapon
 
-        self.is_bot = False
+        # Derived stats, None until calculated again.
+        self._level: Optional[int] = None
+        self._difficulty: Optional[float] = None
+        self._gold_multiplier: Optional[float] = None
+
+        self.is_bot = Manager.bot_id > 0 and self.id == Manager.bot_id
         self._in_combat = False
+        self._synced: UserRaw = raw  # Last raw written to the database.
 
-        self._cooldowns: dict[Cooldown, datetime] = {}
-        self.backpack = BagManager.get_backpack(self.id)
-        self.bank = BagManager.get_bank(self.id)
+        # Monotonic time each cooldown was marked, created once first marked.
+        self._cooldowns: Optional[array] = None
+        if Manager.is_lazy():
+            # Inventories are unloaded once the user is no longer referenced.
+            weakref.finalize(self, Manager.release, self.id)
+            if self._weapon:
+                Manager._weapons[self.id] = self._weapon.id
 
     def __str__(self) -> str:
         """Overrides str to just display some basics."""
@@ -98,21 +181,30 @@ class User:
                 self._deaths, weapon, int(self.c_floor),
                 int(self.is_streamer), stream_name)
 
+    @property
+    def locations(self) -> Locations:
+        """Gets the locations the user has unlocked."""
+        return UserLocations(self)
+
+    @property
+    def backpack(self) -> Backpack:
+        """Gets the backpack of the user."""
+        return BagManager.get_backpack(self.id)
+
+    @property
+    def bank(self) -> Bank:
+        """Gets the bank box of the user."""
+        return BagManager.get_bank(self.id)
+
+    @property
+    def is_dirty(self) -> bool:
+        """Checks if the user has changed since it was last saved."""
+        return self.raw != self._synced
+
     def timer_expired(self, cooldown: Cooldown) -> bool:
         """Checks if a specific timer is off of cooldown."""
-        time_diff = datetime.now() - self.cooldown(cooldown)
-
-        if cooldown == Cooldown.GOLD and time_diff < timedelta(seconds=15):
-            return False
-        if cooldown == Cooldown.POWERHOUR and time_diff < timedelta(hours=1):
-            return False
-        if cooldown == Cooldown.TAUNT and time_diff < timedelta(minutes=12):
-            return False
-        if cooldown == Cooldown.FORAGE and time_diff < timedelta(minutes=5):
-            return False
-        if cooldown == Cooldown.MINING and time_diff < timedelta(minutes=6):
-            return False
-        return True
+        elapsed = self.cooldown_elapsed(cooldown)
+        return elapsed >= COOLDOWN_LENGTHS[cooldown.value - 1]
 
     @property
     def is_powerhour(self) -> bool:
@@ -142,15 +234,20 @@ class User:
 
     def cooldown(self, cooldown: Cooldown) -> datetime:
         """Obtains a cooldown's status."""
-        cd_timer = self._cooldowns.get(cooldown)
-        if not cd_timer:
-            cd_timer = datetime.now() - timedelta(hours=6)
-            self._cooldowns[cooldown] = cd_timer
-        return cd_timer
+        elapsed = self.cooldown_elapsed(cooldown)
+        return datetime.now() - timedelta(seconds=elapsed)
 
     def mark_cooldown(self, cooldown: Cooldown) -> None:
         """Sets the cooldown to the current time."""
-        self._cooldowns[cooldown] = datetime.now()
+        if self._cooldowns is None:
+            self._cooldowns = array('d', bytes(8 * len(COOLDOWN_LENGTHS)))
+        self._cooldowns[cooldown.value - 1] = time.monotonic()
+
+    def cooldown_elapsed(self, cooldown: Cooldown) -> float:
+        """Seconds since a cooldown was last marked."""
+        if self._cooldowns is None or not self._cooldowns[cooldown.value - 1]:
+            return COOLDOWN_UNUSED
+        return time.monotonic() - self._cooldowns[cooldown.value - 1]
 
     @property
     def gold(self) -> int:
@@ -161,25 +258,31 @@ class User:
             # Non-bot defaults to its gold amount.
             return int(self._gold)
 
-        total: int = 0
-        # Get the amount of "lost" gold for each user and add it up.
-        for user in Manager.get_all():
-            if user.is_bot or user._gold >= user.msg_count or user._gold < 0:
-                # Ignore bot or negative amounts.
-                continue
-            total += (user.msg_count - user._gold)
-        return int(total)
+        # The "lost" gold of every user, kept up to date by the manager.
+        return int(Manager.lost_gold)
 
     @gold.setter
     def gold(self, val) -> None:
         """Setter for accessing protected gold property."""
+        lost = self.lost_gold
         self._gold = val
         self._gold = max(self._gold, 0)
+        self._difficulty = None
+        Manager.track_lost_gold(self.lost_gold - lost)
+        Manager.rank(self, 'gold', 'difficulty')
 
         # Player has died.
         if self.msg_count > 0 and self._gold == 0:
             self.deaths += 1
 
+    @property
+    def lost_gold(self) -> float:
+        """Gold lost below the message count, which goes to the bot."""
+        if self.is_bot or self._gold >= self.msg_count or self._gold < 0:
+            # Ignore bot or negative amounts.
+            return 0
+        return self.msg_count - self._gold
+
     @property
     def deaths(self) -> int:
         """Displays the current amount of deaths a user has."""
@@ -190,6 +293,18 @@ class User:
         """Setter for accessing protected death property."""
         self._deaths = val
         self._deaths = max(self._deaths, 0)
+        Manager.rank(self, 'deaths')
+
+    @property
+    def kills(self) -> int:
+        """Amount of monsters the user has killed."""
+        return self._kills
+
+    @kills.setter
+    def kills(self, val) -> None:
+        """Setter for accessing protected kills property."""
+        self._kills = val
+        Manager.rank(self, 'kills')
 
     @property
     def exp(self) -> int:
@@ -200,11 +315,48 @@ class User:
     def exp(self, val) -> None:
         """Setter for accessing protected exp property."""
         self._exp = val
+        self._level = None
+        self._difficulty = None
+        self._gold_multiplier = None
+        Manager.rank(self, 'exp', 'level', 'difficulty', 'gold_multiplier')
+
+    @property
+    def msg_count(self) -> int:
+        """Amount of messages the user has sent."""
+        return self._msg_count
+
+    @msg_count.setter
+    def msg_count(self, val) -> None:
+        """Setter for accessing protected message count property."""
+        self._msg_count = val
+        self._difficulty = None
+        Manager.rank(self, 'msg_count', 'difficulty')
+
+    @property
+    def weapon(self) -> Optional[Item]:
+        """Weapon currently equipped by the user."""
+        return self._weapon
+
+    @weapon.setter
+    def weapon(self, val: Optional[Item]) -> None:
+        """Setter for accessing protected weapon property."""
+        self._weapon = val
+        self._difficulty = None
+        Manager.rank(self, 'difficulty')
+        if Manager.is_lazy():
+            if val:
+                Manager._weapons[self.id] = val.id
+            else:
+                Manager._weapons.pop(self.id, None)
 
     def save(self) -> None:
-        """Saves the user in memory to database."""
+        """Saves the user in memory to database, only the changed values
+        are written.
+        """
         if Manager.db:
-            Manager.db.update(self.raw)
+            raw = self.raw
+            Manager.db.update_changed(raw, self._synced)
+            self._synced = raw
 
     def change_location(self, destination: Area,
                         level: Level) -> Optional[Floor]:
@@ -264,13 +416,9 @@ class User:
     @property
     def level(self) -> int:
         """Calculates the level of the user based on their exp."""
-        raw = math.pow(self.exp / 50, 1 / 2.75) - 1
-        if raw < 1:
-            return 1
-        if raw > 20:
-            return 20 * 6
-
-        return int(raw * 6)
+        if self._level is None:
+            self._level = calc_level(self.exp)
+        return self._level
 
     @property
     def difficulty(self) -> float:
@@ -278,18 +426,11 @@ class User:
         if self.is_bot:
             return 0.0
 
-        material = self.weapon.material if self.weapon else Material.NONE
-
-        level_offset = self.level / 100
-        gold_offset = self.gold / (max(self.msg_count, 1) * 3)
-        weapon_offset = (max(material, Material.NONE) - 1) / 20
-        total_offset = level_offset + gold_offset + weapon_offset + 1
-        if self.level == 1:
-            # New player protection.
-            if self.exp < 100.0:
-                return 1.0
-            return min(total_offset, 1.25)
-        return min(total_offset, 5)
+        if self._difficulty is None:
+            material = self._weapon.material if self._weapon else Material.NONE
+            self._difficulty = calc_difficulty(self.level, self.exp, self.gold,
+                                               self._msg_count, material)
+        return self._difficulty
 
     @property
     def gold_multiplier_powerhour(self) -> float:
@@ -301,11 +442,15 @@ class User:
         """Generates a gold multiplier based on the players level."""
         if self.is_bot:
             return 0.0
-        return max(math.log(self.level / 6, 400) + 1, 1.0)
+        if self._gold_multiplier is None:
+            self._gold_multiplier = calc_gold_multiplier(self.level)
+        return self._gold_multiplier
 
     def add_message(self, multiplier: float = 1.0) -> None:
         """Adds a message to the user. Rewards with gold if off cooldown."""
+        lost = self.lost_gold
         self.msg_count += 1
+        Manager.track_lost_gold(self.lost_gold - lost)
 
         if self.is_powerhour:
             multiplier += self.gold_multiplier_powerhour
@@ -336,24 +481,149 @@ class User:
 
 
 class Manager:
-    """Manages the User database in memory and in storage."""
+    """Manages the User database in memory and in storage. By default every
+    user is loaded on initialization, with a cache size set users are instead
+    loaded as they are requested and the least recently used are unloaded.
+    """
     db: Optional[UserDb] = None
-    _users: dict[int, User] = {}
+    bot_id: int = 0
+    lost_gold: float = 0  # Sum of the lost gold of every user.
+    boards: dict[str, Leaderboard] = {name: Leaderboard(name)
+                                      for name in CATEGORIES}
+    cache_size: int = 0  # 0 keeps every user loaded.
+    _users: OrderedDict[int, User] = OrderedDict()  # Least recent first.
+    # Unloaded users that are still referenced elsewhere, such as by views.
+    _evicted: weakref.WeakValueDictionary[int, User] = \
+        weakref.WeakValueDictionary()
+    _weapons: dict[int, str] = {}  # User ID => Equipped weapon ID, if lazy.
 
     @staticmethod
-    def init(dbname: str) -> None:
+    def configure(cache_size: int) -> None:
+        """Sets the maximum amount of users kept in memory, 0 loads all of
+        them on initialization.
+        """
+        if cache_size < 0:
+            raise ValueError("cache size cannot be negative.")
+        Manager.cache_size = cache_size
+
+    @staticmethod
+    def init(dbname: str, snapshot: Optional[Snapshot] = None) -> None:
         """Initializes the User Manager, connecting and loading from
-        database.
+        database, or from the snapshot if one is provided.
         """
         Manager.db = UserDb(dbname)
-        raw_users = Manager.db.find_all()
+        Manager.db.create_schema()
+        if Manager.is_lazy():
+            Manager.lost_gold = Manager.db.sum_lost_gold(Manager.bot_id)
+            Manager._rank_stored()
+            return
+
+        raw_users = snapshot.rows('users') if snapshot else None
+        if raw_users is None:
+            raw_users = Manager.db.find_all()
         for raw in raw_users:
             Manager.add(User(raw))
+        Manager.lost_gold = sum(u.lost_gold for u in Manager._users.values())
+
+    @staticmethod
+    def is_lazy() -> bool:
+        """Checks if users are loaded as they are requested."""
+        return Manager.cache_size > 0
+
+    @staticmethod
+    def set_bot(user_id: int) -> None:
+        """Marks the user that is the bot."""
+        user = Manager.get(user_id)
+        Manager.bot_id = user_id
+        lost = user.lost_gold
+        user.is_bot = True
+        Manager.track_lost_gold(user.lost_gold - lost)
+        Manager.rank(user)
+
+    @staticmethod
+    def track_lost_gold(change: float) -> None:
+        """Adjusts the total lost gold after a user's gold or messages
+        changed.
+        """
+        Manager.lost_gold += change
+
+    @staticmethod
+    def verify_lost_gold() -> float:
+        """Recalculates the total lost gold, correcting any drift. Returns the
+        difference found.
+        """
+        if Manager.is_lazy() and Manager.db:
+            Manager._save_dirty()
+            actual = Manager.db.sum_lost_gold(Manager.bot_id)
+        else:
+            actual = sum(u.lost_gold for u in Manager._users.values())
+
+        drift = actual - Manager.lost_gold
+        Manager.lost_gold = actual
+        return drift
+
+    @staticmethod
+    def rank(user: User, *categories: str) -> None:
+        """Places the user on the leaderboards with their current values,
+        called as the values change. Only the boards of the categories passed
+        are updated, every board if none are. The bot is only ranked by gold,
+        when the board is read.
+        """
+        for name in categories or CATEGORIES:
+            board = Manager.boards[name]
+            if user.is_bot:
+                board.remove(user.id)
+            else:
+                board.set(user.id, getattr(user, name))
+
+    @staticmethod
+    def _rank_stored() -> None:
+        """Places every stored user on the leaderboards without loading
+        them.
+        """
+        if not Manager.db:
+            return
+
+        for row in Manager.db.find_all_stats():
+            gold, msg_count, kills = int(row[1]), row[2], row[7]
+            exp, deaths = int(row[8]), max(row[11], 0)
+            material = Material(row[16]) if row[16] else Material.NONE
+            level = calc_level(exp)
+            values: dict[str, Union[int, float]] = {
+                'gold': gold, 'exp': exp, 'deaths': deaths, 'kills': kills,
+                'msg_count': msg_count, 'level': level,
+                'difficulty': calc_difficulty(level, exp, gold, msg_count,
+                                              material),
+                'gold_multiplier': calc_gold_multiplier(level),
+            }
+            for name, board in Manager.boards.items():
+                board.set(row[0], values[name])
+
+    @staticmethod
+    def ranked(category: str) -> Iterator[tuple[int, Union[int, float]]]:
+        """Iterates over the ids and values on a leaderboard, highest
+        first.
+        """
+        board = Manager.boards[category]
+        bot_gold: int = 0
+        if category == 'gold' and Manager.bot_id:
+            bot_gold = int(Manager.lost_gold)
+
+        for user_id, value in board.ranked():
+            if bot_gold > value:
+                yield Manager.bot_id, bot_gold
+                bot_gold = 0
+            yield user_id, value
+        if bot_gold > 0:
+            yield Manager.bot_id, bot_gold
 
     @staticmethod
     def add(user: User) -> User:
         """Adds a user to memory, does not save it to database."""
+        Manager.rank(user)
         Manager._users[user.id] = user
+        Manager._users.move_to_end(user.id)
+        Manager._evict()
         return user
 
     @staticmethod
@@ -362,13 +632,123 @@ class Manager:
         it will be initialized with defaults.
         """
         user = Manager._users.get(user_id)
+        if user:
+            if Manager.is_lazy():
+                Manager._users.move_to_end(user_id)
+            return user
+
+        user = Manager._load(user_id)
         if not user:
             # Create and add it to the manager.
             user = User(make_raw(user_id))
-            Manager.add(user)
-        return user
+        return Manager.add(user)
+
+    @staticmethod
+    async def get_async(user_id: int) -> User:
+        """Same as get, except a user that has to be loaded is read by the
+        database worker without blocking the event loop.
+        """
+        if not Manager.is_lazy() or not Manager.db or \
+                user_id in Manager._users or user_id in Manager._evicted:
+            return Manager.get(user_id)
+
+        raw, rows, items = await DbExecutor.run(Manager._read, user_id)
+        if user_id in Manager._users or user_id in Manager._evicted:
+            # Loaded by another caller while waiting.
+            return Manager.get(user_id)
+
+        ItemManager.add_raws(items)
+        BagManager.add_user(user_id, rows)
+        return Manager.add(User(raw if raw else make_raw(user_id)))
+
+    @staticmethod
+    def _read(user_id: int) -> tuple[Optional[UserRaw],
+                                     list[InventoryItemRow], list[ItemRaw]]:
+        """Reads a stored user along with their inventories and items in a
+        single database task, nothing is added to memory.
+        """
+        raw = Manager.db.find_one(user_id) if Manager.db else None
+        rows: list[InventoryItemRow] = []
+        if BagManager.lazy and BagManager.db:
+            rows = BagManager.db.find_user_items(user_id)
+
+        item_ids = [row[6] for row in rows if row[6]]
+        if raw and raw[12].replace("'", ""):
+            item_ids.append(raw[12].replace("'", ""))
+        items: list[ItemRaw] = []
+        if ItemManager.lazy and ItemManager.db and item_ids:
+            items = ItemManager.db.find_many_ids(item_ids)
+        return raw, rows, items
+
+    @staticmethod
+    def _load(user_id: int) -> Optional[User]:
+        """Loads a user that is not in memory."""
+        if not Manager.is_lazy():
+            return None
+
+        user = Manager._evicted.pop(user_id, None)
+        if user:
+            return user
+
+        raw = Manager.db.find_one(user_id) if Manager.db else None
+        return User(raw) if raw else None
+
+    @staticmethod
+    def _evict() -> None:
+        """Unloads the least recently used users over the cache size, saving
+        them first if they have changed.
+        """
+        if not Manager.is_lazy():
+            return
+
+        while len(Manager._users) > Manager.cache_size:
+            _, user = Manager._users.popitem(last=False)
+            if user.is_dirty:
+                user.save()
+            Manager._evicted[user.id] = user
+
+    @staticmethod
+    def _save_dirty() -> None:
+        """Saves the users in memory that have changed, making the stored
+        values current.
+        """
+        for user in list(Manager._users.values()) + \
+                list(Manager._evicted.values()):
+            if user.is_dirty:
+                user.save()
+
+    @staticmethod
+    def find_live(user_id: int) -> Optional[User]:
+        """Finds the user object in memory, either cached or evicted but still
+        referenced elsewhere. Nothing is loaded.
+        """
+        return Manager._users.get(user_id) or Manager._evicted.get(user_id)
+
+    @staticmethod
+    def release(user_id: int) -> None:
+        """Unloads the inventories and weapon of a user that is no longer
+        referenced. Kept if another object for the same user is still in
+        memory.
+        """
+        if Manager.find_live(user_id):
+            return
+        weapon_id = Manager._weapons.pop(user_id, None)
+        BagManager.unload_user(user_id, [weapon_id] if weapon_id else None)
 
     @staticmethod
     def get_all() -> list[User]:
-        """Gets all the users being managed."""
+        """Gets all the users in memory. When lazy, that is only the cached
+        users, stored users are scanned without being loaded instead.
+        """
         return list(Manager._users.values())
+
+    @staticmethod
+    def get_streamers() -> list[tuple[int, str]]:
+        """Gets the id and stream name of every streamer."""
+        if not Manager.is_lazy() or not Manager.db:
+            return [(user.id, user.stream_name)
+                    for user in Manager._users.values() if user.is_streamer]
+
+        Manager._save_dirty()
+        return [(user_id, name.replace("'", "") if name else "")
+                for user_id, name in Manager.db.find_streamers()]
@@ -0,0 +1,363 @@
+"""Offline Monte Carlo simulator of the game's economy, used to balance the
+spawn ranges, location difficulties, lootpack weights and gambling payouts.
+
+Entities, loot tables and payouts come from the real managers. Entities are
+sampled by creating real instances, everything else is rolled in bulk with
+NumPy from the compiled spawn and loot tables.
+
+usage:
+    python3 uboot/simulator.py [--seed N] [--messages N] [--fights N]
+                               [--bets N] [--rate N] [--exp N]
+                               [--format json|csv] [--output FILE]
+"""
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+from typing import Any, Optional, TextIO
+
+import numpy as np
+
+from managers import entities, gambling, locations
+from managers.items import Items, Material
+from managers.loot_tables import (MAX_ATTEMPTS, ChestCreator, LootTable,
+                                  can_loot)
+from managers.users import (COOLDOWN_LENGTHS, Cooldown, calc_difficulty,
+                            calc_gold_multiplier, calc_level)
+
+# Instances created of each entity on each floor to sample their stats.
+SAMPLES: int = 64
+
+Report = dict[str, Any]
+
+
+class LootReport:
+    """Totals of the loot rolled from any amount of loot tables."""
+
+    def __init__(self) -> None:
+        self.rolls: int = 0
+        self.gold: int = 0
+        self.trash_value: int = 0
+        self.items: dict[str, int] = {}  # Type => Amount
+        self.materials: dict[str, int] = {}  # Weapon material => Amount
+
+    def add(self, other: 'LootReport') -> None:
+        """Adds the totals of another report to this one."""
+        self.rolls += other.rolls
+        self.gold += other.gold
+        self.trash_value += other.trash_value
+        for name, amount in other.items.items():
+            self.items[name] = self.items.get(name, 0) + amount
+        for name, amount in other.materials.items():
+            self.materials[name] = self.materials.get(name, 0) + amount
+
+    def to_dict(self) -> Report:
+        """Converts the totals into report values."""
+        rolls = max(self.rolls, 1)
+        return {
+            'rolls': self.rolls,
+            'gold_per_roll': self.gold / rolls,
+            'trash_value_per_roll': self.trash_value / rolls,
+            'items_per_roll': {name: amount / rolls
+                               for name, amount in sorted(self.items.items())},
+            'weapons_by_material': dict(sorted(self.materials.items())),
+        }
+
+
+def roll_loot(rng: np.random.Generator, table: LootTable, count: int,
+              report: LootReport, nested: bool = False) -> None:
+    """Rolls a loot table 'count' times, adding the results to the report.
+    Follows LootTable.roll: every roll takes its picks in order until it is
+    full, accepting them with the same can_loot check.
+    The contents of chests are nested rolls, added without counting as rolls.
+    """
+    table.compile()
+    if count <= 0 or not table.items or table.max_loot <= 0:
+        return
+
+    if not nested:
+        report.rolls += count
+    size = len(table.items)
+    cum_weights = np.asarray(table.cum_weights, dtype=np.float64)
+    stacks = np.asarray(table.stacks, dtype=np.int64)
+    unique = np.asarray(table.unique, dtype=np.int64)
+
+    draws = rng.random((count, MAX_ATTEMPTS)) * cum_weights[-1]
+    picks = np.searchsorted(cum_weights, draws, side='right')
+
+    rows = np.arange(count)
+    looted = np.zeros(count, dtype=np.int64)
+    types = np.zeros(count, dtype=np.int64)
+    taken = np.zeros((count, size), dtype=np.int64)
+    for column in range(MAX_ATTEMPTS):
+        pos = picks[:, column]
+        have = taken[rows, pos]
+        accept = (looted < table.max_loot) \
+            & can_loot(stacks[pos], have, unique[pos], types)
+        taken[rows[accept], pos[accept]] += 1
+        types[accept] |= unique[pos[accept]]
+        looted += accept
+
+    for pos, amount in enumerate(taken.sum(axis=0).tolist()):
+        item = table.items[pos]
+        if amount == 0 or item.type == Items.NONE:
+            continue
+
+        name = item.type.name.lower()
+        report.items[name] = report.items.get(name, 0) + amount
+        if isinstance(item, ChestCreator):
+            roll_loot(rng, item.table, amount, report, True)
+            continue
+
+        values = rng.integers(item.min, item.max, size=amount, endpoint=True)
+        if item.type == Items.GOLD:
+            report.gold += int(values.sum())
+        elif item.type == Items.TRASH:
+            report.trash_value += int((values * item.modifier).astype(
+                np.int64).sum())
+        elif item.type == Items.WEAPON:
+            found, counts = np.unique(values, return_counts=True)
+            for material, material_count in zip(found.tolist(),
+                                                counts.tolist()):
+                material_name = Material(material).name.lower()
+                report.materials[material_name] = \
+                    report.materials.get(material_name, 0) + material_count
+
+
+def simulate_messages(rng: np.random.Generator, messages: int,
+                      rate: float, exp: int) -> Report:
+    """Gold earned from messages. Messages arrive at random at 'rate' per
+    hour. Gold is given for a message once the gold cooldown has passed, so
+    every reward is followed by the cooldown plus the wait for the next
+    message.
+    """
+    cooldown = COOLDOWN_LENGTHS[Cooldown.GOLD.value - 1]
+    gap = 3600 / rate
+    level = calc_level(exp)
+    per_reward = calc_gold_multiplier(level)
+
+    # Messages sent while on cooldown, and the time until the next reward.
+    rewards = max(int(messages / (1 + cooldown / gap)), 1)
+    ignored = rng.poisson(cooldown / gap, size=rewards)
+    waits = cooldown + rng.exponential(gap, size=rewards)
+
+    sent = int(rewards + ignored.sum())
+    hours = float(waits.sum()) / 3600
+    return {
+        'messages': sent,
+        'rate_per_hour': rate,
+        'level': level,
+        'gold_per_reward': per_reward,
+        'rewarded_share': rewards / sent,
+        'gold_per_message': rewards * per_reward / sent,
+        'gold_per_hour': rewards * per_reward / hours,
+    }
+
+
+def sample_entities(floor: locations.Floor, difficulty: float,
+                    level: int) -> dict[str, tuple[np.ndarray, list]]:
+    """Creates instances of every entity that spawns on a floor, along with
+    chests, gathering their exp and lootpacks. Name => (exp, lootpacks)
+    """
+    spawns: dict[str, tuple[np.ndarray, list]] = {}
+    table = entities.Manager.spawn_table(floor)
+    creature_difficulty = difficulty + max(floor.difficulty - 1, 0)
+    for name, entity in zip(table.names if table else (),
+                            table.entities if table else ()):
+        created = [entity(floor, creature_difficulty) for _ in range(SAMPLES)]
+        spawns[name] = (np.asarray([e.get_exp(level) for e in created]),
+                        [e.lootpack for e in created])
+
+    chests = [entities.Chest(floor, difficulty) for _ in range(SAMPLES)]
+    spawns['chest'] = (np.asarray([c.get_exp(level) for c in chests]),
+                       [c.lootpack for c in chests])
+    return spawns
+
+
+def simulate_floor(rng: np.random.Generator, floor: locations.Floor,
+                   messages: int, fights: int, rate: float,
+                   difficulty: float, level: int,
+                   inflow: LootReport) -> Report:
+    """Spawn rates for messages on a floor, then the exp and loot of fights
+    against what spawns there.
+    """
+    chest_range, entity_range = entities.Manager.spawn_ranges(
+        floor, False, False, False)
+    rolls = rng.integers(0, entities.SPAWN_ROLL * 100, size=messages,
+                         endpoint=True) / 100
+    chests = int((rolls <= chest_range).sum())
+    creatures = int((rolls <= entity_range).sum()) - chests
+
+    spawns = sample_entities(floor, difficulty, level)
+    table = entities.Manager.spawn_table(floor)
+    names: list[str] = list(table.names) if table else []
+    weights = np.asarray(table.weights if table else (), dtype=np.float64)
+
+    # Fights follow the spawn rates, creatures by their spawn weights.
+    chest_share = chests / max(chests + creatures, 1)
+    fought_chests = int(rng.binomial(fights, chest_share)) if names \
+        else fights
+    fought: dict[str, int] = {'chest': fought_chests}
+    if names:
+        picked = rng.choice(len(names), size=fights - fought_chests,
+                            p=weights / weights.sum())
+        for pos, amount in enumerate(np.bincount(
+                picked, minlength=len(names)).tolist()):
+            fought[names[pos]] = amount
+
+    total_exp: float = 0.0
+    loot = LootReport()
+    for name, amount in fought.items():
+        if amount == 0:
+            continue
+        exps, lootpacks = spawns[name]
+        chosen = rng.integers(0, len(lootpacks), size=amount)
+        total_exp += float(exps[chosen].sum())
+
+        # Roll each shared lootpack once for every fight that used it.
+        packs = np.bincount(chosen, minlength=len(lootpacks))
+        by_table: dict[int, tuple[LootTable, int]] = {}
+        for pos, pack_count in enumerate(packs.tolist()):
+            pack = lootpacks[pos]
+            _, previous = by_table.get(id(pack), (pack, 0))
+            by_table[id(pack)] = (pack, previous + pack_count)
+        for pack, pack_count in by_table.values():
+            roll_loot(rng, pack, pack_count, loot)
+    inflow.add(loot)
+
+    spawn_chance = (chests + creatures) / messages
+    exp_per_fight = total_exp / max(fights, 1)
+    gold_per_fight = loot.gold / max(fights, 1)
+    return {
+        'floor': floor.name,
+        'difficulty': floor.difficulty,
+        'chest_per_message': chests / messages,
+        'creature_per_message': creatures / messages,
+        'spawns_per_hour': spawn_chance * rate,
+        'exp_per_fight': exp_per_fight,
+        'exp_per_hour': exp_per_fight * spawn_chance * rate,
+        'loot_gold_per_fight': gold_per_fight,
+        'loot_gold_per_hour': gold_per_fight * spawn_chance * rate,
+        'fights': {name: amount for name, amount in fought.items() if amount},
+    }
+
+
+def simulate_bets(rng: np.random.Generator, bets: int,
+                  amount: int = 100) -> Report:
+    """Win rate and house edge of each side of the dice game."""
+    totals = rng.integers(1, 6, size=(bets, 2), endpoint=True).sum(axis=1)
+    report: Report = {}
+    for side in ("high", "low", "seven"):
+        won = gambling.winnings(side, amount, totals)
+        net = np.where(won > 0, won, -amount)
+        report[side] = {
+            'bets': bets,
+            'win_rate': float((won > 0).mean()),
+            'return_per_gp': float(net.mean()) / amount,
+            'house_edge': -float(net.mean()) / amount,
+        }
+    return report
+
+
+def simulate(seed: int, messages: int, fights: int, bets: int,
+             rate: float, exp: int) -> Report:
+    """Runs every simulation, returning the full report."""
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    locations.Manager.init()
+    entities.Manager.init()
+
+    level = calc_level(exp)
+    difficulty = calc_difficulty(level, exp, 0, 1, Material.NONE)
+    report: Report = {
+        'seed': seed,
+        'exp': exp,
+        'level': level,
+        'difficulty': difficulty,
+    }
+
+    started = time.perf_counter()
+    report['messages'] = simulate_messages(rng, messages, rate, exp)
+    report['messages']['seconds'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    inflow = LootReport()
+    floors: list[Report] = []
+    for area in locations.LOCATIONS:
+        dungeon = locations.Manager.get(area, locations.Level.ONE)
+        if not dungeon:
+            continue
+        for floor in dungeon.parent.get_floors():
+            floors.append(simulate_floor(rng, floor, messages, fights, rate,
+                                         difficulty, level, inflow))
+    report['floors'] = floors
+    report['loot'] = inflow.to_dict()
+    report['loot']['seconds'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    report['gambling'] = simulate_bets(rng, bets)
+    report['gambling']['seconds'] = time.perf_counter() - started
+    return report
+
+
+def flatten(value: Any, prefix: str = '') -> list[tuple[str, Any]]:
+    """Flattens a report into (path, value) rows."""
+    if isinstance(value, dict):
+        rows: list[tuple[str, Any]] = []
+        for key, inner in value.items():
+            rows.extend(flatten(inner, f"{prefix}.{key}" if prefix else key))
+        return rows
+    if isinstance(value, list):
+        rows = []
+        for pos, inner in enumerate(value):
+            rows.extend(flatten(inner, f"{prefix}.{pos}"))
+        return rows
+    return [(prefix, value)]
+
+
+def write_report(report: Report, fmt: str, file: TextIO) -> None:
+    """Writes the report as JSON or as CSV rows of (metric, value)."""
+    if fmt == 'json':
+        json.dump(report, file, indent=2)
+        file.write("\n")
+        return
+
+    writer = csv.writer(file)
+    writer.writerow(('metric', 'value'))
+    writer.writerows(flatten(report))
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Entrance function into the simulator."""
+    parser = argparse.ArgumentParser(
+        description="Simulates spawns, fights, loot and gambling.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed for every random roll.")
+    parser.add_argument('--messages', type=int, default=1_000_000,
+                        help="messages simulated for gold and per floor.")
+    parser.add_argument('--fights', type=int, default=100_000,
+                        help="fights simulated per floor.")
+    parser.add_argument('--bets', type=int, default=1_000_000,
+                        help="bets simulated per side.")
+    parser.add_argument('--rate', type=float, default=60.0,
+                        help="messages a user sends per hour.")
+    parser.add_argument('--exp', type=int, default=10_000,
+                        help="exp of the simulated user.")
+    parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    parser.add_argument('--output', default='',
+                        help="file to write the report to, default stdout.")
+    args = parser.parse_args(argv)
+
+    report = simulate(args.seed, max(args.messages, 1), max(args.fights, 0),
+                      max(args.bets, 1), max(args.rate, 0.01), args.exp)
+    if not args.output:
+        write_report(report, args.format, sys.stdout)
+        return
+    with open(args.output, 'w', encoding='utf-8', newline='') as file:
+        write_report(report, args.format, file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Shared fixtures. Databases are created within a temporary directory and the
+state kept by the managers is reset for every test.
+"""
+import pathlib
+import sys
+import weakref
+from collections import OrderedDict, deque
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from db.connection import ConnectionManager  # noqa: E402
+from db.db_socket import DbSocket  # noqa: E402
+from db.executor import DbExecutor  # noqa: E402
+from db.snapshot import Snapshot  # noqa: E402
+from managers import inventories, items, messages, users  # noqa: E402
+from managers.leaderboards import CATEGORIES, Leaderboard  # noqa: E402
+from managers.logs import Manager as LogManager  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Runs the test within a temporary directory, databases are placed in
+    its 'dbs' directory.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(DbSocket, '_sockets', [])
+    monkeypatch.setattr(DbSocket, 'write_behind', False)
+    monkeypatch.setattr(DbSocket, 'flush_interval', DbSocket.flush_interval)
+    monkeypatch.setattr(DbSocket, 'flush_size', DbSocket.flush_size)
+    monkeypatch.setattr(ConnectionManager, '_connections', {})
+    monkeypatch.setattr(ConnectionManager, '_tables', {})
+    monkeypatch.setattr(ConnectionManager, '_closed', {})
+    monkeypatch.setattr(Snapshot, '_captured', {})
+    yield tmp_path
+    DbExecutor.stop()
+    ConnectionManager.close_all()
+
+
+@pytest.fixture(autouse=True)
+def clean_managers(monkeypatch):
+    """Starts every test with empty managers."""
+    monkeypatch.setattr(users.Manager, 'db', None)
+    monkeypatch.setattr(users.Manager, 'bot_id', 0)
+    monkeypatch.setattr(users.Manager, 'lost_gold', 0)
+    monkeypatch.setattr(users.Manager, 'boards',
+                        {name: Leaderboard(name) for name in CATEGORIES})
+    monkeypatch.setattr(users.Manager, 'cache_size', 0)
+    monkeypatch.setattr(users.Manager, '_users', OrderedDict())
+    monkeypatch.setattr(users.Manager, '_evicted',
+                        weakref.WeakValueDictionary())
+    monkeypatch.setattr(users.Manager, '_weapons', {})
+
+    monkeypatch.setattr(items.Manager, 'db', None)
+    monkeypatch.setattr(items.Manager, 'lazy', False)
+    monkeypatch.setattr(items.Manager, '_items', {})
+    monkeypatch.setattr(items.Manager, '_unloaded',
+                        weakref.WeakValueDictionary())
+
+    monkeypatch.setattr(inventories.Manager, 'db', None)
+    monkeypatch.setattr(inventories.Manager, 'items_db', None)
+    monkeypatch.setattr(inventories.Manager, 'lazy', False)
+    monkeypatch.setattr(inventories.Manager, '_loaded', set())
+    monkeypatch.setattr(inventories.Manager, 'inventories', {})
+    monkeypatch.setattr(inventories.Manager, '_backpacks', {})
+    monkeypatch.setattr(inventories.Manager, '_banks', {})
+    monkeypatch.setattr(inventories.Manager, '_resources', {})
+    monkeypatch.setattr(inventories.Manager, '_unloaded',
+                        weakref.WeakValueDictionary())
+
+    monkeypatch.setattr(messages.Manager, 'db', None)
+    monkeypatch.setattr(messages.Manager, '_pending', {})
+    monkeypatch.setattr(messages.Manager, '_last_message', {})
+
+    monkeypatch.setattr(LogManager, 'db', None)
+    monkeypatch.setattr(LogManager, '_buffer', deque())
+    monkeypatch.setattr(LogManager, '_inflight', None)
+    monkeypatch.setattr(LogManager, 'retention_days', 0)
+    monkeypatch.setattr(LogManager, 'dropped', 0)
+
+
+@pytest.fixture
+def lazy_users():
+    """Users, inventories and items loaded as they are requested, keeping at
+    most 2 users cached.
+    """
+    items.Manager.init('game.sqlite3', lazy=True)
+    inventories.Manager.init('game.sqlite3', lazy=True)
+    users.Manager.configure(2)
+    users.Manager.init('game.sqlite3')
+    return users.Manager
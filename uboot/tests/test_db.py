@@ -0,0 +1,154 @@
+"""Database layer: write-behind, UPSERT, migrations and snapshots."""
+import sqlite3
+
+from db.connection import ConnectionManager
+from db.db_socket import DbSocket
+from db.migrations import MIGRATIONS, Migrator, table_columns
+from db.snapshot import Snapshot
+from db.users import UserDb
+from managers.users import make_raw
+
+
+def user_db() -> UserDb:
+    """Opens the users table of a fresh database."""
+    db = UserDb('game.sqlite3')
+    db.create_schema()
+    return db
+
+
+def with_gold(user_id: int, gold: int) -> tuple:
+    """A raw user with a specific amount of gold."""
+    raw = list(make_raw(user_id))
+    raw[1] = gold
+    return tuple(raw)
+
+
+def test_update_inserts_then_replaces():
+    db = user_db()
+    db.update(with_gold(1, 10))
+    db.update(with_gold(1, 20))
+
+    assert db.find_one(1)[1] == 20
+    assert len(db.find_all()) == 1
+
+
+def test_update_changed_writes_only_when_different():
+    db = user_db()
+    raw = with_gold(1, 10)
+    assert db.update_changed(raw, None)
+    assert not db.update_changed(raw, raw)
+    assert db.update_changed(with_gold(1, 30), raw)
+    assert db.find_one(1)[1] == 30
+
+
+def test_write_behind_queues_until_flushed():
+    DbSocket.configure(True, 3600, 1000)
+    db = user_db()
+    db.update(with_gold(1, 10))
+    db.update(with_gold(1, 20))
+    db.update(with_gold(2, 5))
+
+    assert db.pending == 2
+    assert DbSocket.total_pending() == 2
+    assert db.flush() == 2
+    assert db.pending == 0
+    assert db.find_one(1)[1] == 20
+
+
+def test_write_behind_reads_see_queued_changes():
+    DbSocket.configure(True, 3600, 1000)
+    db = user_db()
+    db.update(with_gold(1, 10))
+
+    assert db.find_one(1)[1] == 10
+    assert db.pending == 0
+
+
+def test_write_behind_flushes_at_size():
+    DbSocket.configure(True, 3600, 2)
+    db = user_db()
+    db.update(with_gold(1, 10))
+    db.update(with_gold(2, 10))
+
+    assert db.pending == 0
+
+
+def test_failed_flush_keeps_batch():
+    DbSocket.configure(True, 3600, 1000)
+    db = user_db()
+    db.update(with_gold(1, 10))
+    db.update(with_gold(2, 10))
+    upsert = db._upsert_query()
+    db.query['upsert'] = "INSERT INTO missing VALUES(?)"
+
+    assert db.flush() == 0
+    assert db.pending == 2
+
+    db.query['upsert'] = upsert
+    assert db.flush() == 2
+    assert sorted(raw[0] for raw in db.find_all()) == [1, 2]
+
+
+def test_failed_flush_keeps_newer_versions():
+    DbSocket.configure(True, 3600, 1000)
+    db = user_db()
+    db.update(with_gold(1, 10))
+    upsert = db._upsert_query()
+    db.query['upsert'] = "INSERT INTO missing VALUES(?)"
+    db.flush()
+
+    # Changed again after the failure, the newer value has to win.
+    db._pending[db._key(with_gold(1, 50))] = with_gold(1, 50)
+    db.query['upsert'] = upsert
+    db.flush()
+    assert db.find_one(1)[1] == 50
+
+
+def test_migrations_upgrade_old_tables(workdir):
+    (workdir / 'dbs').mkdir()
+    session = sqlite3.connect(workdir / 'dbs' / 'old.sqlite3')
+    session.execute("CREATE TABLE users ( id INTEGER, gold INTEGER, "
+                    "msg_count INTEGER, gambles INTEGER, "
+                    "gambles_won INTEGER, button_press INTEGER, "
+                    "monsters INTEGER, kills INTEGER, exp INTEGER, "
+                    "locations INTEGER, c_location INTEGER, "
+                    "deaths INTEGER, weapon TEXT, c_floor INTEGER )")
+    session.execute("INSERT INTO users VALUES"
+                    "(7, 99, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, '', 0)")
+    session.commit()
+    session.close()
+
+    session = ConnectionManager.get('old.sqlite3')
+    latest = max(migration.version for migration in MIGRATIONS)
+    assert Migrator.version(session) == latest
+    columns = table_columns(session.cursor(), 'users')
+    assert 'is_streamer' in columns and 'stream_name' in columns
+
+    db = UserDb('old.sqlite3')
+    assert db.find_one(7)[1] == 99
+    assert Migrator.apply(session) == latest
+
+
+def test_snapshot_round_trip():
+    db = user_db()
+    db.update(with_gold(1, 10))
+    Snapshot.capture('game.sqlite3', {'users': db.find_all()})
+    ConnectionManager.close_all()
+
+    assert Snapshot.write_captured() == 1
+    snapshot = Snapshot.load('game.sqlite3')
+    assert snapshot is not None
+    assert [raw[0] for raw in snapshot.rows('users')] == [1]
+    # Only used once, it is stale after the next write.
+    assert Snapshot.load('game.sqlite3') is None
+
+
+def test_snapshot_skipped_after_later_writes():
+    db = user_db()
+    db.update(with_gold(1, 10))
+    Snapshot.capture('game.sqlite3', {'users': db.find_all()})
+    db.update(with_gold(2, 10))
+    ConnectionManager.close_all()
+
+    assert Snapshot.write_captured() == 0
+    assert Snapshot.load('game.sqlite3') is None
@@ -0,0 +1,45 @@
+"""Batched Discord lookups."""
+import asyncio
+
+from dclient import helper
+
+
+class FakeUser:
+    """Stand-in for a Discord user."""
+
+    def __init__(self, user_id: int) -> None:
+        self.id = user_id
+
+
+class FakeClient:
+    """Client with some users cached, the rest are fetched."""
+
+    def __init__(self, cached: list[int]) -> None:
+        self.cached = {user_id: FakeUser(user_id) for user_id in cached}
+        self.fetched: list[int] = []
+
+    def get_user(self, user_id: int):
+        return self.cached.get(user_id)
+
+    async def fetch_user(self, user_id: int) -> FakeUser:
+        self.fetched.append(user_id)
+        return FakeUser(user_id)
+
+
+def test_get_users_keeps_order_of_ids(monkeypatch):
+    monkeypatch.setattr(helper, '_users', helper.LookupCache(60, 60))
+    client = FakeClient(cached=[2, 4])
+
+    found = asyncio.run(helper.get_users(client, [3, 2, 1, 3, 4]))
+
+    assert list(found) == [3, 2, 1, 4]
+    assert [user.id for user in found.values()] == [3, 2, 1, 4]
+    # Repeated ids are only fetched once.
+    assert sorted(client.fetched) == [1, 3]
+
+
+def test_in_order_uses_first_position():
+    found = {2: 'b', 1: 'a'}
+
+    assert helper.in_order([1, 2, 1, 5], found) == \
+        {1: 'a', 2: 'b', 5: None}
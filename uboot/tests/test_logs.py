@@ -0,0 +1,121 @@
+"""Log buffering, paging and the compressed archive."""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from db.executor import DbExecutor
+from db.log_archive import LogArchive
+from managers.logs import Log, LogType, Manager as LogManager, make_raw
+
+
+def queue_logs(amount: int, user_id: int = 1, days_ago: int = 0) -> None:
+    """Buffers logs for guild 1, each a minute apart and numbered by their
+    message.
+    """
+    start = datetime.utcnow() - timedelta(days=days_ago)
+    for n in range(amount):
+        log = Log(make_raw(1, user_id, LogType.INFO, f"{n}"))
+        timestamp = (start + timedelta(minutes=n)).replace(microsecond=0)
+        log.timestamp = timestamp.isoformat()
+        log.save()
+
+
+def messages(logs) -> list[str]:
+    """Gets the messages of logs."""
+    return [log.message for log in logs]
+
+
+def test_pages_newest_first():
+    LogManager.init('logs.sqlite3')
+    queue_logs(10)
+
+    first = asyncio.run(LogManager.get_guild_user(1, 1, 3))
+    second = asyncio.run(LogManager.get_guild_user(1, 1, 3, offset=3))
+    assert messages(first) == ['7', '8', '9']
+    assert messages(second) == ['4', '5', '6']
+
+    before = asyncio.run(LogManager.get_guild_user(1, 1, 3,
+                                                   before_id=first[0].id))
+    assert messages(before) == messages(second)
+
+
+def test_pages_by_type():
+    LogManager.init('logs.sqlite3')
+    queue_logs(3)
+    LogManager.queue(make_raw(1, 1, LogType.ERROR, "broken"))
+
+    logs = asyncio.run(LogManager.get_guild_type(1, LogType.ERROR, 10))
+    assert messages(logs) == ['broken']
+
+
+def test_pages_within_time_bounds():
+    LogManager.init('logs.sqlite3')
+    queue_logs(3, days_ago=2)
+    queue_logs(2)
+    bound = datetime.utcnow() - timedelta(days=1)
+
+    since = asyncio.run(LogManager.get_guild_user(1, 1, 10, since=bound))
+    until = asyncio.run(LogManager.get_guild_user(1, 1, 10, until=bound))
+    assert messages(since) == ['0', '1']
+    assert messages(until) == ['0', '1', '2']
+
+
+def test_rotate_moves_logs_into_archive():
+    LogManager.init('logs.sqlite3', retention_days=7)
+    queue_logs(25, days_ago=40)
+    queue_logs(2, user_id=2)
+
+    DbExecutor.start()
+    moved = asyncio.run(LogManager.rotate(chunk=10))
+    assert moved == 25
+
+    # Pages continue from the database into the archive.
+    logs = asyncio.run(LogManager.get_guild_user(1, 1, 5, offset=20))
+    assert messages(logs) == ['0', '1', '2', '3', '4']
+    logs = asyncio.run(LogManager.get_guild_user(1, 2, 5))
+    assert messages(logs) == ['0', '1']
+
+
+def test_rotate_keeps_fresh_logs():
+    LogManager.init('logs.sqlite3', retention_days=7)
+    old = Log(make_raw(1, 1, LogType.INFO, "old"))
+    old.timestamp = (datetime.utcnow() - timedelta(days=8)).isoformat()
+    old.save()
+    Log.info("fresh", guild_id=1, user_id=1)
+
+    DbExecutor.start()
+    assert asyncio.run(LogManager.rotate()) == 1
+    stored = LogManager.db._select("SELECT message FROM {table_name}")
+    assert stored == [("'fresh'",)]
+
+
+def row(log_id: int, user_id: int, month: str) -> tuple:
+    """A log row within a month."""
+    return (log_id, 1, user_id, int(LogType.INFO), f"'{month}-01T00:00:00'",
+            f"{log_id}")
+
+
+def test_archive_reads_only_matching_members():
+    archive = LogArchive()
+    archive.write([row(1, 1, '2020-01'), row(2, 1, '2020-01')])
+    archive.write([row(3, 2, '2020-01')])
+    archive.write([row(4, 1, '2020-01')])
+
+    members = archive.index('2020-01')
+    assert len(members) == 3
+    assert [r[0] for r in archive.search('2020-01', '1:user_id:2')] == [3]
+    assert [r[0] for r in archive.find(1, 'user_id', 1, 2)] == [4, 2]
+    assert [r[0] for r in archive.find(1, 'user_id', 1, 2, offset=2)] == [1]
+
+
+def test_archive_indexes_segments_written_without_one():
+    archive = LogArchive()
+    archive.write([row(1, 1, '2020-01'), row(2, 2, '2020-02')])
+    for month in ('2020-01', '2020-02'):
+        os.remove(archive.index_file(month))
+
+    archive = LogArchive()
+    assert [r[0] for r in archive.find(1, 'user_id', 2, 10)] == [2]
+    assert [r[0] for r in archive.find(1, 'type', int(LogType.INFO), 10)] \
+        == [2, 1]
+    assert os.path.exists(archive.index_file('2020-01'))
@@ -0,0 +1,100 @@
+"""Compiled loot tables, batched loot rolls and alias spawn tables."""
+import random
+
+import numpy as np
+import pytest
+
+from managers.entities import SpawnTable
+from managers.items import Items, Rarity
+from managers.loot_tables import (ChestCreator, ItemCreator, LootTable,
+                                  can_loot)
+
+
+def table(max_loot: int, *entries: tuple[ItemCreator, int]) -> LootTable:
+    """Builds and compiles a loot table."""
+    loot = LootTable(max_loot)
+    for item, weight in entries:
+        loot.add_item(item, weight)
+    return loot.compile()
+
+
+def test_items_without_stacks_are_never_looted():
+    loot = table(3, (ItemCreator(Items.GOLD, 0, 1, 2), 100),
+                 (ItemCreator(Items.NONE, -1, 0, 0), 1))
+
+    for roll in loot.roll(200):
+        assert all(item.type == Items.NONE for item in roll)
+
+
+def test_stacks_limit_each_roll():
+    loot = table(5, (ItemCreator(Items.GOLD, 2, 1, 2), 100),
+                 (ItemCreator(Items.NONE, -1, 0, 0), 1))
+
+    for roll in loot.roll(200):
+        assert sum(item.type == Items.GOLD for item in roll) <= 2
+
+
+def test_unique_types_are_looted_once():
+    loot = table(5, (ItemCreator(Items.POWERHOUR, -1), 100),
+                 (ItemCreator(Items.NONE, -1, 0, 0), 1))
+
+    for roll in loot.roll(200):
+        assert sum(item.type == Items.POWERHOUR for item in roll) <= 1
+
+
+def test_rolls_are_independent_and_bounded():
+    random.seed(1)
+    loot = LootTable.lootpack(Rarity.RARE, False)
+    rolls = loot.roll(50)
+
+    assert len(rolls) == 50
+    assert all(len(roll) <= loot.max_loot for roll in rolls)
+    assert loot.roll(0) == []
+
+
+def test_lootpacks_are_compiled_and_shared():
+    loot = LootTable.lootpack(Rarity.EPIC, False)
+
+    assert loot.is_compiled
+    assert LootTable.lootpack(Rarity.EPIC, False) is loot
+    with pytest.raises(ValueError):
+        loot.add_item(ItemCreator(Items.GOLD, 1, 1, 2), 1)
+    for item in loot.items:
+        if isinstance(item, ChestCreator):
+            assert item.table.is_compiled
+
+
+def test_can_loot_matches_for_numpy():
+    stacks = [-1, 0, 1, 2, 2]
+    looted = [5, 0, 1, 1, 2]
+    unique = [0, 0, 4, 8, 0]
+    types = [4, 4, 0, 8, 0]
+
+    single = [bool(can_loot(*values))
+              for values in zip(stacks, looted, unique, types)]
+    batch = can_loot(*(np.asarray(values) for values in
+                       (stacks, looted, unique, types)))
+    assert single == [True, False, False, False, False]
+    assert batch.tolist() == single
+
+
+class Rat:
+    """Stand-in entity."""
+
+
+class Dragon:
+    """Stand-in entity."""
+
+
+def test_spawn_table_probabilities_follow_weights():
+    spawns = SpawnTable([(750, Rat, 'rat'), (250, Dragon, 'dragon'),
+                         (0, Rat, 'never')])
+
+    assert len(spawns) == 2
+    chances = spawns.probabilities()
+    assert chances['rat'] == pytest.approx(0.75)
+    assert chances['dragon'] == pytest.approx(0.25)
+
+    random.seed(2)
+    picks = [spawns.sample() for _ in range(20000)]
+    assert picks.count(Dragon) / len(picks) == pytest.approx(0.25, abs=0.02)
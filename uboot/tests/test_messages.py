@@ -0,0 +1,45 @@
+"""Staged message handling."""
+import time
+
+from managers import messages, users
+
+
+def test_taunt_after_idle():
+    messages.Manager._last_message[1] = time.time() - messages.TAUNT_IDLE - 1
+    user = users.Manager.get(1)
+
+    assert messages.Manager.ingest(user)
+    assert not messages.Manager.ingest(user)
+
+
+def test_taunt_without_stored_message():
+    assert messages.Manager.ingest(users.Manager.get(1))
+
+
+def test_idle_time_survives_reload():
+    messages.Manager.ingest(users.Manager.get(1))
+
+    # A new object for the same user, like after being unloaded.
+    assert not messages.Manager.ingest(users.User(users.make_raw(1)))
+
+
+def test_idle_time_survives_restart():
+    messages.Manager.init('game.sqlite3')
+    messages.Manager.ingest(users.Manager.get(1))
+    messages.Manager.persist()
+
+    messages.Manager.init('game.sqlite3')
+    assert messages.Manager.idle(1) < messages.TAUNT_IDLE
+    assert not messages.Manager.ingest(users.Manager.get(1))
+
+
+def test_persist_saves_each_user_once():
+    users.Manager.init('game.sqlite3')
+    user = users.Manager.get(1)
+    for _ in range(3):
+        messages.Manager.ingest(user)
+
+    assert messages.Manager.pending() == 1
+    assert messages.Manager.persist() == 1
+    assert users.Manager.db.find_one(1)[2] == 3
+    assert messages.Manager.persist() == 0
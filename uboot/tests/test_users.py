@@ -0,0 +1,136 @@
+"""Lazily loaded users, their inventories and the leaderboards."""
+import asyncio
+import gc
+
+from db.executor import DbExecutor
+from managers import inventories, items, users
+from managers.items import Item, Items
+from managers.leaderboards import Leaderboard
+
+
+def test_lazy_users_evict_least_recent(lazy_users):
+    first = lazy_users.get(1)
+    first.gold = 50
+    lazy_users.get(2)
+    lazy_users.get(1)
+    lazy_users.get(3)
+
+    # 2 was used least recently.
+    assert list(lazy_users._users) == [1, 3]
+    del first
+    lazy_users.get(4)
+    gc.collect()
+    assert list(lazy_users._users) == [3, 4]
+    assert lazy_users.get(1).gold == 50
+
+
+def test_evicted_users_keep_identity_while_referenced(lazy_users):
+    held = lazy_users.get(1)
+    lazy_users.get(2)
+    lazy_users.get(3)
+
+    assert 1 not in lazy_users._users
+    assert lazy_users.get(1) is held
+
+
+def test_get_async_loads_user_with_inventories(lazy_users):
+    user = lazy_users.get(1)
+    user.gold = 70
+    backpack_id = user.backpack.id
+    user.save()
+    del user
+    lazy_users._users.clear()
+    gc.collect()
+    assert 1 not in inventories.Manager._loaded
+
+    DbExecutor.start()
+    user = asyncio.run(lazy_users.get_async(1))
+    assert user.gold == 70
+    assert 1 in inventories.Manager._loaded
+    assert user.backpack.id == backpack_id
+
+
+def test_release_keeps_state_of_live_user(lazy_users):
+    user = lazy_users.get(1)
+    backpack = user.backpack
+
+    # A second object for the same user going away must not unload the
+    # inventories the live user holds.
+    users.User(user.raw)
+    gc.collect()
+    assert 1 in inventories.Manager._loaded
+    assert user.backpack is backpack
+
+
+def test_release_unloads_inventories_and_weapon(lazy_users):
+    weapon = Item.from_raw(("'sword'", int(Items.WEAPON), 'sword', 1, 1, 5,
+                            10, 10))
+    items.Manager.add(weapon)
+    weapon.save()
+    user = lazy_users.get(1)
+    user.weapon = weapon
+    backpack = user.backpack
+    user.save()
+    del user, weapon
+    lazy_users.get(2)
+    lazy_users.get(3)
+    gc.collect()
+
+    assert 1 not in inventories.Manager._loaded
+    assert 'sword' not in items.Manager._items
+
+    # Inventories still referenced elsewhere are reused on reload.
+    user = lazy_users.get(1)
+    assert user.backpack is backpack
+    assert user.weapon.id == 'sword'
+
+
+def test_streamers_read_without_loading(lazy_users):
+    user = lazy_users.get(1)
+    user.is_streamer = True
+    user.stream_name = 'gatekeeper'
+    user.save()
+    lazy_users.get(2)
+    del user
+    lazy_users._users.clear()
+    gc.collect()
+
+    assert lazy_users.get_streamers() == [(1, 'gatekeeper')]
+    assert len(lazy_users._users) == 0
+
+
+def test_leaderboard_ranks_highest_first():
+    board = Leaderboard('gold')
+    board.set(1, 10)
+    board.set(2, 30)
+    board.set(3, 20)
+    board.set(1, 40)
+    board.set(4, 0)
+
+    assert list(board.ranked()) == [(1, 40), (2, 30), (3, 20)]
+    assert board.top(2) == [(1, 40), (2, 30)]
+    assert board.total == 90
+
+    board.remove(2)
+    assert list(board.ranked()) == [(1, 40), (3, 20)]
+    assert board.total == 60
+
+
+def test_leaderboards_follow_saved_users():
+    user = users.Manager.get(1)
+    user.gold = 25
+    user.save()
+    users.Manager.get(2)
+
+    assert list(users.Manager.ranked('gold')) == [(2, 100), (1, 25)]
+
+
+def test_leaderboards_follow_changes_before_save():
+    user = users.Manager.get(1)
+    users.Manager.get(2)
+    user.kills += 2
+    user.exp = 500
+
+    assert list(users.Manager.ranked('kills')) == [(1, 2)]
+    assert users.Manager.boards['level'].get(1) == user.level
+    assert users.Manager.boards['difficulty'].get(1) == user.difficulty